@@ -3,10 +3,27 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
 from flask_cors import CORS
 from config import Config
+from .kvstore import KeyValueStore
+from .cache import ResponseCache
+from .metrics import RequestMetrics
+from .hashing import PasswordHasher
+from .search import MovieSearchIndex
+from .identity import UserIdentityCache
+from .sweeper import Sweeper
+from .hot_comments import HotCommentCache
 
 # 创建扩展实例
 db = SQLAlchemy()
 login_manager = LoginManager()
+kv = KeyValueStore()  # Redis，未配置 REDIS_HOST 时使用进程内实现
+cache = ResponseCache(kv)  # 读多写少接口的响应缓存
+metrics = RequestMetrics()  # 请求耗时与数据库查询统计
+hasher = PasswordHasher()  # 在进程池中计算密码哈希
+search_index = MovieSearchIndex(kv)  # 电影全文搜索
+identity_cache = UserIdentityCache(kv)  # load_user 的用户身份缓存
+metrics.add_collector(identity_cache.prometheus_lines)
+sweeper = Sweeper(kv)  # 订单完成、优惠券过期的分批清扫任务
+hot_comments = HotCommentCache(kv)  # 电影评论第一页的热点缓存
 login_manager.session_protection = "strong"
 # 如果未认证用户尝试访问受保护页面，
 # flask_login 会显示一条消息并重定向。我们这里不需要重定向 URL，
@@ -24,7 +41,24 @@ def create_app():
     # 使用 app 初始化扩展
     db.init_app(app)
     login_manager.init_app(app)
-    CORS(app, origins="http://localhost:5173", supports_credentials=True)
+    kv.init_app(app)
+    cache.init_app(app)
+    metrics.init_app(app)
+    hasher.init_app(app)
+    search_index.init_app(app)
+    identity_cache.init_app(app)
+    sweeper.init_app(app)
+    hot_comments.init_app(app)
+    CORS(
+        app,
+        origins="http://localhost:5173",
+        supports_credentials=True,
+        # 分页游标、缓存校验值和幂等重放标记通过响应头返回
+        expose_headers=["X-Next-Cursor", "ETag", "Idempotent-Replayed"],
+    )
+
+    # 注册评论变更时维护电影评分聚合的事件监听
+    from . import ratings  # noqa: F401
 
     # 导入并注册蓝图
     from .api import api_bp as api_blueprint
@@ -44,7 +78,5 @@ def load_user(user_id):
     """
     Flask-Login 必需的回调函数。根据 user_id 从数据库加载用户。
     """
-    from .models import User
-
-    # 使用 db.session.get 通过主键查找
-    return db.session.get(User, int(user_id))
+    # 优先使用进程内的身份缓存，未命中时按主键只查询需要的列
+    return identity_cache.load(db.session, int(user_id))
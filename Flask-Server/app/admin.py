@@ -1,11 +1,14 @@
+from flask import current_app, request
 from flask_admin.contrib.sqla import ModelView
+from flask_admin.contrib.sqla.ajax import QueryAjaxModelLoader
+from flask_admin.model.ajax import DEFAULT_PAGE_SIZE
 from flask_admin import Admin
 from flask_login import current_user
-from wtforms.fields import SelectField
-from wtforms_sqlalchemy.fields import QuerySelectField
+from sqlalchemy import or_, text
+from wtforms.validators import ValidationError
 
-from .models import User, Movie, Screen, Order, Comment, Favorite, Coupon
-from . import db
+from .models import User, Movie, Hall, Screen, Order, Comment, Favorite, Coupon
+from . import db, kv, search_index
 
 # 认证基类（保持不变）
 class AuthModelView(ModelView):
@@ -14,6 +17,101 @@ class AuthModelView(ModelView):
     def inaccessible_callback(self, name, **kwargs):
         return "<h1>403 Forbidden</h1>", 403
 
+
+# 关联字段的下拉搜索（form_ajax_refs）
+# Flask-Admin 默认的加载器对每个字段做 CAST(... AS VARCHAR) ILIKE '%词%'，无法使用索引；
+# 这里改为前缀匹配，电影则使用接口同样的进程内搜索索引。
+class PrefixAjaxModelLoader(QueryAjaxModelLoader):
+    """按前缀匹配（LIKE '词%'）搜索，可以使用列上的索引"""
+
+    def get_list(self, term, offset=0, limit=DEFAULT_PAGE_SIZE):
+        query = self.get_query().filter(
+            or_(*(field.startswith(term, autoescape=True) for field in self._cached_fields))
+        )
+        if self.order_by is not None:
+            query = query.order_by(self.order_by)
+        return query.offset(offset).limit(limit).all()
+
+
+class MovieAjaxModelLoader(QueryAjaxModelLoader):
+    """电影下拉搜索：先按片名前缀联想，再补充全文搜索结果"""
+
+    def __init__(self, name, session, **options):
+        super().__init__(name, session, Movie, fields=["name"], **options)
+
+    def get_list(self, term, offset=0, limit=DEFAULT_PAGE_SIZE):
+        search_index.sync()
+        offset = offset or 0  # ajax_lookup 未传 offset 时为 None
+        wanted = offset + limit
+        movie_ids = [movie_id for movie_id, _ in search_index.suggest(term, wanted)]
+        if len(movie_ids) < wanted:
+            movie_ids += [movie_id for movie_id in search_index.search(term, wanted) if movie_id not in movie_ids]
+        movie_ids = movie_ids[offset:wanted]
+        if not movie_ids:
+            return []
+        movies = {movie.id: movie for movie in self.get_query().filter(Movie.id.in_(movie_ids))}
+        return [movies[movie_id] for movie_id in movie_ids if movie_id in movies]
+
+
+def user_ajax_loader(name):
+    return PrefixAjaxModelLoader(name, db.session, User, fields=["username", "phone"])
+
+
+def movie_ajax_loader(name):
+    return MovieAjaxModelLoader(name, db.session)
+
+
+# 大表的列表页总数
+def estimate_row_count(table):
+    """返回数据库统计信息中的估算行数，不支持的数据库返回 None"""
+    dialect = db.engine.dialect.name
+    if dialect == "mysql":
+        return db.session.execute(
+            text("SELECT TABLE_ROWS FROM information_schema.TABLES "
+                 "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table"),
+            {"table": table},
+        ).scalar()
+    if dialect == "postgresql":
+        count = db.session.execute(
+            text("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:table)"), {"table": table}
+        ).scalar()
+        return count if count is not None and count >= 0 else None  # 从未 ANALYZE 时为 -1
+    return None
+
+
+class CachedCount:
+    """替代 get_count_query 返回的查询，get_list 只调用它的 scalar()"""
+
+    def __init__(self, table, exact_query):
+        self.table = table
+        self.exact_query = exact_query
+
+    def scalar(self):
+        key = f"admin:count:{self.table}"
+        cached = kv.get(key)
+        if cached is not None:
+            return int(cached)
+        count = estimate_row_count(self.table)
+        if count is None or count < current_app.config["ADMIN_EXACT_COUNT_THRESHOLD"]:
+            count = self.exact_query.scalar()
+        kv.set(key, count, ex=current_app.config["ADMIN_COUNT_CACHE_TTL"])
+        return count
+
+
+class LargeTableAdminView(AuthModelView):
+    """
+    订单、评论等大表的列表视图
+    未搜索、未筛选时不再对整张表执行 COUNT(*)：优先使用数据库的估算行数，结果在 kv 中缓存
+    ADMIN_COUNT_CACHE_TTL 秒，因此分页总数可能略有偏差；搜索或筛选时仍精确计数（条件通常能走索引）。
+    """
+
+    def get_count_query(self):
+        query = super().get_count_query()
+        if request.args.get("search") or any(name.startswith("flt") for name in request.args):
+            return query
+        return CachedCount(self.model.__tablename__, query)
+
+
 # 用户视图（保持不变）
 class UserAdminView(AuthModelView):
     column_exclude_list = ['password_hash']
@@ -21,26 +119,76 @@ class UserAdminView(AuthModelView):
     column_searchable_list = ['username', 'phone']
     column_filters = ['create_time']
 
-# 电影查询工厂，用于为下拉框提供选项
-def movie_query_factory():
-    return Movie.query
+# 电影视图：评分聚合由评论维护，不允许在表单中直接修改
+class MovieAdminView(AuthModelView):
+    form_excluded_columns = [
+        'rating_count', 'rating_sum', 'rating_1', 'rating_2', 'rating_3', 'rating_4', 'rating_5'
+    ]
 
-# 场次管理视图（关键修改）
+# 场次管理视图
 class ScreenAdminView(AuthModelView):
     column_list = ('movie', 'cinema_name', 'hall_name', 'start_time', 'price')
-    
-    # 使用 form_overrides 来自定义表单字段
-    form_overrides = {
-        'movie': QuerySelectField
+    # 列表中显示的电影随场次一起 JOIN 查询，避免每行一次查询
+    column_select_related_list = (Screen.movie,)
+    # 已售位图和版本号只能由订票接口修改（带版本号比较的原子更新），不在后台表单中编辑，
+    # 否则保存表单会写回加载时的版本号，绕过乐观锁
+    form_excluded_columns = ['seat_bitmap', 'seat_version']
+    # 电影较多，表单中改为输入片名搜索，不再一次加载全部电影
+    form_ajax_refs = {
+        'movie': movie_ajax_loader('movie'),
     }
-    
-    # 为自定义的 movie 字段提供参数
-    form_args = {
-        'movie': {
-            'label': 'Movie', # 字段标签
-            'query_factory': movie_query_factory, # 指定如何查询选项
-            'allow_blank': False # 不允许为空
-        }
+
+    def edit_form(self, obj=None):
+        form = super().edit_form(obj)
+        # 关联影厅的场次使用影厅的座位模板，旧版座位图字段不可编辑
+        if obj is not None and obj.hall_id is not None:
+            del form.seat_layout
+        return form
+
+    def on_model_change(self, form, model, is_created):
+        # 座位模板只能有一个来源，否则座位图与订票位图可能按不同的模板计算
+        if (model.hall is not None) == bool(model.seat_layout):
+            raise ValidationError("场次必须关联影厅或填写座位图，且只能二选一")
+
+# 订单管理视图
+class OrderAdminView(LargeTableAdminView):
+    column_list = ('order_number', 'user', 'screen', 'seats', 'total_price', 'status', 'create_time')
+    column_select_related_list = (Order.user, Order.screen)
+    column_searchable_list = ['order_number']
+    column_filters = ['status', 'create_time']
+    column_default_sort = ('id', True)
+    form_ajax_refs = {
+        'user': user_ajax_loader('user'),
+        'screen': PrefixAjaxModelLoader('screen', db.session, Screen, fields=['cinema_name'],
+                                        order_by=Screen.start_time.desc()),
+    }
+
+# 评论管理视图
+class CommentAdminView(LargeTableAdminView):
+    column_list = ('user', 'movie', 'content', 'rating', 'create_time')
+    column_select_related_list = (Comment.user, Comment.movie)
+    column_filters = ['rating', 'create_time']
+    column_default_sort = ('id', True)
+    form_ajax_refs = {
+        'user': user_ajax_loader('user'),
+        'movie': movie_ajax_loader('movie'),
+    }
+
+# 收藏管理视图
+class FavoriteAdminView(LargeTableAdminView):
+    column_list = ('user', 'movie', 'status')
+    column_select_related_list = (Favorite.user, Favorite.movie)
+    form_ajax_refs = {
+        'user': user_ajax_loader('user'),
+        'movie': movie_ajax_loader('movie'),
+    }
+
+# 优惠券管理视图
+class CouponAdminView(LargeTableAdminView):
+    column_list = ('user', 'name', 'discount', 'min_spend', 'expiry_date', 'is_used', 'is_expired')
+    column_select_related_list = (Coupon.user,)
+    form_ajax_refs = {
+        'user': user_ajax_loader('user'),
     }
 
 # 初始化 Admin 实例（保持不变）
@@ -48,9 +196,10 @@ admin = Admin(name='猿眼电影后台管理', template_mode='bootstrap4')
 
 # 注册所有视图
 admin.add_view(UserAdminView(User, db.session, name='用户管理'))
-admin.add_view(AuthModelView(Movie, db.session, name='电影管理'))
+admin.add_view(MovieAdminView(Movie, db.session, name='电影管理'))
+admin.add_view(AuthModelView(Hall, db.session, name='影厅管理'))
 admin.add_view(ScreenAdminView(Screen, db.session, name='场次管理'))
-admin.add_view(AuthModelView(Order, db.session, name='订单管理'))
-admin.add_view(AuthModelView(Comment, db.session, name='评论管理'))
-admin.add_view(AuthModelView(Favorite, db.session, name='收藏管理'))
-admin.add_view(AuthModelView(Coupon, db.session, name='优惠券管理'))
+admin.add_view(OrderAdminView(Order, db.session, name='订单管理'))
+admin.add_view(CommentAdminView(Comment, db.session, name='评论管理'))
+admin.add_view(FavoriteAdminView(Favorite, db.session, name='收藏管理'))
+admin.add_view(CouponAdminView(Coupon, db.session, name='优惠券管理'))
@@ -14,6 +14,7 @@ from .order import ns as order_ns
 from .comment import ns as comment_ns
 from .favorite import ns as favorite_ns
 from .coupon import ns as coupon_ns
+from .metrics import ns as metrics_ns
 
 api.add_namespace(user_ns, path='/users')
 api.add_namespace(session_ns, path='/session')
@@ -23,3 +24,4 @@ api.add_namespace(order_ns, path='/orders')
 api.add_namespace(comment_ns, path='/comments')
 api.add_namespace(favorite_ns, path='/favorites')
 api.add_namespace(coupon_ns, path='/coupons')
+api.add_namespace(metrics_ns, path='/metrics')
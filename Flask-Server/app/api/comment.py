@@ -1,7 +1,11 @@
-from flask_restx import Namespace, Resource, fields
+from datetime import datetime
+from flask_restx import Namespace, Resource, fields, marshal
 from flask_login import login_required, current_user
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import joinedload
 from ..models import Comment, Movie, User
-from .. import db
+from ..utils import decode_cursor, encode_cursor, resolve_page_size
+from .. import cache, db, hot_comments
 
 ns = Namespace('Comment', description='评论相关操作')
 
@@ -25,17 +29,102 @@ comment_create_model = ns.model('CommentCreateModel', {
     'rating': fields.Float(required=True, description='评分 (1-5)', min=1, max=5)
 })
 
+# 评论列表的查询参数
+comment_list_parser = ns.parser()
+comment_list_parser.add_argument('cursor', type=str, location='args', help='上一页响应头 X-Next-Cursor 的值')
+comment_list_parser.add_argument('limit', type=int, location='args', help='每页数量')
+comment_list_parser.add_argument(
+    'sort', type=str, choices=('time', 'rating'), default='time', location='args',
+    help='time: 按发表时间倒序；rating: 按评分从高到低（同分按发表时间倒序，不含未评分的评论）'
+)
+
+# 新增、修改或删除评论后，使该电影的评论列表和详情（评分聚合随之变化）缓存失效；
+# 电影列表中的评分在缓存过期（RESPONSE_CACHE_TTL）后更新，避免评论频繁时清空全部电影缓存
+cache.invalidate_on(Comment, lambda comment: [f"comments:movie:{comment.movie_id}", f"movie:{comment.movie_id}"])
+
+
+# 第一页热点缓存与列表接口使用相同的输出格式
+@hot_comments.serializer
+def serialize_comment(comment):
+    return marshal(comment, comment_model)
+
+
+def _parse_cursor(cursor, sort):
+    """解析游标，返回排序键；格式错误时返回 400"""
+    try:
+        if sort == 'rating':
+            rating, create_time, last_id = decode_cursor(cursor, 3)
+            return float(rating), datetime.fromisoformat(create_time), int(last_id)
+        create_time, last_id = decode_cursor(cursor, 2)
+        return datetime.fromisoformat(create_time), int(last_id)
+    except (TypeError, ValueError):
+        ns.abort(400, '无效的分页游标')
+
+
+def _comment_query(movie_id, sort, after=None):
+    """按 sort 排序的评论查询，after 为上一页最后一条的排序键"""
+    # 连表加载评论用户，避免序列化时逐条查询
+    query = Comment.query.options(joinedload(Comment.user)).filter(Comment.movie_id == movie_id)
+    if sort == 'rating':
+        # 使用 (movie_id, rating, create_time) 索引
+        query = query.filter(Comment.rating.isnot(None)).order_by(
+            Comment.rating.desc(), Comment.create_time.desc(), Comment.id.desc()
+        )
+        if after is not None:
+            rating, create_time, last_id = after
+            query = query.filter(or_(
+                Comment.rating < rating,
+                and_(Comment.rating == rating, Comment.create_time < create_time),
+                and_(Comment.rating == rating, Comment.create_time == create_time, Comment.id < last_id),
+            ))
+        return query
+    # 使用 (movie_id, create_time) 索引
+    query = query.order_by(Comment.create_time.desc(), Comment.id.desc())
+    if after is not None:
+        create_time, last_id = after
+        query = query.filter(or_(
+            Comment.create_time < create_time, and_(Comment.create_time == create_time, Comment.id < last_id)
+        ))
+    return query
+
+
 @ns.route('/movie/<int:movie_id>')
 @ns.param('movie_id', '电影ID')
 class MovieComments(Resource):
+    @cache.cached("comments:movie:{movie_id}")
     @ns.doc('get_movie_comments')
-    @ns.marshal_list_with(comment_model)
+    @ns.expect(comment_list_parser)
+    @ns.response(200, '成功，存在下一页时通过响应头 X-Next-Cursor 返回游标', [comment_model])
     def get(self, movie_id):
-        """获取某部电影的所有评论"""
-        movie = db.session.get(Movie, movie_id)
-        if not movie:
+        """获取某部电影的评论（游标分页）"""
+        args = comment_list_parser.parse_args()
+        limit = resolve_page_size(args['limit'])
+        sort = args['sort']
+        headers = {}
+
+        # 按时间排序的第一页走热点缓存，命中时不查询数据库
+        if sort == 'time' and not args['cursor'] and limit <= hot_comments.page_size:
+            def load(count):
+                if not db.session.get(Movie, movie_id):
+                    ns.abort(404, '电影未找到')
+                return _comment_query(movie_id, sort).limit(count).all()
+
+            items = hot_comments.first_page(movie_id, load)
+            if len(items) > limit:
+                headers['X-Next-Cursor'] = encode_cursor(*items[limit - 1][:2])
+            return [payload for _, _, payload in items[:limit]], 200, headers
+
+        if not db.session.get(Movie, movie_id):
             ns.abort(404, '电影未找到')
-        return movie.comments.order_by(Comment.create_time.desc()).all()
+        after = _parse_cursor(args['cursor'], sort) if args['cursor'] else None
+        # 多取一条用于判断是否还有下一页
+        comments = _comment_query(movie_id, sort, after).limit(limit + 1).all()
+        if len(comments) > limit:
+            comments = comments[:limit]
+            last = comments[-1]
+            keys = (last.create_time, last.id) if sort == 'time' else (last.rating, last.create_time, last.id)
+            headers['X-Next-Cursor'] = encode_cursor(*keys)
+        return marshal(comments, comment_model), 200, headers
 
     @login_required
     @ns.doc('add_movie_comment')
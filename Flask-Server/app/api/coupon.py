@@ -1,6 +1,7 @@
 from flask_restx import Namespace, Resource, fields
 from flask_login import login_required, current_user
 from ..models import Coupon
+from ..pricing import usable_coupons
 from .. import db
 
 # 创建命名空间，用于优惠券相关操作
@@ -25,6 +26,6 @@ class CouponList(Resource):
     @login_required  # 该接口需要用户登录才能访问
     @ns.marshal_list_with(coupon_model)  # 返回的数据按 coupon_model 模型序列化
     def get(self):
-        """获取当前用户的所有未使用优惠券"""
-        # 返回当前登录用户所有未使用的优惠券
-        return current_user.coupons.filter_by(is_used=False).all()
+        """获取当前用户的所有可用优惠券"""
+        # 未使用、未被清扫任务标记为过期，且未超过有效期（清扫任务尚未执行时按日期判断）
+        return usable_coupons(current_user.id).all()
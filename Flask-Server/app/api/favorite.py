@@ -1,5 +1,9 @@
+from flask import current_app
 from flask_restx import Namespace, Resource, fields
 from flask_login import login_required, current_user
+from sqlalchemy import literal, select
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlalchemy.orm import joinedload
 from ..models import Favorite, Movie
 from .. import db
 
@@ -22,6 +26,45 @@ favorite_model = ns.model('FavoriteModel', {
     'status': fields.Integer(description='1:想看, 2:已看')
 })
 
+# 批量查询收藏状态的参数
+favorite_status_parser = ns.parser()
+favorite_status_parser.add_argument('movie_ids', type=str, required=True, location='args',
+                                    help='电影ID，逗号分隔，例如 1,2,3')
+
+UPSERT_INSERTS = {
+    'mysql': mysql.insert,
+    'postgresql': postgresql.insert,
+    'sqlite': sqlite.insert,
+}
+
+
+def upsert_favorite(user_id, movie_id, status):
+    """
+    用一条 SQL 插入或更新收藏记录，依赖 (user_id, movie_id) 上的唯一索引保证并发下不会重复
+    INSERT ... SELECT 只在电影存在时插入，返回 False 表示电影不存在
+    """
+    insert = UPSERT_INSERTS.get(db.session.get_bind().dialect.name)
+    if insert is None:
+        # 其他数据库退回到先查后写
+        if not db.session.get(Movie, movie_id):
+            return False
+        fav = Favorite.query.filter_by(user_id=user_id, movie_id=movie_id).first()
+        if fav:
+            fav.status = status
+        else:
+            db.session.add(Favorite(user_id=user_id, movie_id=movie_id, status=status))
+        return True
+
+    stmt = insert(Favorite).from_select(
+        ['user_id', 'movie_id', 'status'],
+        select(literal(user_id), Movie.id, literal(status)).where(Movie.id == movie_id),
+    )
+    if insert is mysql.insert:
+        stmt = stmt.on_duplicate_key_update(status=stmt.inserted.status)
+    else:
+        stmt = stmt.on_conflict_do_update(index_elements=['user_id', 'movie_id'], set_={'status': stmt.excluded.status})
+    return db.session.execute(stmt).rowcount > 0
+
 @ns.route('/')
 class FavoriteList(Resource):
     @login_required
@@ -29,7 +72,8 @@ class FavoriteList(Resource):
     @ns.marshal_list_with(favorite_model)
     def get(self):
         """获取当前用户所有收藏/想看/已看记录"""
-        return current_user.favorites.all()
+        # 连表加载电影信息，避免序列化时逐条查询
+        return current_user.favorites.options(joinedload(Favorite.movie)).all()
 
     @login_required
     @ns.doc('add_or_update_favorite')
@@ -37,23 +81,9 @@ class FavoriteList(Resource):
     def post(self):
         """为当前用户添加或更新一条收藏/想看/已看记录"""
         data = ns.payload
-        movie_id = data['movie_id']
-        status = data['status']
-
-        if not db.session.get(Movie, movie_id):
+        if not upsert_favorite(current_user.id, data['movie_id'], data['status']):
+            db.session.rollback()
             ns.abort(404, '电影不存在')
-
-        # 查找是否已存在记录
-        fav = Favorite.query.filter_by(user_id=current_user.id, movie_id=movie_id).first()
-        
-        if fav:
-            # 如果存在，则更新状态
-            fav.status = status
-        else:
-            # 如果不存在，则创建新记录
-            fav = Favorite(user_id=current_user.id, movie_id=movie_id, status=status)
-            db.session.add(fav)
-        
         db.session.commit()
         return {'message': '操作成功'}, 201
 
@@ -73,6 +103,30 @@ class FavoriteItem(Resource):
         
         return '', 204
 
+@ns.route('/status')
+class FavoriteStatusBatch(Resource):
+    @login_required
+    @ns.doc('get_favorite_status_for_movies')
+    @ns.expect(favorite_status_parser)
+    def get(self):
+        """批量获取当前用户对多部电影的收藏状态，返回 {电影ID: 状态}，未收藏为 0"""
+        raw_ids = favorite_status_parser.parse_args()['movie_ids']
+        try:
+            movie_ids = {int(value) for value in raw_ids.split(',') if value.strip()}
+        except ValueError:
+            ns.abort(400, 'movie_ids 必须是逗号分隔的整数')
+        if len(movie_ids) > current_app.config['API_MAX_PAGE_SIZE']:
+            ns.abort(400, f"一次最多查询 {current_app.config['API_MAX_PAGE_SIZE']} 部电影")
+
+        statuses = dict.fromkeys(movie_ids, 0)
+        if movie_ids:
+            rows = db.session.execute(
+                select(Favorite.movie_id, Favorite.status)
+                .where(Favorite.user_id == current_user.id, Favorite.movie_id.in_(movie_ids))
+            )
+            statuses.update(rows.all())
+        return {str(movie_id): status for movie_id, status in sorted(statuses.items())}
+
 @ns.route('/status/<int:movie_id>')
 @ns.param('movie_id', '电影ID')
 class FavoriteStatus(Resource):
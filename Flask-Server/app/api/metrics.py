@@ -0,0 +1,32 @@
+import hmac
+from flask import Response, current_app, request
+from flask_restx import Namespace, Resource
+from flask_login import current_user
+from .. import metrics
+
+# 创建命名空间，用于运行指标
+ns = Namespace("Metrics", description="运行指标（仅管理员）")
+
+
+def is_admin_request():
+    """HTTP Basic 认证或已登录用户与配置中的 ADMIN 账号一致时视为管理员"""
+    username, password = current_app.config["ADMIN"]
+    if not username or not password:
+        return False  # 未配置管理员账号时一律拒绝
+    auth = request.authorization
+    if auth and auth.type == "basic":
+        return hmac.compare_digest(auth.username or "", username) and hmac.compare_digest(
+            auth.password or "", password
+        )
+    return current_user.is_authenticated and current_user.username == username
+
+
+@ns.route("/")
+class Metrics(Resource):
+    @ns.doc("get_metrics")  # API文档标识
+    @ns.response(401, "需要管理员认证")
+    def get(self):
+        """以 Prometheus 文本格式输出各接口的请求耗时、数据库耗时与 SQL 条数"""
+        if not is_admin_request():
+            return Response("需要管理员认证\n", 401, {"WWW-Authenticate": 'Basic realm="metrics"'})
+        return Response(metrics.render_prometheus(), content_type="text/plain; version=0.0.4; charset=utf-8")
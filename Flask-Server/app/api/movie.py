@@ -1,6 +1,10 @@
-from flask_restx import Namespace, Resource, fields
+from flask_restx import Namespace, Resource, fields, marshal
+from sqlalchemy import select
+from sqlalchemy.orm import load_only
 from ..models import Movie
-from .. import db
+from ..serializers import RowEncoder, fast_serializer_enabled
+from ..utils import decode_cursor, encode_cursor, resolve_page_size
+from .. import cache, db, search_index
 
 # 创建命名空间，用于电影相关操作
 ns = Namespace("Movie", description="电影相关操作")
@@ -15,21 +19,147 @@ movie_model = ns.model(
         "description": fields.String(),  # 电影简介
         "release_date": fields.Date(),  # 上映日期
         "duration_mins": fields.Integer(),  # 电影时长（分钟）
+        "rating_count": fields.Integer(),  # 评分人数
+        "rating_avg": fields.Float(),  # 平均评分，无人评分时为 null
+        "rating_histogram": fields.List(fields.Integer),  # 1-5 星的评论数
     },
 )
 
 
+# 电影被新增、修改或删除后，使电影相关的缓存失效（包括 Flask-Admin 后台的修改）；
+# 场次列表和排片查询中嵌套了电影名称等信息，也一并失效
+cache.invalidate_on(
+    Movie, lambda movie: ["movies", f"movie:{movie.id}", f"screens:movie:{movie.id}", "showtimes"]
+)
+
+# 电影列表的查询参数
+movie_list_parser = ns.parser()
+movie_list_parser.add_argument("cursor", type=str, location="args", help="上一页响应头 X-Next-Cursor 的值")
+movie_list_parser.add_argument("limit", type=int, location="args", help="每页数量")
+movie_list_parser.add_argument(
+    "fields", type=str, location="args", help="只返回指定字段，逗号分隔，例如 id,name,cover"
+)
+
+# 搜索参数
+movie_search_parser = ns.parser()
+movie_search_parser.add_argument("q", type=str, required=True, location="args", help="搜索关键词")
+movie_search_parser.add_argument(
+    "mode", type=str, choices=("ranked", "prefix"), default="ranked", location="args",
+    help="ranked: 按相关度搜索片名和简介；prefix: 片名联想，只返回 id 和 name",
+)
+movie_search_parser.add_argument("limit", type=int, location="args", help="返回数量")
+
+movie_suggestion_model = ns.model("MovieSuggestion", {"id": fields.Integer(), "name": fields.String()})
+
+
+# 由多个列计算得到的字段及其依赖的列
+COMPUTED_FIELD_COLUMNS = {
+    "rating_avg": [Movie.rating_sum, Movie.rating_count],
+    "rating_histogram": [getattr(Movie, f"rating_{star}") for star in range(1, 6)],
+}
+
+
+def select_movie_fields(raw_fields):
+    """根据 fields 参数裁剪 movie_model，返回 (字段定义, 需要加载的列)"""
+    if not raw_fields:
+        return movie_model, None
+    names = {name.strip() for name in raw_fields.split(",") if name.strip()}
+    unknown = names - set(movie_model)
+    if unknown:
+        ns.abort(400, f"未知字段: {', '.join(sorted(unknown))}")
+    selected = {name: field for name, field in movie_model.items() if name in names}
+    columns = []
+    for name in selected:
+        columns.extend(COMPUTED_FIELD_COLUMNS.get(name, [getattr(Movie, name)]))
+    return selected, columns
+
+
+# 字段组合 -> 快速序列化编码器
+_movie_encoders = {}
+
+
+def get_movie_encoder(selected):
+    """按字段组合获取（并缓存）电影列表的行编码器，总是额外查询 id 用于生成游标"""
+    key = tuple(selected)
+    encoder = _movie_encoders.get(key)
+    if encoder is None:
+        encoder = RowEncoder(selected, Movie, COMPUTED_FIELD_COLUMNS, extra_columns=[Movie.id])
+        _movie_encoders[key] = encoder
+    return encoder
+
+
 @ns.route("/")
 class MovieList(Resource):
-    @ns.marshal_list_with(movie_model)  # 返回的列表数据按 movie_model 模型序列化
+    @cache.cached("movies")
+    @ns.doc("list_movies")
+    @ns.expect(movie_list_parser)
+    @ns.response(200, "成功，存在下一页时通过响应头 X-Next-Cursor 返回游标", [movie_model])
     def get(self):
-        """获取电影列表"""
-        return Movie.query.all()  # 查询所有电影记录
+        """获取电影列表（按 ID 游标分页）"""
+        args = movie_list_parser.parse_args()
+        limit = resolve_page_size(args["limit"])
+        selected, columns = select_movie_fields(args["fields"])
+        last_id = None
+        if args["cursor"]:
+            try:
+                (last_id,) = decode_cursor(args["cursor"], 1)
+                last_id = int(last_id)
+            except (TypeError, ValueError):
+                ns.abort(400, "无效的分页游标")
+
+        if fast_serializer_enabled():
+            encoder = get_movie_encoder(selected)
+            statement = select(*encoder.columns).order_by(Movie.id.asc())
+            if last_id is not None:
+                statement = statement.where(Movie.id > last_id)
+            rows = db.session.execute(statement.limit(limit + 1)).all()
+            headers = {}
+            if len(rows) > limit:
+                rows = rows[:limit]
+                headers["X-Next-Cursor"] = encode_cursor(rows[-1].id)
+            return encoder.response(rows, headers=headers)
+
+        query = Movie.query.order_by(Movie.id.asc())
+        if columns is not None:
+            # 未选择的列（例如较长的 description）不从数据库读取
+            query = query.options(load_only(*columns))
+        if last_id is not None:
+            query = query.filter(Movie.id > last_id)
+
+        # 多取一条用于判断是否还有下一页
+        movies = query.limit(limit + 1).all()
+        headers = {}
+        if len(movies) > limit:
+            movies = movies[:limit]
+            headers["X-Next-Cursor"] = encode_cursor(movies[-1].id)
+        return marshal(movies, selected), 200, headers
+
+
+@ns.route("/search")
+class MovieSearch(Resource):
+    @ns.doc("search_movies")
+    @ns.expect(movie_search_parser)
+    @ns.response(200, "成功，prefix 模式返回 MovieSuggestion 列表", [movie_model])
+    def get(self):
+        """搜索电影（进程内倒排索引，支持中文）"""
+        args = movie_search_parser.parse_args()
+        limit = resolve_page_size(args["limit"])
+        search_index.sync()
+        if args["mode"] == "prefix":
+            suggestions = search_index.suggest(args["q"], limit)
+            return marshal([{"id": movie_id, "name": name} for movie_id, name in suggestions], movie_suggestion_model)
+
+        movie_ids = search_index.search(args["q"], limit)
+        if not movie_ids:
+            return []
+        movies = {movie.id: movie for movie in Movie.query.filter(Movie.id.in_(movie_ids))}
+        return marshal([movies[movie_id] for movie_id in movie_ids if movie_id in movies], movie_model)
 
 
 @ns.route("/<int:id>")
 @ns.param("id", "电影ID")  # 为接口文档添加参数说明
 class MovieResource(Resource):
+    @cache.cached("movies", "movie:{id}")
     @ns.marshal_with(movie_model)  # 返回的数据按 movie_model 模型序列化
     def get(self, id):
         """获取电影详情"""
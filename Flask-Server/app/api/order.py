@@ -1,8 +1,14 @@
-import uuid
-from flask_restx import Namespace, Resource, fields
+from flask import current_app
+from flask_restx import Namespace, Resource, fields, marshal
 from flask_login import login_required, current_user
-from sqlalchemy.orm.attributes import flag_modified
-from ..models import Order, Screen, User
+from sqlalchemy import update
+from sqlalchemy.orm import joinedload
+from ..models import Coupon, Order, Screen, User
+from ..idempotency import idempotent, record_response
+from ..pricing import CouponBook, apply_coupon, is_coupon_usable, price_seats, usable_coupons
+from ..seats import SeatBookingError, base_layout, layout_shape, parse_seat_labels, reserve_seats
+from ..seat_holds import publish_seat_changes, release_seats, seats_held_by_others
+from ..utils import generate_order_number
 from .. import db
 
 ns = Namespace("Order", description="订单相关操作")
@@ -49,7 +55,48 @@ order_create_model = ns.model(
     {
         "screen_id": fields.Integer(required=True, description="场次ID"),
         "seats": fields.String(required=True, description='例如: "5排3座,5排4座"'),
-        "total_price": fields.Float(required=True, description="订单总价"),
+        "total_price": fields.Float(description="客户端显示的订单总价，与服务端计价不一致时返回 409"),
+        "coupon_id": fields.Integer(description="使用的优惠券ID"),
+    },
+)
+
+# 报价：一次请求为多个候选的 场次/座位 组合计价，并为每个组合选出最优优惠券
+quote_item_model = ns.model(
+    "QuoteItemModel",
+    {
+        "screen_id": fields.Integer(required=True, description="场次ID"),
+        "seats": fields.String(required=True, description='例如: "5排3座,5排4座"'),
+    },
+)
+
+quote_request_model = ns.model(
+    "QuoteRequestModel",
+    {"items": fields.List(fields.Nested(quote_item_model), required=True, min_items=1)},
+)
+
+quote_coupon_model = ns.model(
+    "QuoteCouponModel",
+    {
+        "id": fields.Integer(),
+        "name": fields.String(),
+        "discount": fields.Float(),
+        "min_spend": fields.Float(),
+        "expiry_date": fields.Date(),
+    },
+)
+
+quote_model = ns.model(
+    "QuoteModel",
+    {
+        "screen_id": fields.Integer(),
+        "seats": fields.String(),
+        "error": fields.String(description="无法计价的原因，例如场次不存在或座位格式错误"),
+        "seat_count": fields.Integer(),
+        "unit_price": fields.Float(),
+        "subtotal": fields.Float(description="小计"),
+        "coupon": fields.Nested(quote_coupon_model, allow_null=True, description="最优优惠券，没有可用优惠券时为 null"),
+        "discount": fields.Float(description="优惠金额"),
+        "total": fields.Float(description="应付金额"),
     },
 )
 
@@ -61,10 +108,19 @@ class OrderList(Resource):
     @ns.marshal_list_with(order_detail_model)
     def get(self):
         """获取当前用户的所有订单"""
-        return current_user.orders.order_by(Order.create_time.desc()).all()
+        # 一次性连表加载场次和电影，避免序列化时每个订单再查询两次
+        return (
+            current_user.orders.options(joinedload(Order.screen).joinedload(Screen.movie))
+            .order_by(Order.create_time.desc())
+            .all()
+        )
 
     @login_required
+    @idempotent("orders")
     @ns.doc("create_new_order")
+    @ns.doc(params={"Idempotency-Key": {"in": "header", "type": "string", "description": "重试时携带相同的值，重复请求直接返回第一次的结果"}})
+    @ns.response(409, "座位已被预定，或相同 Idempotency-Key 的请求仍在处理中")
+    @ns.response(422, "Idempotency-Key 已用于内容不同的请求")
     @ns.expect(order_create_model, validate=True)
     @ns.marshal_with(order_detail_model, code=201)
     def post(self):
@@ -73,38 +129,108 @@ class OrderList(Resource):
         screen_id = data["screen_id"]
         seats_str = data["seats"]
 
-        screen = db.session.get(Screen, screen_id)
-        if not screen:
-            ns.abort(404, "场次不存在")
+        try:
+            selected_seats = parse_seat_labels(seats_str)
+        except ValueError:
+            ns.abort(400, f"座位格式错误: {seats_str}")
 
-        seat_layout = screen.seat_layout
-        if not seat_layout:
-            ns.abort(500, "该场次未配置座位图")
+        # 以版本号比较并交换的方式占座，避免并发请求重复售出同一座位
+        try:
+            screen = reserve_seats(screen_id, selected_seats)
+        except SeatBookingError as e:
+            ns.abort(e.code, e.message)
 
-        selected_seats_list = seats_str.split(",")
-        for seat in selected_seats_list:
-            try:
-                row_str, col_str = seat.replace("排", " ").replace("座", "").split()
-                row_index = int(row_str) - 1
-                col_index = int(col_str) - 1
-
-                if seat_layout[row_index][col_index] == 1:
-                    ns.abort(409, f"座位 {seat} 已被预定，请重新选择")
+        # 座位若被其他用户临时锁定则不能购买；本人的锁定在下单成功后转换为售出
+        cols = layout_shape(base_layout(screen))[1]
+        seat_indexes = [row_index * cols + col_index for _, row_index, col_index in selected_seats]
+        if seats_held_by_others(screen.id, seat_indexes, current_user.id):
+            db.session.rollback()
+            ns.abort(409, "所选座位已被其他用户锁定，请重新选择")
 
-                seat_layout[row_index][col_index] = 1
-            except (ValueError, IndexError):
-                ns.abort(400, f"座位格式错误: {seat}")
-
-        flag_modified(screen, "seat_layout")
+        # 金额由服务端按场次单价计算，客户端传入的金额只用于核对
+        subtotal = price_seats(screen, len({(row, col) for _, row, col in selected_seats}))
+        coupon = None
+        if data.get("coupon_id") is not None:
+            coupon = db.session.get(Coupon, data["coupon_id"])
+            if not is_coupon_usable(coupon, current_user.id, subtotal):
+                db.session.rollback()
+                ns.abort(409, "优惠券不可用")
+        _, total = apply_coupon(subtotal, coupon)
+        if data.get("total_price") is not None and abs(data["total_price"] - total) > 0.005:
+            db.session.rollback()
+            ns.abort(409, f"订单金额已变化，应付 {total:.2f} 元，请确认后重试")
+        if coupon is not None:
+            # 条件更新，避免同一张优惠券被并发的两个订单同时使用
+            claimed = db.session.execute(
+                update(Coupon)
+                .where(Coupon.id == coupon.id, Coupon.is_used == False)  # noqa: E712
+                .values(is_used=True)
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            if claimed != 1:
+                db.session.rollback()
+                ns.abort(409, "优惠券不可用")
 
         new_order = Order(
-            order_number=str(uuid.uuid4()),
+            order_number=generate_order_number(),
             user_id=current_user.id,
             screen_id=screen.id,
             seats=data["seats"],
-            total_price=data["total_price"],
+            total_price=total,
             status=1,  # 简化流程，直接标记为已支付/待观影
         )
         db.session.add(new_order)
         db.session.commit()
+        # 订单已提交，立即保存幂等响应，后续通知失败时重试也不会重复下单
+        record_response(marshal(new_order, order_detail_model), 201)
+        publish_seat_changes(screen.id, seat_indexes)
+        release_seats(screen.id, seat_indexes, current_user.id)
         return new_order, 201
+
+
+@ns.route("/quote")
+class OrderQuote(Resource):
+    @login_required
+    @ns.doc("quote_orders")
+    @ns.expect(quote_request_model, validate=True)
+    @ns.response(200, "成功", [quote_model])
+    def post(self):
+        """为多个候选的场次/座位组合计价，并分别选出折扣最大的可用优惠券"""
+        items = ns.payload["items"]
+        if len(items) > current_app.config["API_MAX_PAGE_SIZE"]:
+            ns.abort(400, f"一次最多报价 {current_app.config['API_MAX_PAGE_SIZE']} 个组合")
+
+        # 场次与优惠券各查询一次，与候选组合的数量无关
+        screen_ids = {item["screen_id"] for item in items}
+        screens = {
+            screen.id: screen
+            for screen in Screen.query.options(joinedload(Screen.hall)).filter(Screen.id.in_(screen_ids))
+        }
+        book = CouponBook(usable_coupons(current_user.id).all())
+
+        quotes = []
+        for item in items:
+            quote = {"screen_id": item["screen_id"], "seats": item["seats"]}
+            quotes.append(quote)
+            screen = screens.get(item["screen_id"])
+            if screen is None:
+                quote["error"] = "场次不存在"
+                continue
+            layout = base_layout(screen) or []
+            try:
+                positions = {(row, col) for _, row, col in parse_seat_labels(item["seats"])}
+            except ValueError:
+                quote["error"] = f"座位格式错误: {item['seats']}"
+                continue
+            if any(row >= len(layout) or col >= len(layout[row]) for row, col in positions):
+                quote["error"] = f"座位超出影厅范围: {item['seats']}"
+                continue
+
+            subtotal = price_seats(screen, len(positions))
+            coupon = book.best(subtotal)
+            discount, total = apply_coupon(subtotal, coupon)
+            quote.update(
+                seat_count=len(positions), unit_price=screen.price, subtotal=subtotal,
+                coupon=coupon, discount=discount, total=total,
+            )
+        return marshal(quotes, quote_model)
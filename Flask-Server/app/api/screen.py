@@ -1,6 +1,27 @@
-from flask_restx import Namespace, Resource, fields
+import base64
+import time
+from datetime import datetime
+from flask import current_app, request
+from flask_restx import Namespace, Resource, fields, inputs, marshal
+from flask_restx.representations import output_json
+from flask_login import login_required, current_user
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import defer, joinedload
 from ..models import Screen, Movie
-from .. import db
+from ..seats import (
+    SeatBookingError,
+    base_layout,
+    encode_runs,
+    is_seat_taken,
+    layout_shape,
+    load_sold_bitmap,
+    parse_seat_labels,
+    render_layout,
+    unavailable_bitmap,
+)
+from ..seat_holds import changed_seats, expire_holds, held_seats, hold_seats, release_user_holds, seat_map_version
+from ..utils import decode_cursor, encode_cursor, resolve_page_size
+from .. import cache, db
 
 # 创建命名空间，用于场次相关操作
 ns = Namespace("Screen", description="场次相关操作")
@@ -24,10 +45,131 @@ screen_model = ns.model(
     },
 )
 
+# 排片查询返回的电影信息
+movie_showtime_model = ns.model(
+    "MovieForShowtime",
+    {
+        "id": fields.Integer(description="电影ID"),
+        "name": fields.String(description="电影名称"),
+        "cover": fields.String(description="封面图片链接"),
+        "duration_mins": fields.Integer(description="电影时长（分钟）"),
+    },
+)
+
+showtime_model = ns.model(
+    "ShowtimeModel",
+    {
+        "id": fields.Integer(description="场次ID"),
+        "cinema_name": fields.String(description="影院名称"),
+        "hall_name": fields.String(description="影厅名称"),
+        "start_time": fields.DateTime(description="开始时间"),
+        "price": fields.Float(description="价格"),
+        "movie": fields.Nested(movie_showtime_model),
+    },
+)
+
+# 排片查询参数
+showtime_parser = ns.parser()
+showtime_parser.add_argument("cinema", type=str, required=True, location="args", help="影院名称")
+showtime_parser.add_argument("hall", type=str, location="args", help="影厅名称，不传则查询全部影厅")
+showtime_parser.add_argument(
+    "start", type=inputs.datetime_from_iso8601, location="args",
+    help="开始时间下限（ISO 8601），默认为当前时间（按 SHOWTIME_START_BUCKET 秒向下取整）",
+)
+showtime_parser.add_argument("end", type=inputs.datetime_from_iso8601, location="args", help="开始时间上限（不含）")
+showtime_parser.add_argument("cursor", type=str, location="args", help="上一页响应头 X-Next-Cursor 的值")
+showtime_parser.add_argument("limit", type=int, location="args", help="每页数量")
+
+# 场次被新增、修改或删除后，使对应电影的场次列表和排片查询的缓存失效
+cache.invalidate_on(Screen, lambda screen: [f"screens:movie:{screen.movie_id}", "showtimes"])
+
+
+def _default_start():
+    """
+    未传 start 时的开始时间下限：当前时间按 SHOWTIME_START_BUCKET 秒向下取整
+    同一时间段内的请求共用一个缓存条目，条目有效期不超过时间段长度，已开场的场次最多多显示一个时间段
+    """
+    bucket = current_app.config["SHOWTIME_START_BUCKET"]
+    return datetime.fromtimestamp(int(time.time()) // bucket * bucket)
+
+
+def _showtime_cache_key():
+    return None if request.args.get("start") else _default_start().isoformat()
+
+
+def _local_naive(value):
+    """带时区的时间转换为本地时间（场次时间按本地时间保存，不带时区）"""
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone().replace(tzinfo=None)
+    return value
+
+# 座位图查询参数
+seat_map_parser = ns.parser()
+seat_map_parser.add_argument(
+    "format", type=str, choices=("layout", "bitmap", "rle"), default="layout", location="args",
+    help="layout: 嵌套列表；bitmap: 按位压缩后 base64 编码（行优先，每字节低位在前，1 为不可选）；"
+    "rle: 行优先的游程编码，交替给出可选、不可选座位的个数",
+)
+seat_map_parser.add_argument(
+    "since", type=int, location="args",
+    help="上次响应中的 version：只返回此后变化的座位，没有变化时返回 304",
+)
+
+# 定义选座锁定的输入数据模型
+seat_hold_model = ns.model(
+    "SeatHoldModel",
+    {"seats": fields.String(required=True, description='例如: "5排3座,5排4座"')},
+)
+
+
+@ns.route("/")
+class Showtimes(Resource):
+    @cache.cached(
+        "showtimes", vary=_showtime_cache_key, ttl=lambda: current_app.config["SHOWTIME_START_BUCKET"]
+    )
+    @ns.doc("list_showtimes")
+    @ns.expect(showtime_parser)
+    @ns.response(200, "成功，存在下一页时通过响应头 X-Next-Cursor 返回游标", [showtime_model])
+    def get(self):
+        """按影院、影厅和时间段查询排片（按开始时间游标分页）"""
+        args = showtime_parser.parse_args()
+        limit = resolve_page_size(args["limit"])
+        start = _local_naive(args["start"]) or _default_start()
+        end = _local_naive(args["end"])
+
+        # 使用 (cinema_name, start_time) 索引做范围扫描，电影信息连表一次查出
+        query = (
+            Screen.query.options(joinedload(Screen.movie))
+            .filter(Screen.cinema_name == args["cinema"], Screen.start_time >= start)
+            .order_by(Screen.start_time.asc(), Screen.id.asc())
+        )
+        if end is not None:
+            query = query.filter(Screen.start_time < end)
+        if args["hall"]:
+            query = query.filter(Screen.hall_name == args["hall"])
+        if args["cursor"]:
+            try:
+                last_time, last_id = decode_cursor(args["cursor"], 2)
+                last_time, last_id = datetime.fromisoformat(last_time), int(last_id)
+            except (TypeError, ValueError):
+                ns.abort(400, "无效的分页游标")
+            query = query.filter(
+                or_(Screen.start_time > last_time, and_(Screen.start_time == last_time, Screen.id > last_id))
+            )
+
+        # 多取一条用于判断是否还有下一页
+        screens = query.limit(limit + 1).all()
+        headers = {}
+        if len(screens) > limit:
+            screens = screens[:limit]
+            headers["X-Next-Cursor"] = encode_cursor(screens[-1].start_time, screens[-1].id)
+        return marshal(screens, showtime_model), 200, headers
+
 
 @ns.route("/movie/<int:movie_id>")
 @ns.param("movie_id", "电影ID")
 class ScreensByMovie(Resource):
+    @cache.cached("screens", "screens:movie:{movie_id}")
     @ns.doc("list_screens_by_movie")  # API文档标识
     @ns.marshal_list_with(screen_model)  # 返回值序列化为 screen_model 列表
     def get(self, movie_id):
@@ -35,8 +177,8 @@ class ScreensByMovie(Resource):
         movie = db.session.get(Movie, movie_id)  # 根据主键查询电影
         if not movie:
             ns.abort(404, "电影未找到")  # 如果电影不存在，返回 404
-        # 返回该电影的所有场次，并按开始时间升序排列
-        return movie.screens.order_by(Screen.start_time.asc()).all()
+        # 返回该电影的所有场次，并按开始时间升序排列；连表加载电影信息供嵌套序列化使用
+        return movie.screens.options(joinedload(Screen.movie)).order_by(Screen.start_time.asc()).all()
 
 
 @ns.route("/<int:id>")
@@ -56,11 +198,20 @@ class ScreenResource(Resource):
 @ns.param("id", "场次ID")
 class ScreenSeats(Resource):
     @ns.doc("get_seat_layout")  # API文档标识
+    @ns.expect(seat_map_parser)
+    @ns.response(304, "座位图没有变化")
     def get(self, id):
-        """获取指定场次的座位图"""
-        screen = db.session.get(Screen, id)  # 根据主键查询场次
+        """
+        获取指定场次的座位图
+        完整座位图带有 version；携带 since 时返回 {"version", "changes": {"taken": [...], "free": [...]}}，
+        其中为座位下标 row * cols + col。since 过旧时返回完整座位图。
+        """
+        args = seat_map_parser.parse_args()
+        # 先确认场次存在，不存在的场次不创建锁定和版本号的 kv 键；已售位图延迟到读取版本号之后再加载
+        screen = db.session.get(Screen, id, options=[defer(Screen.seat_bitmap)])
+        layout = base_layout(screen) if screen else None
         # 如果场次不存在或没有座位图，返回默认座位布局
-        if not screen or not screen.seat_layout:
+        if not layout:
             default_layout = [
                 [0, 0, 0, 0, 0, 0, 0, 0, 0],
                 [0, 1, 0, 0, 1, 0, 0, 0, 0],
@@ -69,5 +220,88 @@ class ScreenSeats(Resource):
                 [0, 0, 0, 0, 0, 0, 0, 0, 0],
             ]
             return {"seat_layout": default_layout}  # 返回默认座位图
-        # 返回实际座位布局
-        return {"seat_layout": screen.seat_layout}
+        # 先读版本号再读座位状态：读到的状态不会比版本号旧，之后的变化会在下次增量查询时返回
+        expire_holds(id)
+        version, base = seat_map_version(id)
+        since = args["since"]
+        if since == version:
+            return "", 304
+        sold = load_sold_bitmap(screen, layout)
+        # 叠加其他用户正在锁定的座位（当前用户自己的锁定仍显示为可选）
+        viewer_id = current_user.id if current_user.is_authenticated else None
+        for index, holder in held_seats(id).items():
+            if holder != viewer_id and index < sold.rows * sold.cols:
+                sold.set(*divmod(index, sold.cols))
+
+        changes = changed_seats(id, since, version, base) if since is not None else None
+        if changes is not None:
+            unavailable = unavailable_bitmap(layout, sold)
+            taken, free = [], []
+            for index in changes:
+                if index < unavailable.rows * unavailable.cols:
+                    (taken if unavailable.is_set(*divmod(index, unavailable.cols)) else free).append(index)
+            return {"version": version, "changes": {"taken": taken, "free": free}}
+
+        if args["format"] == "layout":
+            # 合并影厅模板与已售位图，输出原有的 seat_layout 格式
+            data = {"version": version, "seat_layout": render_layout(layout, sold)}
+        else:
+            unavailable = unavailable_bitmap(layout, sold)
+            data = {"version": version, "rows": unavailable.rows, "cols": unavailable.cols}
+            if args["format"] == "bitmap":
+                data["seats"] = base64.b64encode(unavailable.to_bytes()).decode("ascii")
+            else:
+                data["runs"] = encode_runs(unavailable)
+
+        # 完整座位图按 版本号 + 查看者 + 格式 生成 ETag，没有变化时客户端可以用 If-None-Match 得到 304
+        response = output_json(data, 200)
+        response.mimetype = "application/json"
+        response.set_etag(f"{version}-{viewer_id or 0}-{args['format']}")
+        response.headers["Cache-Control"] = "no-cache"
+        return response.make_conditional(request)
+
+
+@ns.route("/<int:id>/holds")
+@ns.param("id", "场次ID")
+class ScreenHolds(Resource):
+    @login_required
+    @ns.doc("hold_seats")  # API文档标识
+    @ns.expect(seat_hold_model, validate=True)
+    def post(self, id):
+        """临时锁定选中的座位，锁定期内其他用户不可选，下单时转换为售出"""
+        screen = db.session.get(Screen, id)  # 根据主键查询场次
+        if not screen:
+            ns.abort(404, "场次未找到")
+        layout = base_layout(screen)
+        if not layout:
+            ns.abort(500, "该场次未配置座位图")
+        sold = load_sold_bitmap(screen, layout)
+        cols = layout_shape(layout)[1]
+
+        try:
+            selected_seats = parse_seat_labels(ns.payload["seats"])
+        except ValueError:
+            ns.abort(400, f"座位格式错误: {ns.payload['seats']}")
+
+        seats = []
+        for seat, row_index, col_index in selected_seats:
+            try:
+                if is_seat_taken(layout, sold, row_index, col_index):
+                    ns.abort(409, f"座位 {seat} 已被预定，请重新选择")
+            except IndexError:
+                ns.abort(400, f"座位格式错误: {seat}")
+            seats.append((seat, row_index * cols + col_index))
+
+        try:
+            ttl = hold_seats(id, seats, current_user.id)
+        except SeatBookingError as e:
+            ns.abort(e.code, e.message)
+        return {"seats": [seat for seat, _ in seats], "expires_in": ttl}, 201
+
+    @login_required
+    @ns.doc("release_seats")  # API文档标识
+    @ns.response(204, "释放成功")
+    def delete(self, id):
+        """释放当前用户在该场次锁定的所有座位"""
+        release_user_holds(id, current_user.id)
+        return "", 204
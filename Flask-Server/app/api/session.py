@@ -1,7 +1,8 @@
 from flask_restx import Namespace, Resource, fields
 from flask_login import login_user, logout_user, login_required, current_user
 from ..models import User
-from .. import db
+from ..hashing import PasswordHasherBusy
+from .. import db, hasher
 
 # 创建一个命名空间，用于会话管理相关接口
 ns = Namespace("Session", description="会话管理（登录/退出）")
@@ -37,10 +38,23 @@ class Login(Resource):
         user = User.query.filter_by(
             username=data["username"]
         ).first()  # 根据用户名查询用户
-        if user and user.verify_password(data["password"]):  # 验证密码是否正确
-            login_user(user, remember=True)  # 使用 flask_login 登录用户，记住登录状态
-            return user  # 返回用户信息
-        ns.abort(401, "用户名或密码错误")  # 登录失败，返回 401 错误
+        try:
+            verified = user is not None and user.verify_password(data["password"])  # 验证密码是否正确
+        except PasswordHasherBusy:
+            ns.abort(503, "登录人数过多，请稍后重试")
+        if not verified:
+            ns.abort(401, "用户名或密码错误")  # 登录失败，返回 401 错误
+
+        # 哈希参数已调整时，用本次登录的明文按新参数重新哈希；
+        # 进程池繁忙时跳过，下次登录再重新哈希，不影响本次登录
+        try:
+            if hasher.needs_rehash(user.password_hash):
+                user.password = data["password"]
+                db.session.commit()
+        except PasswordHasherBusy:
+            pass
+        login_user(user, remember=True)  # 使用 flask_login 登录用户，记住登录状态
+        return user  # 返回用户信息
 
 
 @ns.route("/logout")
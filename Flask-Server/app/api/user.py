@@ -1,5 +1,8 @@
-from flask_restx import Namespace, Resource, fields
+from flask_restx import Namespace, Resource, fields, marshal
+from sqlalchemy import select
 from ..models import User
+from ..hashing import PasswordHasherBusy
+from ..serializers import RowEncoder, fast_serializer_enabled
 from .. import db
 
 # 创建用户模块的命名空间
@@ -14,6 +17,9 @@ user_model = ns.model('UserModel', {
     'create_time': fields.DateTime(description='注册时间')
 })
 
+# 用户列表的快速序列化编码器，字段与 user_model 保持一致
+user_encoder = RowEncoder(user_model, User)
+
 # 用于创建用户的输入模型 (只包含必要的字段)
 user_create_model = ns.model('UserCreateModel', {
     'username': fields.String(required=True, description='用户名'),
@@ -24,10 +30,14 @@ user_create_model = ns.model('UserCreateModel', {
 @ns.route('/')
 class UserList(Resource):
     @ns.doc('list_users')
-    @ns.marshal_list_with(user_model)
+    @ns.response(200, '成功', [user_model])
     def get(self):
         """获取所有用户列表"""
-        return User.query.all()
+        if fast_serializer_enabled():
+            # 按列读取并分块流式输出，不构造 ORM 对象
+            rows = db.session.execute(select(*user_encoder.columns).execution_options(yield_per=1000))
+            return user_encoder.response(rows, stream=True)
+        return marshal(User.query.all(), user_model)
 
     @ns.doc('create_user')
     @ns.expect(user_create_model, validate=True)
@@ -40,11 +50,14 @@ class UserList(Resource):
         if User.query.filter_by(phone=data['phone']).first():
             ns.abort(409, f"手机号 '{data['phone']}' 已被注册")
             
-        new_user = User(
-            username=data['username'],
-            password=data['password'], # password setter 会自动处理哈希
-            phone=data['phone']
-        )
+        try:
+            new_user = User(
+                username=data['username'],
+                password=data['password'], # password setter 会自动处理哈希
+                phone=data['phone']
+            )
+        except PasswordHasherBusy:
+            ns.abort(503, "注册人数过多，请稍后重试")
         db.session.add(new_user)
         db.session.commit()
         return new_user, 201
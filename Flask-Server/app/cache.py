@@ -0,0 +1,196 @@
+"""
+HTTP 响应缓存
+
+用于读多写少的 GET 接口：按 路由 + 查询参数 + 标签版本号 缓存序列化后的 JSON 响应，
+并附带强 ETag，客户端携带 If-None-Match 时直接返回 304。
+
+失效采用“标签版本号”方式：每个缓存条目依赖若干标签（例如 "movies"、"comments:movie:1"），
+标签版本号保存在 kv 中（配置 Redis 时多个 worker 共享）。数据库中相关模型提交变更后
+（包括 Flask-Admin 后台修改和接口写入），版本号自增，旧条目自然不再命中并随 TTL/LRU 淘汰。
+"""
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import current_app, request
+from flask_restx.representations import output_json
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+
+class LRUCacheBackend:
+    """进程内 LRU 缓存，条目数超过上限时淘汰最久未使用的条目"""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (time.time() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class RedisCacheBackend:
+    """基于 kv（Redis）的缓存，条目以 JSON 保存并由 Redis 负责过期"""
+
+    def __init__(self, kv):
+        self.kv = kv
+
+    def get(self, key):
+        raw = self.kv.get(key)
+        return json.loads(raw) if raw else None
+
+    def set(self, key, value, ttl):
+        self.kv.set(key, json.dumps(value), ex=ttl)
+
+
+class ResponseCache:
+    """
+    响应缓存扩展，在模块级创建实例，在 create_app 中调用 init_app。
+    参数:
+        kv: 保存标签版本号（以及 redis 后端的缓存条目）的键值存储
+    用法:
+        @cache.cached("movies", "comments:movie:{movie_id}")
+    标签中的占位符使用视图函数的 URL 参数填充。
+    """
+
+    def __init__(self, kv):
+        self.kv = kv
+        self.backend = None
+        self._invalidators = []
+        # 在 SQLAlchemy 会话提交后统一使相关缓存失效，回滚时丢弃
+        event.listen(Session, "before_flush", self._before_flush)
+        event.listen(Session, "after_commit", self._after_commit)
+        event.listen(Session, "after_rollback", self._after_rollback)
+
+    def init_app(self, app):
+        backend = app.config["RESPONSE_CACHE_BACKEND"]
+        if backend == "redis":
+            self.backend = RedisCacheBackend(self.kv)
+        else:
+            self.backend = LRUCacheBackend(app.config["RESPONSE_CACHE_MAX_ENTRIES"])
+        app.extensions["response_cache"] = self
+
+    # --- 标签版本号 ---
+    @staticmethod
+    def _generation_key(tag):
+        return f"cache_gen:{tag}"
+
+    def invalidate(self, *tags):
+        """使依赖这些标签的缓存条目全部失效"""
+        for tag in tags:
+            self.kv.incr(self._generation_key(tag))
+
+    def invalidate_on(self, model, tags):
+        """
+        注册失效规则：model 的实例被新增/修改/删除并提交后，使 tags(obj) 返回的标签失效
+        """
+        self._invalidators.append((model, tags))
+
+    def _before_flush(self, session, flush_context, instances):
+        if not self._invalidators:
+            return
+        tags = session.info.setdefault("response_cache_tags", set())
+        dirty = [obj for obj in session.dirty if session.is_modified(obj)]
+        for obj in list(session.new) + dirty + list(session.deleted):
+            for model, tag_fn in self._invalidators:
+                if isinstance(obj, model):
+                    tags.update(tag_fn(obj))
+
+    def _after_commit(self, session):
+        tags = session.info.pop("response_cache_tags", None)
+        if tags:
+            self.invalidate(*tags)
+
+    def _after_rollback(self, session):
+        session.info.pop("response_cache_tags", None)
+
+    # --- 装饰器 ---
+    def cached(self, *tags, vary=None, ttl=None):
+        """
+        参数:
+            tags: 缓存条目依赖的标签
+            vary: 可选，返回额外缓存键的函数，例如依赖当前时间的响应按时间段区分
+            ttl: 可选，返回条目有效期（秒）的函数，不超过 RESPONSE_CACHE_TTL
+        """
+
+        def decorator(f):
+            @wraps(f)
+            def wrapper(*args, **kwargs):
+                if not current_app.config["RESPONSE_CACHE_ENABLED"]:
+                    return f(*args, **kwargs)
+
+                tag_names = [tag.format(**kwargs) for tag in tags]
+                generations = self.kv.mget([self._generation_key(tag) for tag in tag_names]) if tag_names else []
+                raw_key = json.dumps(
+                    [request.path, sorted(request.args.items(multi=True)), generations, vary() if vary else None],
+                    separators=(",", ":"),
+                )
+                key = "resp:" + hashlib.sha1(raw_key.encode("utf-8")).hexdigest()
+
+                entry = self.backend.get(key)
+                if entry is None:
+                    rv = f(*args, **kwargs)
+                    if isinstance(rv, current_app.response_class):
+                        # 视图自行生成的响应（例如快速序列化），流式响应无法缓存
+                        if rv.status_code != 200 or rv.is_streamed:
+                            return rv
+                        body = rv.get_data(as_text=True)
+                        headers = {
+                            name: value for name, value in rv.headers.items()
+                            if name not in ("Content-Type", "Content-Length")
+                        }
+                    else:
+                        data, code, headers = _unpack(rv)
+                        if code != 200:
+                            return rv
+                        body = output_json(data, code, headers).get_data(as_text=True)
+                    entry = {
+                        "etag": hashlib.sha256(body.encode("utf-8")).hexdigest()[:32],
+                        "body": body,
+                        "headers": dict(headers or {}),
+                    }
+                    max_ttl = current_app.config["RESPONSE_CACHE_TTL"]
+                    self.backend.set(key, entry, min(ttl(), max_ttl) if ttl else max_ttl)
+
+                response = current_app.response_class(
+                    entry["body"], mimetype="application/json", headers=entry["headers"]
+                )
+                response.set_etag(entry["etag"])
+                # 允许浏览器缓存，但每次都需要携带 If-None-Match 重新验证
+                response.headers["Cache-Control"] = "no-cache"
+                return response.make_conditional(request)
+
+            return wrapper
+
+        return decorator
+
+
+def _unpack(rv):
+    """拆分视图返回值为 (data, code, headers)"""
+    if isinstance(rv, tuple):
+        if len(rv) == 3:
+            return rv
+        if len(rv) == 2:
+            return rv[0], rv[1], {}
+    return rv, 200, {}
+
@@ -0,0 +1,117 @@
+"""
+密码哈希进程池
+
+scrypt/pbkdf2 是刻意设计的 CPU 密集运算，在 gevent worker 中直接计算会阻塞该进程内的所有协程。
+这里把哈希和校验交给一个有界进程池执行：
+- 同时在执行和排队的任务数不超过 PASSWORD_HASH_WORKERS + PASSWORD_HASH_QUEUE，超出时立即拒绝；
+- 等待结果超过 PASSWORD_HASH_TIMEOUT 秒也视为繁忙；
+两种情况都抛出 PasswordHasherBusy，由接口返回 503，而不是让请求无限堆积。
+子进程异常退出（被 OOM 杀掉、启动失败等）会使整个进程池不可用，此时丢弃旧进程池，
+提交时出错则在新进程池中重试一次，等待结果时出错则同样返回繁忙，下一次调用使用新进程池。
+PASSWORD_HASH_WORKERS 为 0 时在当前进程内直接计算（开发环境、脚本中使用）。
+"""
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import get_context
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+
+class PasswordHasherBusy(Exception):
+    """进程池已满或等待超时"""
+
+
+def _generate(password, method, salt_length):
+    return generate_password_hash(password, method=method, salt_length=salt_length)
+
+
+def _check(pwhash, password):
+    return check_password_hash(pwhash, password)
+
+
+class PasswordHasher:
+    """密码哈希扩展，在模块级创建实例，在 create_app 中调用 init_app"""
+
+    def __init__(self):
+        self.method = "scrypt"
+        self.salt_length = 16
+        self.workers = 0
+        self.timeout = None
+        self._slots = None
+        self._executor = None
+        self._pid = None
+        self._prefix = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.method = app.config["PASSWORD_HASH_METHOD"]
+        self.salt_length = app.config["PASSWORD_HASH_SALT_LENGTH"]
+        self.workers = app.config["PASSWORD_HASH_WORKERS"]
+        self.timeout = app.config["PASSWORD_HASH_TIMEOUT"]
+        self._slots = threading.BoundedSemaphore(self.workers + app.config["PASSWORD_HASH_QUEUE"])
+        self._prefix = None
+        app.extensions["password_hasher"] = self
+
+    def _get_executor(self):
+        # gunicorn fork 出 worker 后各自创建进程池；使用 spawn 避免子进程继承 gevent 的运行状态
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=get_context("spawn"))
+                self._pid = os.getpid()
+            return self._executor
+
+    def _discard(self, executor):
+        """丢弃已损坏的进程池，下次调用 _get_executor 时重新创建"""
+        with self._lock:
+            if self._executor is executor:
+                executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    def _submit(self, fn, *args):
+        """提交任务，返回 (进程池, future)；进程池已损坏时换新的进程池重试一次"""
+        for _ in range(2):
+            executor = self._get_executor()
+            try:
+                return executor, executor.submit(fn, *args)
+            except BrokenProcessPool:
+                self._discard(executor)
+        raise PasswordHasherBusy("密码服务不可用")
+
+    def _run(self, fn, *args):
+        if not self.workers:
+            return fn(*args)
+        if not self._slots.acquire(blocking=False):
+            raise PasswordHasherBusy("密码服务繁忙")
+        try:
+            executor, future = self._submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        # 超时返回后任务仍在进程池中执行，直到完成才释放名额
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            future.cancel()
+            raise PasswordHasherBusy("密码服务超时")
+        except BrokenProcessPool:
+            self._discard(executor)
+            raise PasswordHasherBusy("密码服务不可用")
+
+    def hash(self, password):
+        """按当前配置生成密码哈希"""
+        return self._run(_generate, password, self.method, self.salt_length)
+
+    def verify(self, pwhash, password):
+        """校验密码"""
+        return self._run(_check, pwhash, password)
+
+    def needs_rehash(self, pwhash):
+        """哈希算法或参数与当前配置不一致时返回 True"""
+        if self._prefix is None:
+            # werkzeug 会补全默认参数（如 scrypt -> scrypt:32768:8:1），以实际生成的前缀为准
+            self._prefix = self.hash("").split("$", 1)[0]
+        parts = pwhash.split("$", 2)
+        return len(parts) != 3 or parts[0] != self._prefix or len(parts[1]) != self.salt_length
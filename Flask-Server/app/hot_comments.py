@@ -0,0 +1,118 @@
+"""
+电影评论第一页的热点缓存
+
+电影详情页打开时只请求评论列表的第一页（按发表时间倒序），热门电影被频繁评论，
+响应缓存每次新增评论都会失效。这里在 kv 中为每部电影单独保存第一页（多保存一条用于判断是否有下一页），
+新增评论提交后直接插入到缓存的页中并截断，不需要重新查询；修改或删除评论时使缓存失效，下次读取时重建。
+
+一致性：每部电影在 kv 中有一个版本号，缓存的页记录生成它时的版本号，只有两者相等时才有效。
+新增评论先把版本号加一，只有缓存的页恰好是上一个版本时才原地更新，否则（缓存不存在、并发写入、
+读取方正在重建）保持失效，由下一次读取重建。因此并发时最多多查询一次数据库，不会返回缺少评论的页。
+"""
+import json
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+
+def _sort_key(comment):
+    return comment.create_time.isoformat(timespec="microseconds"), comment.id
+
+
+class HotCommentCache:
+    """评论热点缓存扩展，在模块级创建实例，在 create_app 中调用 init_app"""
+
+    def __init__(self, kv):
+        self.kv = kv
+        self.page_size = 20
+        self.ttl = 3600
+        self._serialize = None
+        event.listen(Session, "after_flush", self._after_flush)
+        event.listen(Session, "after_flush_postexec", self._after_flush_postexec)
+        event.listen(Session, "after_commit", self._after_commit)
+        event.listen(Session, "after_rollback", self._after_rollback)
+
+    def init_app(self, app):
+        self.page_size = app.config["COMMENT_HOT_PAGE_SIZE"]
+        self.ttl = app.config["COMMENT_HOT_TTL"]
+        app.extensions["hot_comments"] = self
+
+    def serializer(self, f):
+        """注册把 Comment 转换为响应字典的函数（与列表接口的输出模型一致），用作装饰器"""
+        self._serialize = f
+        return f
+
+    @staticmethod
+    def _keys(movie_id):
+        return f"comments:hot:{movie_id}:version", f"comments:hot:{movie_id}"
+
+    def first_page(self, movie_id, load):
+        """
+        返回第一页，最多 page_size + 1 条，每条为 [发表时间, 评论ID, 响应字典]
+        参数:
+            load: 缓存失效时调用 load(count)，按发表时间倒序返回最多 count 条 Comment
+        """
+        version_key, page_key = self._keys(movie_id)
+        version, raw = self.kv.mget([version_key, page_key])
+        version = int(version or 0)
+        if raw:
+            page = json.loads(raw)
+            if page["version"] == version:
+                return page["items"]
+        items = [[*_sort_key(comment), self._serialize(comment)] for comment in load(self.page_size + 1)]
+        self.kv.set(page_key, json.dumps({"version": version, "items": items}), ex=self.ttl)
+        return items
+
+    def invalidate(self, movie_id):
+        self.kv.incr(self._keys(movie_id)[0])
+
+    def _insert(self, movie_id, item):
+        version_key, page_key = self._keys(movie_id)
+        version = self.kv.incr(version_key)
+        raw = self.kv.get(page_key)
+        page = json.loads(raw) if raw else None
+        if page is None or page["version"] != version - 1:
+            return
+        items = [existing for existing in page["items"] if existing[1] != item[1]]
+        items.append(item)
+        items.sort(key=lambda existing: (existing[0], existing[1]), reverse=True)
+        page = {"version": version, "items": items[: self.page_size + 1]}
+        self.kv.set(page_key, json.dumps(page), ex=self.ttl)
+
+    # --- 会话事件：flush 时记录，提交后更新缓存，回滚时丢弃 ---
+    def _after_flush(self, session, flush_context):
+        from .models import Comment
+
+        new = [obj for obj in session.new if isinstance(obj, Comment)]
+        changed = {
+            obj.movie_id for obj in list(session.dirty) + list(session.deleted) if isinstance(obj, Comment)
+        }
+        if self._serialize is None:
+            changed.update(obj.movie_id for obj in new)
+        elif new:
+            session.info.setdefault("hot_comments_new", []).extend(new)
+        if changed:
+            session.info.setdefault("hot_comments_changed", set()).update(changed)
+
+    def _after_flush_postexec(self, session, flush_context):
+        # 新评论此时已是持久化状态（ID 和发表时间已生成，关联的用户可以加载），在提交前完成序列化，
+        # 避免提交后重新加载
+        new = session.info.pop("hot_comments_new", None)
+        if new:
+            session.info.setdefault("hot_comments_added", []).extend(
+                (obj.movie_id, [*_sort_key(obj), self._serialize(obj)]) for obj in new
+            )
+
+    def _after_commit(self, session):
+        added = session.info.pop("hot_comments_added", None) or []
+        changed = session.info.pop("hot_comments_changed", None) or set()
+        for movie_id in changed:
+            self.invalidate(movie_id)
+        for movie_id, item in added:
+            if movie_id not in changed:
+                self._insert(movie_id, item)
+
+    def _after_rollback(self, session):
+        session.info.pop("hot_comments_new", None)
+        session.info.pop("hot_comments_added", None)
+        session.info.pop("hot_comments_changed", None)
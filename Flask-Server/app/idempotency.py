@@ -0,0 +1,125 @@
+"""
+写接口的幂等键（Idempotency-Key）
+
+客户端超时后重试下单时，在请求头中携带同一个 Idempotency-Key：
+- 第一次请求在 kv 中以 SET NX 写入“处理中”标记，处理成功后把响应（状态码与响应体）保存 IDEMPOTENCY_TTL 秒；
+- 重复请求直接重放保存的响应（响应头 Idempotent-Replayed: true），不会再次校验、占用座位；
+- 第一次请求仍在处理中时返回 409，客户端稍后重试即可；
+- 同一个键配合不同的请求体使用时返回 422；
+- 处理失败（非 2xx 或异常）且没有提交过事务时删除标记，允许客户端用同一个键重试；
+- 视图在提交后立即调用 record_response 保存响应，提交之后的步骤抛出异常时重试仍重放该响应，不会重复下单；
+  未调用 record_response 的视图提交后出错时保存“已提交”标记，重复请求返回 409，不再执行。
+键按用户隔离。kv 未配置 Redis 时使用进程内实现，只在单个 worker 内生效。
+"""
+import hashlib
+import json
+from functools import wraps
+
+from flask import current_app, g, has_request_context, request
+from flask_login import current_user
+from flask_restx import abort
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from . import kv
+
+HEADER = "Idempotency-Key"
+MAX_KEY_LENGTH = 128
+
+
+def _fingerprint():
+    body = request.get_json(silent=True)
+    raw = json.dumps(body, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(f"{request.method} {request.path} {raw}".encode("utf-8")).hexdigest()
+
+
+def _unpack(rv):
+    """拆分视图返回值为 (data, code)"""
+    if isinstance(rv, tuple):
+        return rv[0], rv[1] if len(rv) > 1 else 200
+    return rv, 200
+
+
+def _save(context, state, status=None, body=None):
+    record = {"state": state, "fingerprint": context["fingerprint"], "status": status, "body": body}
+    kv.set(context["key"], json.dumps(record), ex=current_app.config["IDEMPOTENCY_TTL"])
+
+
+def record_response(data, status=200):
+    """
+    在视图提交事务后立即保存响应，之后的步骤即使抛出异常，重复请求也会重放这个响应
+    参数:
+        data: 已序列化的响应体（与视图最终输出一致）
+        status: 状态码
+    """
+    context = g.get("idempotency")
+    if context is None:
+        return
+    _save(context, "done", status, data)
+    context["recorded"] = True
+
+
+def _after_commit(session):
+    if has_request_context() and g.get("idempotency") is not None:
+        g.idempotency["committed"] = True
+
+
+event.listen(Session, "after_commit", _after_commit)
+
+
+def idempotent(scope):
+    """
+    使视图支持 Idempotency-Key 请求头，需放在 login_required 之下
+    参数:
+        scope: 键的命名空间，例如 "orders"
+    """
+
+    def decorator(f):
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            key = request.headers.get(HEADER)
+            if not key:
+                return f(*args, **kwargs)
+            if len(key) > MAX_KEY_LENGTH:
+                abort(400, f"{HEADER} 长度不能超过 {MAX_KEY_LENGTH}")
+
+            storage_key = f"idempotency:{scope}:{current_user.id}:{hashlib.sha1(key.encode('utf-8')).hexdigest()}"
+            fingerprint = _fingerprint()
+            pending = json.dumps({"state": "pending", "fingerprint": fingerprint})
+            if not kv.set(storage_key, pending, ex=current_app.config["IDEMPOTENCY_LOCK_TTL"], nx=True):
+                raw = kv.get(storage_key)
+                record = json.loads(raw) if raw else None
+                if record is None:
+                    abort(409, "请求正在处理中，请稍后重试")
+                if record["fingerprint"] != fingerprint:
+                    abort(422, f"{HEADER} 已用于内容不同的请求")
+                if record["state"] == "pending":
+                    abort(409, "请求正在处理中，请稍后重试")
+                if record["state"] == "committed":
+                    abort(409, "请求已处理，但结果未能保存，请查询后再操作")
+                return record["body"], record["status"], {"Idempotent-Replayed": "true"}
+
+            context = g.idempotency = {
+                "key": storage_key, "fingerprint": fingerprint, "committed": False, "recorded": False,
+            }
+            try:
+                rv = f(*args, **kwargs)
+            except BaseException:
+                # 已经提交过事务时保留记录，避免客户端重试时再次执行
+                if not context["committed"]:
+                    kv.delete(storage_key)
+                elif not context["recorded"]:
+                    _save(context, "committed")
+                raise
+            finally:
+                g.pop("idempotency", None)
+            data, code = _unpack(rv)
+            if 200 <= code < 300 or context["committed"]:
+                _save(context, "done", code, data)
+            else:
+                kv.delete(storage_key)
+            return rv
+
+        return wrapper
+
+    return decorator
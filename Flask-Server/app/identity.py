@@ -0,0 +1,160 @@
+"""
+登录用户身份缓存
+
+Flask-Login 在每个已登录请求中调用 load_user，原本每次都按主键查询 users 表。
+这里在进程内按 LRU + TTL 缓存用户的常用列（不含 password_hash），命中时用缓存的列值构造实例，
+通过 make_transient_to_detached + session.merge(load=False) 挂到当前会话上，不发出任何 SQL；
+未缓存的列（例如 password_hash）在首次访问时再从数据库加载，orders 等关系也照常可用。
+
+失效：通过 ORM 修改或删除用户（包括 Flask-Admin 的 UserAdminView）提交后，立即从本进程缓存中删除，
+并把用户ID写入 kv 中的变更日志；其他 worker 每隔 IDENTITY_CACHE_SYNC_INTERVAL 秒检查一次版本号并删除对应条目。
+即使变更日志丢失，条目也最多保留 IDENTITY_CACHE_TTL 秒。命中/未命中次数通过 /api/metrics/ 输出。
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session, make_transient_to_detached
+
+
+class UserIdentityCache:
+    """用户身份缓存扩展，在模块级创建实例，在 create_app 中调用 init_app"""
+
+    VERSION_KEY = "identity:users:version"
+    CHANGES_KEY = "identity:users:changes"
+    # current_user 实际用到的列
+    FIELDS = ("id", "username", "phone", "avatar", "create_time")
+
+    def __init__(self, kv):
+        self.kv = kv
+        self.max_entries = 10000
+        self.ttl = 60
+        self.sync_interval = 1.0
+        self.changelog_size = 10000
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # 用户ID -> (过期时间, 列值)
+        self._lock = threading.Lock()
+        self._version = None
+        self._checked_at = 0.0
+        # 与响应缓存相同：flush 时记录变更的用户，提交后失效，回滚时丢弃
+        event.listen(Session, "after_flush", self._after_flush)
+        event.listen(Session, "after_commit", self._after_commit)
+        event.listen(Session, "after_rollback", self._after_rollback)
+
+    def init_app(self, app):
+        self.max_entries = app.config["IDENTITY_CACHE_MAX_ENTRIES"]
+        self.ttl = app.config["IDENTITY_CACHE_TTL"]
+        self.sync_interval = app.config["IDENTITY_CACHE_SYNC_INTERVAL"]
+        app.extensions["identity_cache"] = self
+
+    # --- 加载 ---
+    def load(self, session, user_id):
+        """返回挂在 session 上的用户实例，用户不存在时返回 None"""
+        from .models import User
+
+        if not self.max_entries or not self.ttl:
+            return session.get(User, user_id)
+        # 当前会话中已有该用户时直接使用
+        user = session.identity_map.get(session.identity_key(User, user_id))
+        if user is not None:
+            return user
+
+        self._sync()
+        fields = self._get(user_id)
+        if fields is None:
+            row = session.execute(
+                select(*(getattr(User, name) for name in self.FIELDS)).where(User.id == user_id)
+            ).first()
+            if row is None:
+                return None
+            fields = row._asdict()
+            self._set(user_id, fields)
+
+        user = User(**fields)
+        make_transient_to_detached(user)
+        return session.merge(user, load=False)
+
+    def _get(self, user_id):
+        with self._lock:
+            item = self._entries.get(user_id)
+            if item is not None and item[0] > time.monotonic():
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+                return item[1]
+            self._entries.pop(user_id, None)
+            self.misses += 1
+            return None
+
+    def _set(self, user_id, fields):
+        with self._lock:
+            self._entries[user_id] = (time.monotonic() + self.ttl, fields)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, *user_ids):
+        """从本进程缓存中删除用户"""
+        with self._lock:
+            for user_id in user_ids:
+                self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    # --- 多进程同步 ---
+    def _publish(self, user_ids):
+        version = self.kv.incr(self.VERSION_KEY)
+        self.kv.zadd(self.CHANGES_KEY, {str(user_id): version for user_id in user_ids})
+        self.kv.zremrangebyscore(self.CHANGES_KEY, "-inf", version - self.changelog_size)
+
+    def _sync(self):
+        """应用其他 worker 发布的用户变更"""
+        now = time.monotonic()
+        if now - self._checked_at < self.sync_interval:
+            return
+        self._checked_at = now
+        version = int(self.kv.get(self.VERSION_KEY) or 0)
+        if self._version is None or version < self._version or version - self._version > self.changelog_size:
+            # 首次同步、kv 数据丢失或落后太多时清空缓存
+            self.clear()
+        elif version > self._version:
+            changed = self.kv.zrangebyscore(self.CHANGES_KEY, self._version + 1, "+inf")
+            self.invalidate(*(int(member) for member in changed))
+        self._version = version
+
+    def _after_flush(self, session, flush_context):
+        from .models import User
+
+        changed = {
+            obj.id for obj in list(session.dirty) + list(session.deleted)
+            if isinstance(obj, User) and obj.id is not None
+        }
+        if changed:
+            session.info.setdefault("identity_cache_users", set()).update(changed)
+
+    def _after_commit(self, session):
+        user_ids = session.info.pop("identity_cache_users", None)
+        if user_ids:
+            self.invalidate(*user_ids)
+            self._publish(user_ids)
+
+    def _after_rollback(self, session):
+        session.info.pop("identity_cache_users", None)
+
+    # --- 指标 ---
+    def prometheus_lines(self):
+        """供 RequestMetrics.add_collector 使用"""
+        pid = os.getpid()
+        return [
+            "# HELP monkeyeye_identity_cache_requests_total 用户身份缓存的查询次数",
+            "# TYPE monkeyeye_identity_cache_requests_total counter",
+            f'monkeyeye_identity_cache_requests_total{{result="hit",pid="{pid}"}} {self.hits}',
+            f'monkeyeye_identity_cache_requests_total{{result="miss",pid="{pid}"}} {self.misses}',
+            "# HELP monkeyeye_identity_cache_entries 用户身份缓存的条目数",
+            "# TYPE monkeyeye_identity_cache_entries gauge",
+            f'monkeyeye_identity_cache_entries{{pid="{pid}"}} {len(self._entries)}',
+        ]
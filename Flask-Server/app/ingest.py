@@ -0,0 +1,232 @@
+"""
+电影目录批量导入
+
+流式读取 seed_data.json 中的 movies 数组（不把整个文件读入内存），
+按批次用一次 IN 查询判断哪些电影已存在，新电影批量插入，内容有变化的电影批量更新。
+每条记录计算内容哈希并保存在 Movie.content_hash 中，重复导入时未变化的记录不会产生写入。
+content_hash 为空的旧记录（加入该列之前导入的）逐字段比较：与文件一致时只补写哈希；不一致时视为
+已在后台修改过，保留数据库中的内容，同样只补写哈希，之后文件中的记录再变化时才会覆盖。
+"""
+import hashlib
+import json
+import time
+from datetime import datetime
+
+from sqlalchemy import insert, select, update
+
+from . import cache, db, search_index
+from .models import Movie
+
+MOVIE_FIELDS = ("name", "cover", "description", "release_date", "duration_mins")
+
+
+def iter_json_array(fp, key="movies", chunk_size=64 * 1024):
+    """
+    逐个产出 JSON 文件中某个数组的元素
+    参数:
+        fp: 以文本模式打开的文件
+        key: 数组所在的顶层键；文件本身就是数组时传 None
+        chunk_size: 每次读取的字符数
+    文件格式错误时抛出 json.JSONDecodeError
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    pos = 0
+    eof = False
+
+    def fill():
+        nonlocal buffer, pos, eof
+        chunk = fp.read(chunk_size)
+        if not chunk:
+            eof = True
+        buffer = buffer[pos:] + chunk
+        pos = 0
+
+    # 定位数组起始的 "["
+    marker = None if key is None else json.dumps(key)
+    while True:
+        start = 0
+        if marker is not None:
+            start = buffer.find(marker)
+            if start >= 0:
+                colon = buffer.find(":", start + len(marker))
+                start = buffer.find("[", colon) if colon >= 0 else -1
+        else:
+            start = buffer.find("[")
+        if start >= 0:
+            pos = start + 1
+            break
+        if eof:
+            return
+        # 保留末尾一小段，避免键名被截断在两个块之间
+        keep = len(marker) + 64 if marker else 0
+        pos = max(len(buffer) - keep, 0)
+        fill()
+
+    while True:
+        # 跳过空白和逗号
+        while True:
+            while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+                pos += 1
+            if pos < len(buffer) or eof:
+                break
+            fill()
+        if pos >= len(buffer):
+            raise json.JSONDecodeError("数组未正常结束", buffer, pos)
+        if buffer[pos] == "]":
+            return
+        try:
+            item, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            fill()
+            continue
+        # 数字等标量可能恰好在块边界处被截断，未读到分隔符前先补充数据
+        if end == len(buffer) and not eof:
+            fill()
+            continue
+        yield item
+        pos = end
+
+
+def normalize_movie(record):
+    """
+    清洗一条电影记录，返回 (字段字典, 警告信息)；缺少名称时字段字典为 None
+    """
+    name = (record.get("name") or "").strip()
+    if not name:
+        return None, "发现一条没有名称的电影记录，已跳过。"
+
+    warning = None
+    release_date = None
+    release_date_str = record.get("release_date")
+    if release_date_str:
+        try:
+            # 尝试按标准格式解析，并只取日期部分
+            release_date = datetime.strptime(release_date_str.strip(), "%Y-%m-%d").date()
+        except (ValueError, TypeError, AttributeError):
+            warning = f"无法解析电影 '{name}' 的日期 '{release_date_str}'。将设置为空值。"
+
+    movie = {
+        "name": name,
+        "cover": record.get("cover"),
+        "description": record.get("description"),
+        "release_date": release_date,
+        "duration_mins": record.get("duration_mins") or 0,  # 如果时长为空则默认为0
+    }
+    return movie, warning
+
+
+def content_hash(movie):
+    """电影内容的 SHA-1 哈希，用于判断记录是否变化"""
+    payload = json.dumps([movie[field] for field in MOVIE_FIELDS], ensure_ascii=False, default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+class IngestReport:
+    """导入结果统计"""
+
+    def __init__(self):
+        self.read = 0
+        self.inserted = 0
+        self.updated = 0
+        self.unchanged = 0
+        self.kept = 0
+        self.skipped = 0
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+
+    @property
+    def rows_per_second(self):
+        return self.read / self.elapsed if self.elapsed else 0.0
+
+
+def _ingest_batch(batch, report):
+    # 同一批次内重名时以最后一条为准
+    by_name = {movie["name"]: movie for movie in batch}
+    existing = {}
+    rows = db.session.execute(
+        select(Movie.id, Movie.name, Movie.content_hash)
+        .where(Movie.name.in_(list(by_name)))
+        .order_by(Movie.id.desc())
+    )
+    for movie_id, name, digest in rows:
+        existing[name] = (movie_id, digest)  # 数据库中重名时保留 ID 最小的一条
+
+    # 没有哈希的旧记录按数据库中的当前内容计算哈希再比较
+    legacy_ids = [movie_id for movie_id, digest in existing.values() if digest is None]
+    current = {}
+    if legacy_ids:
+        columns = [getattr(Movie, field) for field in MOVIE_FIELDS]
+        for row in db.session.execute(select(Movie.id, *columns).where(Movie.id.in_(legacy_ids))):
+            current[row.id] = content_hash(row._mapping)
+
+    inserts, updates, backfills = [], [], []
+    for name, movie in by_name.items():
+        movie["content_hash"] = content_hash(movie)
+        if name not in existing:
+            inserts.append(movie)
+            continue
+        movie_id, digest = existing[name]
+        if digest is None:
+            backfills.append({"id": movie_id, "content_hash": movie["content_hash"]})
+            if current[movie_id] == movie["content_hash"]:
+                report.unchanged += 1
+            else:
+                report.kept += 1
+        elif digest != movie["content_hash"]:
+            updates.append({"id": movie_id, **movie})
+        else:
+            report.unchanged += 1
+
+    if inserts:
+        db.session.execute(insert(Movie), inserts)
+    if updates:
+        db.session.execute(update(Movie), updates)
+    if backfills:
+        db.session.execute(update(Movie), backfills)
+    db.session.commit()
+    report.inserted += len(inserts)
+    report.updated += len(updates)
+    report.skipped += len(batch) - len(by_name)
+
+
+def ingest_movies(fp, batch_size=1000, on_warning=None, on_progress=None):
+    """
+    从文件流式导入电影
+    参数:
+        fp: seed_data.json 格式的文本文件
+        batch_size: 每批处理的记录数
+        on_warning: 处理警告信息的回调，例如 click.echo
+        on_progress: 每批提交后调用，参数为 IngestReport
+    返回:
+        IngestReport
+    """
+    report = IngestReport()
+    batch = []
+    try:
+        for record in iter_json_array(fp, "movies"):
+            report.read += 1
+            movie, warning = normalize_movie(record)
+            if warning and on_warning:
+                on_warning(f"警告: {warning}")
+            if movie is None:
+                report.skipped += 1
+                continue
+            batch.append(movie)
+            if len(batch) >= batch_size:
+                _ingest_batch(batch, report)
+                batch = []
+                report.elapsed = time.perf_counter() - report.started
+                if on_progress:
+                    on_progress(report)
+        if batch:
+            _ingest_batch(batch, report)
+    finally:
+        report.elapsed = time.perf_counter() - report.started
+        if report.inserted or report.updated:
+            # 批量写入不会触发 ORM 事件，需要手动使电影相关缓存和搜索索引失效
+            cache.invalidate("movies", "screens", "showtimes")
+            search_index.invalidate_all()
+    return report
@@ -0,0 +1,211 @@
+"""
+键值存储（Redis）
+
+配置了 REDIS_HOST 时使用 Redis；否则退回到进程内的 MemoryStore，
+它实现了本项目用到的 Redis 命令子集，方便本地开发与测试。
+注意 MemoryStore 的数据只在单个进程内可见，多 worker 部署时请配置 Redis。
+"""
+import threading
+import time
+
+
+class MemoryStore:
+    """
+    进程内的 Redis 替身（线程安全）
+    过期键在访问时惰性清理；写入过期时间时每隔 SWEEP_INTERVAL 秒扫描一次全部过期时间，
+    清理写入后再也没被读取的键，避免内存随进程运行时间无限增长。
+    """
+
+    SWEEP_INTERVAL = 60
+
+    def __init__(self):
+        self._data = {}
+        self._expires = {}
+        self._lock = threading.RLock()
+        self._next_sweep = time.time() + self.SWEEP_INTERVAL
+
+    def _alive(self, name):
+        expires_at = self._expires.get(name)
+        if expires_at is not None and expires_at <= time.time():
+            self._data.pop(name, None)
+            self._expires.pop(name, None)
+        return name in self._data
+
+    def _set_ttl(self, name, ex=None, px=None):
+        if ex is not None:
+            self._expires[name] = time.time() + ex
+        elif px is not None:
+            self._expires[name] = time.time() + px / 1000.0
+        else:
+            self._expires.pop(name, None)
+            return
+        self._sweep()
+
+    def _sweep(self):
+        now = time.time()
+        if now < self._next_sweep:
+            return
+        self._next_sweep = now + self.SWEEP_INTERVAL
+        for name in [name for name, expires_at in self._expires.items() if expires_at <= now]:
+            del self._expires[name]
+            self._data.pop(name, None)
+
+    # --- 字符串 ---
+    def get(self, name):
+        with self._lock:
+            return self._data[name] if self._alive(name) else None
+
+    def mget(self, names, *args):
+        names = list(names) if isinstance(names, (list, tuple)) else [names]
+        names.extend(args)
+        with self._lock:
+            return [self._data[n] if self._alive(n) else None for n in names]
+
+    def set(self, name, value, ex=None, px=None, nx=False, xx=False):
+        with self._lock:
+            exists = self._alive(name)
+            if (nx and exists) or (xx and not exists):
+                return None
+            self._data[name] = value if isinstance(value, (bytes, str)) else str(value)
+            self._set_ttl(name, ex, px)
+            return True
+
+    def incr(self, name, amount=1):
+        with self._lock:
+            value = int(self._data[name]) + amount if self._alive(name) else amount
+            self._data[name] = str(value)
+            return value
+
+    def delete(self, *names):
+        with self._lock:
+            removed = 0
+            for name in names:
+                if self._alive(name):
+                    removed += 1
+                self._data.pop(name, None)
+                self._expires.pop(name, None)
+            return removed
+
+    def expire(self, name, time_seconds):
+        with self._lock:
+            if not self._alive(name):
+                return False
+            self._set_ttl(name, ex=time_seconds)
+            return True
+
+    def expire_if_equal(self, name, value, time_seconds):
+        with self._lock:
+            if not self._alive(name) or self._data[name] != value:
+                return False
+            self._set_ttl(name, ex=time_seconds)
+            return True
+
+    def delete_if_equal(self, name, value):
+        with self._lock:
+            if not self._alive(name) or self._data[name] != value:
+                return False
+            return self.delete(name) == 1
+
+    def ttl(self, name):
+        with self._lock:
+            if not self._alive(name):
+                return -2
+            expires_at = self._expires.get(name)
+            return -1 if expires_at is None else max(int(round(expires_at - time.time())), 0)
+
+    # --- 有序集合 ---
+    def _zset(self, name, create=False):
+        if self._alive(name):
+            return self._data[name]
+        if create:
+            self._data[name] = {}
+            return self._data[name]
+        return {}
+
+    def zadd(self, name, mapping):
+        with self._lock:
+            zset = self._zset(name, create=True)
+            added = sum(1 for member in mapping if member not in zset)
+            zset.update({member: float(score) for member, score in mapping.items()})
+            return added
+
+    def zrem(self, name, *members):
+        with self._lock:
+            zset = self._zset(name)
+            return sum(1 for member in members if zset.pop(member, None) is not None)
+
+    def zrangebyscore(self, name, min, max, withscores=False):
+        low, high = float(min), float(max)  # 只支持闭区间与 "-inf"/"+inf"
+        with self._lock:
+            items = sorted(
+                ((member, score) for member, score in self._zset(name).items() if low <= score <= high),
+                key=lambda item: (item[1], item[0]),
+            )
+        return items if withscores else [member for member, _ in items]
+
+    def zremrangebyscore(self, name, min, max):
+        low, high = float(min), float(max)  # 只支持闭区间与 "-inf"/"+inf"
+        with self._lock:
+            zset = self._zset(name)
+            doomed = [member for member, score in zset.items() if low <= score <= high]
+            for member in doomed:
+                del zset[member]
+            return len(doomed)
+
+
+# 先比较值再操作的原子命令，用于只续期或释放自己持有的锁
+_EXPIRE_IF_EQUAL = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('expire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+_DELETE_IF_EQUAL = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+class KeyValueStore:
+    """
+    键值存储扩展，用法与 db 相同：在 app/__init__.py 中创建实例 kv，在 create_app 中调用 init_app。
+    所有方法都直接转发给底层的 redis.Redis 或 MemoryStore。
+    """
+
+    def __init__(self):
+        self.client = None
+
+    def init_app(self, app):
+        host = app.config.get("REDIS_HOST")
+        if host:
+            import redis
+
+            self.client = redis.Redis(
+                host=host,
+                port=app.config.get("REDIS_PORT", 6379),
+                password=app.config.get("REDIS_PASSWORD"),
+                decode_responses=True,
+            )
+        else:
+            self.client = MemoryStore()
+        app.extensions["kv"] = self
+
+    def expire_if_equal(self, name, value, time_seconds):
+        """键的值等于 value 时设置过期时间，返回是否设置成功"""
+        if isinstance(self.client, MemoryStore):
+            return self.client.expire_if_equal(name, value, time_seconds)
+        return bool(self.eval(_EXPIRE_IF_EQUAL, 1, name, value, time_seconds))
+
+    def delete_if_equal(self, name, value):
+        """键的值等于 value 时删除，返回是否删除成功"""
+        if isinstance(self.client, MemoryStore):
+            return self.client.delete_if_equal(name, value)
+        return bool(self.eval(_DELETE_IF_EQUAL, 1, name, value))
+
+    def __getattr__(self, name):
+        client = self.__dict__.get("client")
+        if client is None:
+            raise RuntimeError("键值存储尚未初始化，请先调用 kv.init_app(app)")
+        return getattr(client, name)
@@ -0,0 +1,140 @@
+"""
+请求级数据库监控
+
+基于 SQLALCHEMY_RECORD_QUERIES 记录的查询，统计每个请求的 SQL 条数、数据库耗时和总耗时，
+按 (命名空间, 端点, 方法) 聚合，并以 Prometheus 文本格式输出 p50/p95/p99。
+超过 SLOW_QUERY_THRESHOLD 的查询会连同语句和参数“形状”（只记录类型，不记录值）写入日志。
+
+注意：统计数据保存在各个 worker 进程内，gunicorn 多 worker 部署时每个进程各自汇总，
+输出中带有 pid 标签以便区分。
+"""
+import os
+import threading
+import time
+from collections import deque
+
+from flask import current_app, g, request
+from flask_sqlalchemy.record_queries import get_recorded_queries
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+def parameters_shape(parameters):
+    """描述查询参数的结构而不暴露具体值，例如 (int, str) 或 50 x (int, str)"""
+    if isinstance(parameters, dict):
+        return "{" + ", ".join(f"{key}: {type(value).__name__}" for key, value in parameters.items()) + "}"
+    if isinstance(parameters, (list, tuple)):
+        if parameters and isinstance(parameters[0], (list, tuple, dict)):
+            if len(parameters) == 1:
+                return parameters_shape(parameters[0])
+            return f"{len(parameters)} x {parameters_shape(parameters[0])}"
+        return "(" + ", ".join(type(value).__name__ for value in parameters) + ")"
+    return type(parameters).__name__
+
+
+class _Series:
+    """单个端点的统计：计数、累计值和最近若干请求的样本（用于估算分位数）"""
+
+    __slots__ = ("count", "sums", "samples")
+
+    def __init__(self, reservoir_size):
+        self.count = 0
+        self.sums = {"duration": 0.0, "db_duration": 0.0, "queries": 0}
+        self.samples = {name: deque(maxlen=reservoir_size) for name in self.sums}
+
+    def add(self, **values):
+        self.count += 1
+        for name, value in values.items():
+            self.sums[name] += value
+            self.samples[name].append(value)
+
+
+def _quantile(sorted_values, q):
+    index = min(int(q * len(sorted_values)), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+class RequestMetrics:
+    """请求监控扩展，在模块级创建实例，在 create_app 中调用 init_app"""
+
+    METRICS = (
+        ("duration", "monkeyeye_request_duration_seconds", "请求总耗时（秒）"),
+        ("db_duration", "monkeyeye_request_db_duration_seconds", "请求内数据库耗时（秒）"),
+        ("queries", "monkeyeye_request_db_queries", "请求内执行的 SQL 条数"),
+    )
+
+    def __init__(self):
+        self._series = {}
+        self._lock = threading.Lock()
+        self._collectors = []
+        self.reservoir_size = 1024
+
+    def init_app(self, app):
+        self.reservoir_size = app.config["METRICS_RESERVOIR_SIZE"]
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.extensions["request_metrics"] = self
+
+    def add_collector(self, collector):
+        """注册额外的指标来源，collector() 返回 Prometheus 文本行列表"""
+        self._collectors.append(collector)
+
+    def _before_request(self):
+        g._metrics_start = time.perf_counter()
+
+    def _after_request(self, response):
+        start = g.pop("_metrics_start", None)
+        if start is None:
+            return response
+        duration = time.perf_counter() - start
+        queries = get_recorded_queries()
+        threshold = current_app.config["SLOW_QUERY_THRESHOLD"]
+        db_duration = 0.0
+        for query in queries:
+            db_duration += query.duration
+            if query.duration >= threshold:
+                current_app.logger.warning(
+                    "慢查询 %.1fms [%s %s] %s 参数: %s",
+                    query.duration * 1000,
+                    request.method,
+                    request.endpoint,
+                    " ".join(query.statement.split()),
+                    parameters_shape(query.parameters),
+                )
+
+        endpoint = request.endpoint or "unknown"
+        if request.blueprint == "api":
+            # flask-restx 的端点名形如 api.Movie_movie_list，下划线前为命名空间
+            namespace = endpoint.split(".", 1)[1].split("_", 1)[0]
+        else:
+            namespace = request.blueprint or "app"
+        key = (namespace, endpoint, request.method)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = _Series(self.reservoir_size)
+            series.add(duration=duration, db_duration=db_duration, queries=len(queries))
+        return response
+
+    def render_prometheus(self):
+        """以 Prometheus 文本格式输出所有指标"""
+        pid = os.getpid()
+        with self._lock:
+            snapshot = [
+                (key, series.count, dict(series.sums), {name: sorted(values) for name, values in series.samples.items()})
+                for key, series in sorted(self._series.items())
+            ]
+
+        lines = []
+        for name, metric, help_text in self.METRICS:
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} summary")
+            for (namespace, endpoint, method), count, sums, samples in snapshot:
+                labels = f'namespace="{namespace}",endpoint="{endpoint}",method="{method}",pid="{pid}"'
+                for q in QUANTILES:
+                    lines.append(f'{metric}{{{labels},quantile="{q}"}} {_quantile(samples[name], q):.6g}')
+                lines.append(f"{metric}_sum{{{labels}}} {sums[name]:.6g}")
+                lines.append(f"{metric}_count{{{labels}}} {count}")
+        for collector in self._collectors:
+            lines.extend(collector())
+        return "\n".join(lines) + "\n"
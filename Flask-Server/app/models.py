@@ -1,6 +1,5 @@
-from . import db
+from . import db, hasher
 from datetime import datetime
-from werkzeug.security import generate_password_hash, check_password_hash
 from flask_login import UserMixin
 from sqlalchemy.types import JSON  # 导入 JSON 类型
 
@@ -21,21 +20,63 @@ class User(UserMixin, db.Model):
 
     @password.setter
     def password(self, password):
-        self.password_hash = generate_password_hash(password)
+        # 哈希在进程池中计算，繁忙时抛出 PasswordHasherBusy
+        self.password_hash = hasher.hash(password)
 
     def verify_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return hasher.verify(self.password_hash, password)
+
+    def __str__(self):
+        return self.username
 
 
 # 电影表
 class Movie(db.Model):
     __tablename__ = "movies"
     id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String(128), nullable=False)
+    name = db.Column(db.String(128), nullable=False, index=True)
     cover = db.Column(db.String(256))
     description = db.Column(db.Text)
     release_date = db.Column(db.Date)
     duration_mins = db.Column(db.Integer)
+    # 导入时的内容哈希，由 app/ingest.py 维护，用于跳过未变化的记录
+    content_hash = db.Column(db.String(40))
+    # 评分聚合，由 app/ratings.py 在评论增删改的同一事务中维护
+    rating_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    rating_sum = db.Column(db.Float, nullable=False, default=0, server_default="0")
+    rating_1 = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    rating_2 = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    rating_3 = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    rating_4 = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    rating_5 = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+
+    def __str__(self):
+        return self.name
+
+    @property
+    def rating_avg(self):
+        if not self.rating_count:
+            return None
+        return round(self.rating_sum / self.rating_count, 2)
+
+    @property
+    def rating_histogram(self):
+        """评分分布，依次为 1-5 星的评论数"""
+        return [self.rating_1, self.rating_2, self.rating_3, self.rating_4, self.rating_5]
+
+
+# 影厅表（座位模板，多个场次共享）
+class Hall(db.Model):
+    __tablename__ = "halls"
+    id = db.Column(db.Integer, primary_key=True)
+    cinema_name = db.Column(db.String(128), nullable=False)
+    name = db.Column(db.String(64), nullable=False)
+    seat_layout = db.Column(JSON, nullable=False)  # 座位模板，0: 座位, 1: 不可售
+
+    __table_args__ = (db.UniqueConstraint("cinema_name", "name"),)
+
+    def __str__(self):
+        return f"{self.cinema_name} {self.name}"
 
 
 # 场次表
@@ -47,9 +88,23 @@ class Screen(db.Model):
     hall_name = db.Column(db.String(64))
     start_time = db.Column(db.DateTime, nullable=False)
     price = db.Column(db.Float, nullable=False)
-    seat_layout = db.Column(JSON)  # 新增座位图字段
+    seat_layout = db.Column(JSON)  # 旧版座位图字段，仅用于没有关联影厅的场次
+    hall_id = db.Column(db.Integer, db.ForeignKey("halls.id"))
+    seat_bitmap = db.Column(db.LargeBinary)  # 已售座位位图，见 app/seats.py
+    seat_version = db.Column(db.Integer, nullable=False, default=0, server_default="0")  # 位图版本号，用于乐观锁
 
     movie = db.relationship("Movie", backref=db.backref("screens", lazy="dynamic"))
+    hall = db.relationship("Hall")
+
+    __table_args__ = (
+        # 按电影查询场次并按开场时间排序
+        db.Index("ix_screens_movie_id_start_time", "movie_id", "start_time"),
+        # 按影院和时间段查询排片
+        db.Index("ix_screens_cinema_name_start_time", "cinema_name", "start_time"),
+    )
+
+    def __str__(self):
+        return f"{self.cinema_name} {self.hall_name} {self.start_time:%Y-%m-%d %H:%M}"
 
 
 # 订单表
@@ -67,6 +122,9 @@ class Order(db.Model):
     user = db.relationship("User", backref=db.backref("orders", lazy="dynamic"))
     screen = db.relationship("Screen")
 
+    # 按用户查询订单并按下单时间倒序
+    __table_args__ = (db.Index("ix_orders_user_id_create_time", "user_id", "create_time"),)
+
 
 # 评论表
 class Comment(db.Model):
@@ -76,11 +134,19 @@ class Comment(db.Model):
     movie_id = db.Column(db.Integer, db.ForeignKey("movies.id"), nullable=False)
     content = db.Column(db.Text)
     rating = db.Column(db.Float)
-    create_time = db.Column(db.DateTime, default=datetime.utcnow)
+    # 精确到秒，与 MariaDB DATETIME 保存的值一致，评论热点缓存和分页游标直接使用内存中的值
+    create_time = db.Column(db.DateTime, default=lambda: datetime.utcnow().replace(microsecond=0))
 
     user = db.relationship("User", backref=db.backref("comments", lazy="dynamic"))
     movie = db.relationship("Movie", backref=db.backref("comments", lazy="dynamic"))
 
+    __table_args__ = (
+        # 按电影查询评论并按发表时间倒序
+        db.Index("ix_comments_movie_id_create_time", "movie_id", "create_time"),
+        # 按评分排序的评论列表
+        db.Index("ix_comments_movie_id_rating_create_time", "movie_id", "rating", "create_time"),
+    )
+
 
 # 收藏/想看/已看 记录表
 class Favorite(db.Model):
@@ -93,6 +159,9 @@ class Favorite(db.Model):
     user = db.relationship("User", backref=db.backref("favorites", lazy="dynamic"))
     movie = db.relationship("Movie", backref=db.backref("favorites", lazy="dynamic"))
 
+    # 每个用户对每部电影只有一条记录
+    __table_args__ = (db.Index("uq_favorites_user_id_movie_id", "user_id", "movie_id", unique=True),)
+
 
 # 优惠券表
 class Coupon(db.Model):
@@ -104,5 +173,14 @@ class Coupon(db.Model):
     min_spend = db.Column(db.Float)
     expiry_date = db.Column(db.Date)
     is_used = db.Column(db.Boolean, default=False)
+    # 由清扫任务在过期后标记
+    is_expired = db.Column(db.Boolean, nullable=False, default=False, server_default="0")
 
     user = db.relationship("User", backref=db.backref("coupons", lazy="dynamic"))
+
+    __table_args__ = (
+        # 按用户查询未使用的优惠券
+        db.Index("ix_coupons_user_id_is_used", "user_id", "is_used"),
+        # 清扫任务查找已过期但未标记的优惠券
+        db.Index("ix_coupons_is_expired_expiry_date", "is_expired", "expiry_date"),
+    )
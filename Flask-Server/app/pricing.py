@@ -0,0 +1,77 @@
+"""
+下单计价与优惠券选择
+
+订单金额一律由服务端按 Screen.price 计算，客户端传入的金额只用于核对。
+最优优惠券：用户的可用优惠券（未使用、未过期）按 min_spend 升序排列，并预先计算“前缀最优”——
+前 i 张中折扣最大的一张（折扣相同时优先更早过期的）。对任意金额，满足 min_spend <= 金额 的优惠券恰好是
+排序后的一个前缀，二分查找前缀长度即可得到最优优惠券，每次报价 O(log n)，不必逐张比较。
+"""
+import bisect
+from datetime import date
+
+from sqlalchemy import or_
+
+from .models import Coupon
+
+
+def _rank(coupon):
+    """折扣越大越好；折扣相同时越早过期越好"""
+    return coupon.discount or 0, -(coupon.expiry_date or date.max).toordinal()
+
+
+class CouponBook:
+    """
+    一个用户可用优惠券的查询结构
+    参数:
+        coupons: 可用的优惠券（调用方负责过滤已使用和已过期的）
+    """
+
+    def __init__(self, coupons):
+        coupons = sorted(coupons, key=lambda coupon: coupon.min_spend or 0)
+        self._thresholds = [coupon.min_spend or 0 for coupon in coupons]
+        self._best = []
+        best = None
+        for coupon in coupons:
+            if best is None or _rank(coupon) > _rank(best):
+                best = coupon
+            self._best.append(best)
+
+    def best(self, subtotal):
+        """返回金额为 subtotal 时折扣最大的优惠券，没有可用优惠券时返回 None"""
+        count = bisect.bisect_right(self._thresholds, subtotal)
+        return self._best[count - 1] if count else None
+
+
+def usable_coupons(user_id, today=None):
+    """用户未使用且未过期的优惠券查询（走 ix_coupons_user_id_is_used 索引）"""
+    today = today or date.today()
+    # 清扫任务标记前的优惠券仍按日期判断
+    return Coupon.query.filter_by(user_id=user_id, is_used=False, is_expired=False).filter(
+        or_(Coupon.expiry_date.is_(None), Coupon.expiry_date >= today)
+    )
+
+
+def is_coupon_usable(coupon, user_id, subtotal, today=None):
+    """优惠券是否属于该用户、未使用、未过期且满足最低消费"""
+    today = today or date.today()
+    return (
+        coupon is not None
+        and coupon.user_id == user_id
+        and not coupon.is_used
+        and not coupon.is_expired
+        and (coupon.expiry_date is None or coupon.expiry_date >= today)
+        and (coupon.min_spend or 0) <= subtotal
+    )
+
+
+def price_seats(screen, seat_count):
+    """按场次单价计算小计"""
+    return round(screen.price * seat_count, 2)
+
+
+def apply_coupon(subtotal, coupon):
+    """返回 (优惠金额, 应付金额)；优惠金额不超过小计"""
+    if coupon is None:
+        return 0.0, subtotal
+    discount = round(min(coupon.discount or 0, subtotal), 2)
+    return discount, round(subtotal - discount, 2)
@@ -0,0 +1,112 @@
+"""
+电影评分聚合
+
+Movie 上保存评论数、评分总和以及 1-5 星分布，列表页无需扫描评论表即可展示评分。
+评论新增、修改、删除时通过 SQLAlchemy 映射事件在同一事务中做原子自增/自减，
+因此接口写入和 Flask-Admin 后台修改都会同步；历史数据可用 `flask rebuild-ratings` 重建。
+"""
+from sqlalchemy import case, event, func, inspect, select, update
+
+from . import cache, db
+from .models import Comment, Movie
+
+RATING_BUCKETS = (1, 2, 3, 4, 5)
+
+
+def rating_bucket(rating):
+    """评分四舍五入到 1-5 星，例如 4.5 -> 5，0.8 -> 1"""
+    for bucket in RATING_BUCKETS[:-1]:
+        if rating < bucket + 0.5:
+            return bucket
+    return RATING_BUCKETS[-1]
+
+
+def _bucket_expression(column):
+    """与 rating_bucket 等价的 SQL 表达式"""
+    return case(
+        *((column < bucket + 0.5, bucket) for bucket in RATING_BUCKETS[:-1]),
+        else_=RATING_BUCKETS[-1],
+    )
+
+
+def _apply(connection, movie_id, rating, sign):
+    if rating is None or movie_id is None:
+        return
+    # 映射事件中只能使用传入的 connection，直接对表执行原子自增
+    movies = Movie.__table__
+    bucket_column = movies.c[f"rating_{rating_bucket(rating)}"]
+    connection.execute(
+        update(movies)
+        .where(movies.c.id == movie_id)
+        .values(
+            {
+                movies.c.rating_count: movies.c.rating_count + sign,
+                movies.c.rating_sum: movies.c.rating_sum + sign * rating,
+                bucket_column: bucket_column + sign,
+            }
+        )
+    )
+
+
+@event.listens_for(Comment, "after_insert")
+def _comment_inserted(mapper, connection, comment):
+    _apply(connection, comment.movie_id, comment.rating, 1)
+
+
+@event.listens_for(Comment, "after_delete")
+def _comment_deleted(mapper, connection, comment):
+    _apply(connection, comment.movie_id, comment.rating, -1)
+
+
+@event.listens_for(Comment, "after_update")
+def _comment_updated(mapper, connection, comment):
+    state = inspect(comment)
+    rating_history = state.attrs.rating.history
+    movie_history = state.attrs.movie_id.history
+    if not rating_history.has_changes() and not movie_history.has_changes():
+        return
+    old_rating = rating_history.deleted[0] if rating_history.deleted else comment.rating
+    old_movie_id = movie_history.deleted[0] if movie_history.deleted else comment.movie_id
+    _apply(connection, old_movie_id, old_rating, -1)
+    _apply(connection, comment.movie_id, comment.rating, 1)
+
+
+def rebuild_rating_aggregates(batch_size=1000):
+    """
+    根据评论表全量重建所有电影的评分聚合
+    先清零，再按电影分组统计，并按主键分批批量更新
+    返回:
+        有评论的电影数量
+    """
+    zero = {"rating_count": 0, "rating_sum": 0, **{f"rating_{bucket}": 0 for bucket in RATING_BUCKETS}}
+    db.session.execute(update(Movie).values(**zero).execution_options(synchronize_session=False))
+
+    bucket = _bucket_expression(Comment.rating)
+    rows = db.session.execute(
+        select(
+            Comment.movie_id,
+            func.count(Comment.id),
+            func.sum(Comment.rating),
+            *(func.sum(case((bucket == b, 1), else_=0)) for b in RATING_BUCKETS),
+        )
+        .where(Comment.rating.isnot(None))
+        .group_by(Comment.movie_id)
+    ).all()
+
+    for start in range(0, len(rows), batch_size):
+        db.session.execute(
+            update(Movie),
+            [
+                {
+                    "id": movie_id,
+                    "rating_count": count,
+                    "rating_sum": total or 0,
+                    **{f"rating_{b}": n or 0 for b, n in zip(RATING_BUCKETS, histogram)},
+                }
+                for movie_id, count, total, *histogram in rows[start : start + batch_size]
+            ],
+        )
+    db.session.commit()
+    # 批量更新不会触发 ORM 事件，需要手动使电影相关缓存失效
+    cache.invalidate("movies")
+    return len(rows)
@@ -0,0 +1,260 @@
+"""
+电影全文搜索（进程内倒排索引）
+
+分词：中日文连续字符切成二元组（“肖申克的救赎” -> 肖申/申克/克的/的救/救赎），
+英文和数字按整词切分；片名额外索引单字，支持单字查询。
+排序：查询的所有词都必须命中，按 idf 加权的词频打分（片名权重高于简介），片名包含完整查询时额外加分。
+联想（prefix 模式）：在排好序的片名键上二分查找前缀，片名中每个空格分隔的片段都可作为起点。
+
+索引在首次搜索时从数据库构建。本进程内通过 ORM 提交的电影变更（接口、Flask-Admin）在提交后立即生效，
+同时把变更的电影ID写入 kv 中的变更日志；其他 worker 每隔 SEARCH_SYNC_INTERVAL 秒检查一次版本号，
+只重新加载变化的电影。`flask seed` 等批量写入不经过 ORM，调用 invalidate_all() 让所有 worker 全量重建。
+"""
+import bisect
+import heapq
+import math
+import re
+import threading
+import time
+import unicodedata
+from collections import Counter
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+NAME_WEIGHT = 3
+_RUN_RE = re.compile(r"[0-9a-zÀ-ɏ]+|[぀-ヿ㐀-鿿豈-﫿]+")
+
+
+def normalize(text):
+    """全角转半角、统一小写"""
+    return unicodedata.normalize("NFKC", text or "").lower()
+
+
+def tokenize(text, unigrams=False):
+    """
+    切分为检索词
+    参数:
+        unigrams: 中日文是否额外输出单字
+    """
+    tokens = []
+    for run in _RUN_RE.findall(normalize(text)):
+        if run[0] < "぀":
+            tokens.append(run)
+            continue
+        if len(run) == 1 or unigrams:
+            tokens.extend(run)
+        tokens.extend(run[i : i + 2] for i in range(len(run) - 1))
+    return tokens
+
+
+def _prefix_keys(name):
+    """片名的联想键：完整片名以及从每个空格分隔片段开始的后缀"""
+    parts = normalize(name).split()
+    return [" ".join(parts[i:]) for i in range(len(parts))]
+
+
+class MovieSearchIndex:
+    """电影搜索索引扩展，在模块级创建实例，在 create_app 中调用 init_app"""
+
+    VERSION_KEY = "search:movies:version"
+    EPOCH_KEY = "search:movies:epoch"
+    CHANGES_KEY = "search:movies:changes"
+
+    def __init__(self, kv):
+        self.kv = kv
+        self._lock = threading.RLock()
+        self._reset()
+        self._built = False
+        self._version = 0
+        self._epoch = None
+        self._checked_at = 0.0
+        self.sync_interval = 1.0
+        self.changelog_size = 10000
+        # 与响应缓存相同：flush 时记录变更的电影，提交后更新索引，回滚时丢弃
+        event.listen(Session, "after_flush", self._after_flush)
+        event.listen(Session, "after_commit", self._after_commit)
+        event.listen(Session, "after_rollback", self._after_rollback)
+
+    def init_app(self, app):
+        self.sync_interval = app.config["SEARCH_SYNC_INTERVAL"]
+        self.changelog_size = app.config["SEARCH_CHANGELOG_SIZE"]
+        app.extensions["movie_search"] = self
+
+    def _reset(self):
+        self._postings = {}  # 词 -> {电影ID: 对数词频权重}
+        self._doc_tokens = {}  # 电影ID -> 词列表，删除时使用
+        self._names = {}  # 电影ID -> (片名, 归一化片名)
+        self._keys = []  # 排好序的 (联想键, 电影ID)
+
+    # --- 索引维护 ---
+    def add(self, movie_id, name, description=None):
+        """新增或更新一部电影"""
+        with self._lock:
+            self.remove(movie_id)
+            for key in self._index(movie_id, name, description):
+                bisect.insort(self._keys, (key, movie_id))
+
+    def _index(self, movie_id, name, description):
+        """写入倒排表，返回该电影的联想键"""
+        weights = Counter(tokenize(description))
+        for token in tokenize(name, unigrams=True):
+            weights[token] += NAME_WEIGHT
+
+        self._doc_tokens[movie_id] = list(weights)
+        for token, weight in weights.items():
+            self._postings.setdefault(token, {})[movie_id] = 1 + math.log(weight)
+        self._names[movie_id] = (name, normalize(name))
+        return _prefix_keys(name)
+
+    def remove(self, movie_id):
+        """从索引中删除一部电影"""
+        with self._lock:
+            weights = self._doc_tokens.pop(movie_id, None)
+            if weights is None:
+                return
+            for token in weights:
+                posting = self._postings[token]
+                del posting[movie_id]
+                if not posting:
+                    del self._postings[token]
+            for key in _prefix_keys(self._names.pop(movie_id)[0]):
+                index = bisect.bisect_left(self._keys, (key, movie_id))
+                if index < len(self._keys) and self._keys[index] == (key, movie_id):
+                    del self._keys[index]
+
+    def build(self, rows):
+        """用 (电影ID, 片名, 简介) 序列重建整个索引"""
+        with self._lock:
+            self._reset()
+            for movie_id, name, description in rows:
+                self._keys.extend((key, movie_id) for key in self._index(movie_id, name, description))
+            self._keys.sort()
+            self._built = True
+
+    def rebuild(self):
+        """从数据库全量重建索引"""
+        from . import db
+        from .models import Movie
+
+        self.build(db.session.execute(
+            select(Movie.id, Movie.name, Movie.description).execution_options(yield_per=1000)
+        ))
+
+    def __len__(self):
+        return len(self._names)
+
+    # --- 多进程同步 ---
+    def invalidate_all(self):
+        """批量导入后调用，通知所有 worker 全量重建"""
+        self.kv.incr(self.EPOCH_KEY)
+        self._built = False
+
+    def _publish(self, movie_ids):
+        version = self.kv.incr(self.VERSION_KEY)
+        self.kv.zadd(self.CHANGES_KEY, {str(movie_id): version for movie_id in movie_ids})
+        self.kv.zremrangebyscore(self.CHANGES_KEY, "-inf", version - self.changelog_size)
+
+    def sync(self):
+        """按需构建索引，并应用其他 worker 发布的变更"""
+        from . import db
+        from .models import Movie
+
+        now = time.monotonic()
+        if self._built and now - self._checked_at < self.sync_interval:
+            return
+        with self._lock:
+            self._checked_at = now
+            # 先读版本号再加载数据，加载期间发生的变更会在下次同步时补上
+            version, epoch = self.kv.mget([self.VERSION_KEY, self.EPOCH_KEY])
+            version = int(version or 0)
+            if not self._built or epoch != self._epoch or version - self._version > self.changelog_size:
+                self.rebuild()
+            elif version > self._version:
+                movie_ids = [int(member) for member in self.kv.zrangebyscore(self.CHANGES_KEY, self._version + 1, "+inf")]
+                rows = db.session.execute(
+                    select(Movie.id, Movie.name, Movie.description).where(Movie.id.in_(movie_ids))
+                ).all()
+                found = {row.id: row for row in rows}
+                for movie_id in movie_ids:
+                    if movie_id in found:
+                        self.add(movie_id, found[movie_id].name, found[movie_id].description)
+                    else:
+                        self.remove(movie_id)
+            self._version = version
+            self._epoch = epoch
+
+    def _after_flush(self, session, flush_context):
+        from .models import Movie
+
+        changes = None
+        for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+            if not isinstance(obj, Movie) or obj.id is None:
+                continue
+            if changes is None:
+                changes = session.info.setdefault("search_movie_changes", {})
+            if obj in session.deleted:
+                changes[obj.id] = None
+            elif obj in session.new or session.is_modified(obj):
+                changes[obj.id] = (obj.name, obj.description)
+
+    def _after_commit(self, session):
+        changes = session.info.pop("search_movie_changes", None)
+        if not changes:
+            return
+        if self._built:
+            for movie_id, data in changes.items():
+                if data is None:
+                    self.remove(movie_id)
+                else:
+                    self.add(movie_id, *data)
+        self._publish(changes)
+
+    def _after_rollback(self, session):
+        session.info.pop("search_movie_changes", None)
+
+    # --- 查询 ---
+    def search(self, query, limit=20):
+        """全文搜索，返回按相关度排序的电影ID列表"""
+        tokens = set(tokenize(query))
+        if not tokens:
+            return []
+        needle = normalize(query).strip()
+        with self._lock:
+            postings = [self._postings.get(token) for token in tokens]
+            if not all(postings):
+                return []
+            postings.sort(key=len)
+            candidates = postings[0].keys()
+            for posting in postings[1:]:
+                candidates = candidates & posting.keys()
+            total = len(self._names)
+            weighted = [(math.log(1 + total / len(posting)), posting) for posting in postings]
+            names = self._names
+            scores = []
+            for movie_id in candidates:
+                score = sum(idf * posting[movie_id] for idf, posting in weighted)
+                name = names[movie_id][1]
+                if needle in name:
+                    score += 20 if needle == name else 10
+                scores.append((score, -movie_id))
+        return [-negated_id for _, negated_id in heapq.nlargest(limit, scores)]
+
+    def suggest(self, prefix, limit=10):
+        """片名联想，返回 [(电影ID, 片名)]；片名开头匹配的排在片段匹配之前，其次较短的片名优先"""
+        needle = normalize(prefix).strip()
+        if not needle:
+            return []
+        with self._lock:
+            start = bisect.bisect_left(self._keys, (needle,))
+            matches = {}
+            # 匹配很多时只扫描有限数量的键
+            for key, movie_id in self._keys[start : start + limit * 10]:
+                if not key.startswith(needle):
+                    break
+                name, normalized = self._names[movie_id]
+                rank = (0 if key == normalized else 1, len(name), movie_id)
+                matches[movie_id] = min(rank, matches.get(movie_id, rank))
+            ranked = sorted(matches, key=matches.get)[:limit]
+            return [(movie_id, self._names[movie_id][0]) for movie_id in ranked]
+
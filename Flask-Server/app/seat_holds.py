@@ -0,0 +1,205 @@
+"""
+选座临时锁定
+
+用户选座时为每个座位在 Redis 中写入一个带 TTL 的锁定键 (SET NX EX)，
+同时在按场次划分的有序集合中记录 "座位下标:用户ID" -> 过期时间，便于座位图叠加显示。
+锁定期间不写数据库，只有下单时才把锁定转换为售出。
+座位下标与 SeatBitmap 相同：row * cols + col。
+
+座位图版本号：每个场次在 kv 中维护一个单调递增的版本号和变更日志（座位下标 -> 最后变化时的版本号），
+锁定、释放、锁定过期和下单售出后都会递增版本号，前端可以据此只拉取变化的座位。
+版本号以初始化时的微秒时间戳为起点，kv 数据丢失后重新初始化的版本号仍大于之前发出的版本号；
+早于 base 的版本无法增量查询，需要重新获取完整座位图。
+通过 ORM 修改场次或影厅模板（例如 Flask-Admin 后台）提交后，会重置对应场次的 base。
+"""
+import time
+
+from flask import current_app
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from . import kv
+from .models import Hall, Screen
+from .seats import SeatBookingError
+
+
+def _seat_key(screen_id, index):
+    return f"seat_hold:{screen_id}:{index}"
+
+
+def _screen_key(screen_id):
+    return f"seat_holds:{screen_id}"
+
+
+def expire_holds(screen_id, now=None):
+    """清理场次中已过期的锁定，并把对应座位记入座位图变更日志"""
+    now = now or time.time()
+    key = _screen_key(screen_id)
+    expired = kv.zrangebyscore(key, "-inf", now)
+    if expired:
+        kv.zremrangebyscore(key, "-inf", now)
+        publish_seat_changes(screen_id, {int(member.split(":")[0]) for member in expired})
+
+
+def held_seats(screen_id):
+    """返回场次当前所有有效的锁定 {座位下标: 用户ID}"""
+    now = time.time()
+    key = _screen_key(screen_id)
+    expire_holds(screen_id, now)
+    holds = {}
+    for member in kv.zrangebyscore(key, now, "+inf"):
+        index, user_id = member.split(":")
+        holds[int(index)] = int(user_id)
+    return holds
+
+
+def hold_seats(screen_id, seats, user_id):
+    """
+    为用户锁定一组座位，全部成功或全部失败
+    参数:
+        screen_id: 场次ID
+        seats: [(座位标签, 座位下标), ...]
+        user_id: 当前用户ID
+    返回:
+        锁定时长（秒）；已被本人锁定的座位会刷新过期时间，
+        被其他用户锁定时抛出 SeatBookingError(409)
+    """
+    ttl = current_app.config["SEAT_HOLD_TTL"]
+    owner = str(user_id)
+    acquired = []
+    for label, index in seats:
+        key = _seat_key(screen_id, index)
+        if kv.set(key, owner, ex=ttl, nx=True):
+            acquired.append(index)
+        elif kv.get(key) == owner:
+            kv.set(key, owner, ex=ttl, xx=True)
+        else:
+            release_seats(screen_id, acquired, user_id)
+            raise SeatBookingError(409, f"座位 {label} 已被其他用户锁定，请重新选择")
+
+    expires_at = time.time() + ttl
+    key = _screen_key(screen_id)
+    kv.zadd(key, {f"{index}:{owner}": expires_at for _, index in seats})
+    # 有序集合保留到座位图变更日志过期：整个键提前过期会丢失锁定过期的座位变化
+    kv.expire(key, max(ttl, current_app.config["SEAT_MAP_LOG_TTL"]))
+    publish_seat_changes(screen_id, acquired)
+    return ttl
+
+
+def release_seats(screen_id, indexes, user_id):
+    """释放用户在某场次锁定的座位，只删除仍属于该用户的锁"""
+    if not indexes:
+        return
+    owner = str(user_id)
+    keys = [_seat_key(screen_id, index) for index in indexes]
+    owned = [index for index, holder in zip(indexes, kv.mget(keys)) if holder == owner]
+    if owned:
+        kv.delete(*(_seat_key(screen_id, index) for index in owned))
+    kv.zrem(_screen_key(screen_id), *(f"{index}:{owner}" for index in indexes))
+    publish_seat_changes(screen_id, owned)
+
+
+def release_user_holds(screen_id, user_id):
+    """释放用户在某场次的全部锁定，返回被释放的座位下标"""
+    indexes = [index for index, holder in held_seats(screen_id).items() if holder == user_id]
+    release_seats(screen_id, indexes, user_id)
+    return indexes
+
+
+def seats_held_by_others(screen_id, indexes, user_id):
+    """返回 indexes 中被其他用户锁定的座位下标"""
+    if not indexes:
+        return []
+    owner = str(user_id)
+    holders = kv.mget([_seat_key(screen_id, index) for index in indexes])
+    return [index for index, holder in zip(indexes, holders) if holder is not None and holder != owner]
+
+
+# --- 座位图版本号与变更日志 ---
+def _version_key(screen_id):
+    return f"seat_map:version:{screen_id}"
+
+
+def _base_key(screen_id):
+    return f"seat_map:base:{screen_id}"
+
+
+def _changes_key(screen_id):
+    return f"seat_map:changes:{screen_id}"
+
+
+def seat_map_version(screen_id):
+    """返回场次座位图的 (当前版本号, 可增量查询的最小版本号)，不存在时初始化"""
+    version, base = kv.mget([_version_key(screen_id), _base_key(screen_id)])
+    if version is None or base is None:
+        start = time.time_ns() // 1000
+        ttl = current_app.config["SEAT_MAP_LOG_TTL"]
+        kv.set(_base_key(screen_id), start, ex=ttl, nx=True)
+        kv.set(_version_key(screen_id), start, ex=ttl, nx=True)
+        version, base = kv.mget([_version_key(screen_id), _base_key(screen_id)])
+    return int(version), int(base)
+
+
+def publish_seat_changes(screen_id, indexes):
+    """
+    记录座位状态变化并递增版本号
+    必须在变化生效（数据库提交、kv 写入）之后调用：读到某个版本号的请求，
+    一定能读到该版本及之前的所有变化。
+    """
+    if not indexes:
+        return
+    seat_map_version(screen_id)
+    version = kv.incr(_version_key(screen_id))
+    kv.zadd(_changes_key(screen_id), {str(index): version for index in indexes})
+    ttl = current_app.config["SEAT_MAP_LOG_TTL"]
+    for key in (_version_key(screen_id), _base_key(screen_id), _changes_key(screen_id)):
+        kv.expire(key, ttl)
+
+
+def reset_seat_map(screen_id):
+    """座位图整体变化（例如修改了模板）时调用，之前的版本号都需要重新获取完整座位图"""
+    seat_map_version(screen_id)
+    version = kv.incr(_version_key(screen_id))
+    kv.set(_base_key(screen_id), version, ex=current_app.config["SEAT_MAP_LOG_TTL"])
+    kv.delete(_changes_key(screen_id))
+
+
+def changed_seats(screen_id, since, version, base):
+    """
+    返回版本号 since 之后状态变化过的座位下标
+    since 早于 base 或晚于当前版本号（来自另一份 kv 数据）时返回 None，表示需要完整座位图
+    """
+    if since < base or since > version:
+        return None
+    return [int(member) for member in kv.zrangebyscore(_changes_key(screen_id), since + 1, "+inf")]
+
+
+def _after_flush(session, flush_context):
+    screen_ids = set()
+    hall_ids = set()
+    for obj in list(session.dirty) + list(session.deleted):
+        if isinstance(obj, Screen) and obj.id is not None and session.is_modified(obj):
+            screen_ids.add(obj.id)
+        elif isinstance(obj, Hall) and obj.id is not None and session.is_modified(obj):
+            hall_ids.add(obj.id)
+    if hall_ids:
+        screen_ids.update(session.connection().execute(
+            select(Screen.id).where(Screen.hall_id.in_(hall_ids))
+        ).scalars())
+    if screen_ids:
+        session.info.setdefault("seat_map_resets", set()).update(screen_ids)
+
+
+def _after_commit(session):
+    for screen_id in session.info.pop("seat_map_resets", ()):
+        reset_seat_map(screen_id)
+
+
+def _after_rollback(session):
+    session.info.pop("seat_map_resets", None)
+
+
+# 与响应缓存相同：flush 时记录受影响的场次，提交后重置，回滚时丢弃
+event.listen(Session, "after_flush", _after_flush)
+event.listen(Session, "after_commit", _after_commit)
+event.listen(Session, "after_rollback", _after_rollback)
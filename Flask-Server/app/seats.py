@@ -0,0 +1,243 @@
+"""
+座位库存
+
+影厅 (Hall) 保存一份共享的座位模板，每个场次只保存一张按位压缩的“已售”位图，
+订票时只需改写几十个字节，而不是整份 seat_layout JSON。
+对前端默认仍输出原有的 seat_layout 嵌套列表格式 (0: 可选, 1: 不可选)，
+也可以输出按位压缩或游程编码的紧凑格式，见 unavailable_bitmap / encode_runs。
+
+并发订票时通过 Screen.seat_version 做比较并交换 (CAS)：只有版本号未变化时才写入位图，
+否则回滚并在有限次数内重试，从而保证同一座位不会被售出两次。
+"""
+import random
+import time
+
+from flask import current_app
+from sqlalchemy import update
+
+from . import db
+from .models import Screen
+
+SEAT_FREE = 0
+SEAT_TAKEN = 1
+
+
+class SeatBitmap:
+    """
+    行优先排列的座位位图，每个座位占 1 bit
+    参数:
+        rows: 行数
+        cols: 列数
+        data: 已有的位图字节（可选）
+    """
+
+    __slots__ = ("rows", "cols", "_bits")
+
+    def __init__(self, rows, cols, data=None):
+        self.rows = rows
+        self.cols = cols
+        size = (rows * cols + 7) // 8
+        self._bits = bytearray(size)
+        if data:
+            data = bytes(data[:size])
+            self._bits[: len(data)] = data
+
+    def _offset(self, row, col):
+        if not (0 <= row < self.rows and 0 <= col < self.cols):
+            raise IndexError(f"座位 ({row}, {col}) 超出影厅范围")
+        return row * self.cols + col
+
+    def is_set(self, row, col):
+        """判断某个座位是否已售，O(1)"""
+        i = self._offset(row, col)
+        return bool(self._bits[i >> 3] & (1 << (i & 7)))
+
+    def set(self, row, col):
+        """标记某个座位为已售，O(1)"""
+        i = self._offset(row, col)
+        self._bits[i >> 3] |= 1 << (i & 7)
+
+    def clear(self, row, col):
+        """取消某个座位的已售标记，O(1)"""
+        i = self._offset(row, col)
+        self._bits[i >> 3] &= ~(1 << (i & 7)) & 0xFF
+
+    def positions(self):
+        """按行优先顺序返回所有已售座位的 (row, col)"""
+        for byte_index, byte in enumerate(self._bits):
+            while byte:
+                low = byte & -byte
+                i = (byte_index << 3) + low.bit_length() - 1
+                yield divmod(i, self.cols)
+                byte ^= low
+
+    def to_bytes(self):
+        return bytes(self._bits)
+
+    @classmethod
+    def from_layout(cls, layout):
+        """由 seat_layout 嵌套列表构建位图（值为 1 的座位记为已售）"""
+        rows, cols = layout_shape(layout)
+        bitmap = cls(rows, cols)
+        for r, row in enumerate(layout):
+            for c, value in enumerate(row):
+                if value == SEAT_TAKEN:
+                    bitmap.set(r, c)
+        return bitmap
+
+
+def layout_shape(layout):
+    """返回座位模板的 (行数, 最大列数)"""
+    if not layout:
+        return 0, 0
+    return len(layout), max(len(row) for row in layout)
+
+
+def base_layout(screen):
+    """场次的座位模板：优先使用影厅模板，旧数据回退到场次自带的 seat_layout"""
+    if screen.hall is not None:
+        return screen.hall.seat_layout
+    return screen.seat_layout
+
+
+def load_sold_bitmap(screen, layout=None):
+    """读取场次的已售位图"""
+    rows, cols = layout_shape(layout if layout is not None else base_layout(screen))
+    return SeatBitmap(rows, cols, screen.seat_bitmap)
+
+
+def is_seat_taken(layout, sold, row, col):
+    """座位在模板中不可售或已被售出都视为不可选；越界时抛出 IndexError"""
+    if row < 0 or col < 0 or col >= len(layout[row]):
+        raise IndexError(f"座位 ({row}, {col}) 超出影厅范围")
+    return layout[row][col] == SEAT_TAKEN or sold.is_set(row, col)
+
+
+def render_layout(layout, sold):
+    """将模板与已售位图合并为前端使用的 seat_layout 嵌套列表"""
+    result = []
+    for r, row in enumerate(layout):
+        result.append(
+            [SEAT_TAKEN if value == SEAT_TAKEN or sold.is_set(r, c) else value for c, value in enumerate(row)]
+        )
+    return result
+
+
+def unavailable_bitmap(layout, sold):
+    """
+    合并模板与已售位图，返回所有不可选座位的位图
+    列数按最长的一行计算，较短行末尾不存在的位置同样记为不可选
+    """
+    rows, cols = layout_shape(layout)
+    bitmap = SeatBitmap(rows, cols, sold.to_bytes())
+    for r, row in enumerate(layout):
+        for c in range(cols):
+            if c >= len(row) or row[c] == SEAT_TAKEN:
+                bitmap.set(r, c)
+    return bitmap
+
+
+def encode_runs(bitmap):
+    """
+    行优先的游程编码：交替给出连续可选、连续不可选座位的个数，第一个数为开头可选座位数（可能为 0）
+    例如 [0, 0, 1, 1, 1, 0] -> [2, 3, 1]
+    """
+    runs = []
+    current, count = SEAT_FREE, 0
+    for i in range(bitmap.rows * bitmap.cols):
+        value = SEAT_TAKEN if bitmap.is_set(*divmod(i, bitmap.cols)) else SEAT_FREE
+        if value != current:
+            runs.append(count)
+            current, count = value, 0
+        count += 1
+    runs.append(count)
+    return runs
+
+
+def parse_seat_labels(seats_str):
+    """
+    解析前端提交的座位字符串
+    例如："5排3座,5排4座" -> [("5排3座", 4, 2), ("5排4座", 4, 3)]
+    返回 (原始标签, 行下标, 列下标) 列表，下标从 0 开始；格式错误时抛出 ValueError
+    """
+    seats = []
+    for label in seats_str.split(","):
+        label = label.strip()
+        row_str, col_str = label.replace("排", " ").replace("座", "").split()
+        row_index = int(row_str) - 1
+        col_index = int(col_str) - 1
+        if row_index < 0 or col_index < 0:
+            raise ValueError(f"座位格式错误: {label}")
+        seats.append((label, row_index, col_index))
+    return seats
+
+
+class SeatBookingError(Exception):
+    """
+    订票失败
+    参数:
+        code: 对应的 HTTP 状态码
+        message: 错误提示信息
+    """
+
+    def __init__(self, code, message):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+
+
+def _swap_sold_bitmap(screen, sold):
+    """仅当数据库中的版本号仍为 screen.seat_version 时写入新位图，返回是否成功"""
+    result = db.session.execute(
+        update(Screen)
+        .where(Screen.id == screen.id, Screen.seat_version == screen.seat_version)
+        .values(seat_bitmap=sold.to_bytes(), seat_version=Screen.seat_version + 1)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount != 1:
+        return False
+    db.session.expire(screen, ["seat_bitmap", "seat_version"])
+    return True
+
+
+def reserve_seats(screen_id, selected_seats):
+    """
+    在场次的已售位图上占用座位
+    参数:
+        screen_id: 场次ID
+        selected_seats: parse_seat_labels 的返回值
+    返回:
+        场次对象；位图写入仍在当前事务中，需由调用方与订单一起提交
+    失败时抛出 SeatBookingError（座位已售为 409，超出重试次数同样为 409）
+    """
+    max_retries = current_app.config["SEAT_BOOKING_MAX_RETRIES"]
+    # SQLite 不支持 SELECT ... FOR UPDATE，只能使用乐观锁
+    row_lock = current_app.config["SEAT_BOOKING_ROW_LOCK"] and db.engine.dialect.name != "sqlite"
+
+    for attempt in range(max_retries):
+        screen = db.session.get(Screen, screen_id, with_for_update=row_lock, populate_existing=True)
+        if not screen:
+            raise SeatBookingError(404, "场次不存在")
+
+        layout = base_layout(screen)
+        if not layout:
+            raise SeatBookingError(500, "该场次未配置座位图")
+        sold = load_sold_bitmap(screen, layout)
+
+        for seat, row_index, col_index in selected_seats:
+            try:
+                taken = is_seat_taken(layout, sold, row_index, col_index)
+            except IndexError:
+                raise SeatBookingError(400, f"座位格式错误: {seat}")
+            if taken:
+                raise SeatBookingError(409, f"座位 {seat} 已被预定，请重新选择")
+            sold.set(row_index, col_index)
+
+        if _swap_sold_bitmap(screen, sold):
+            return screen
+
+        # 位图已被其他请求更新：结束当前事务以读取最新数据，随机退避后重试
+        db.session.rollback()
+        time.sleep(random.uniform(0, 0.005 * (attempt + 1)))
+
+    raise SeatBookingError(409, "当前场次订票人数过多，请稍后重试")
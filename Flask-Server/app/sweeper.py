@@ -0,0 +1,191 @@
+"""
+后台清扫任务
+
+- 订单：场次开始后，把“已支付/待观影”(status=1) 的订单改为“已完成”(status=2)；
+- 优惠券：把超过 expiry_date 的优惠券标记为 is_expired。
+
+每个任务按主键 keyset 分批执行：先查出一批 ID，再用 UPDATE ... WHERE id IN (...) 批量修改并立即提交，
+单个事务只涉及 SWEEPER_BATCH_SIZE 行，不会长时间持有锁。每批提交后把最后一个 ID 作为检查点写入 kv，
+中途中断的任务下次从检查点继续；任务完整结束后清除检查点，下一轮从头开始（已处理的行不再满足条件）。
+
+运行方式：`flask sweep` 命令（可放进 cron），或设置 SWEEPER_INTERVAL 由 gunicorn 的一个 worker 在后台线程中
+定时执行（见 gunicornConf.py；`flask` 命令、开发服务器等其他进程不会启动该线程）。
+两种方式都先获取 kv 中的锁，多个 worker 或多台机器同时触发时只有一个真正执行；锁只由持有者续期和释放，
+续期失败（锁已过期并被其他进程取得）时立即停止。
+"""
+import threading
+import time
+import uuid
+from datetime import date, datetime
+
+from sqlalchemy import select, update
+
+ORDER_PAID = 1
+ORDER_COMPLETED = 2
+
+
+class SweepReport:
+    """清扫结果统计"""
+
+    def __init__(self):
+        self.orders_completed = 0
+        self.coupons_expired = 0
+        self.batches = 0
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+
+
+def _order_batch(session, last_id, batch_size, now):
+    from .models import Order, Screen
+
+    return session.execute(
+        select(Order.id)
+        .join(Screen, Order.screen_id == Screen.id)
+        .where(Order.status == ORDER_PAID, Screen.start_time <= now, Order.id > last_id)
+        .order_by(Order.id)
+        .limit(batch_size)
+    ).scalars().all()
+
+
+def _complete_orders(session, ids, now):
+    from .models import Order
+
+    return session.execute(
+        update(Order)
+        .where(Order.id.in_(ids), Order.status == ORDER_PAID)
+        .values(status=ORDER_COMPLETED)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+
+
+def _coupon_batch(session, last_id, batch_size, today):
+    from .models import Coupon
+
+    return session.execute(
+        select(Coupon.id)
+        .where(Coupon.is_expired == False, Coupon.expiry_date < today, Coupon.id > last_id)  # noqa: E712
+        .order_by(Coupon.id)
+        .limit(batch_size)
+    ).scalars().all()
+
+
+def _expire_coupons(session, ids, today):
+    from .models import Coupon
+
+    return session.execute(
+        update(Coupon)
+        .where(Coupon.id.in_(ids), Coupon.is_expired == False)  # noqa: E712
+        .values(is_expired=True)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+
+
+# 任务名 -> (查询一批 ID, 修改这一批, 统计字段, 取得基准时间)
+TASKS = {
+    "orders": (_order_batch, _complete_orders, "orders_completed", datetime.now),
+    "coupons": (_coupon_batch, _expire_coupons, "coupons_expired", date.today),
+}
+
+
+class Sweeper:
+    """清扫任务扩展，在模块级创建实例，在 create_app 中调用 init_app"""
+
+    LOCK_KEY = "sweeper:lock"
+
+    def __init__(self, kv):
+        self.kv = kv
+        self.batch_size = 1000
+        self.pause = 0.0
+        self.interval = 0
+        self.lock_ttl = 300
+        self._thread = None
+
+    def init_app(self, app):
+        self.batch_size = app.config["SWEEPER_BATCH_SIZE"]
+        self.pause = app.config["SWEEPER_PAUSE"]
+        self.interval = app.config["SWEEPER_INTERVAL"]
+        self.lock_ttl = app.config["SWEEPER_LOCK_TTL"]
+        app.extensions["sweeper"] = self
+
+    def start(self, app):
+        """在服务进程中启动定时清扫线程，SWEEPER_INTERVAL 为 0 时不启动"""
+        if self.interval and self._thread is None:
+            self._thread = threading.Thread(target=self._run_forever, args=(app,), name="sweeper", daemon=True)
+            self._thread.start()
+
+    @staticmethod
+    def _checkpoint_key(task):
+        return f"sweeper:{task}:checkpoint"
+
+    def sweep(self, tasks=None, batch_size=None, on_batch=None):
+        """
+        执行一轮清扫
+        参数:
+            tasks: 要执行的任务名，默认全部
+            batch_size: 每批处理的行数，默认 SWEEPER_BATCH_SIZE
+            on_batch: 每批提交后的回调 on_batch(task, report)
+        返回:
+            SweepReport；其他进程正在执行时返回 None
+        """
+        token = uuid.uuid4().hex
+        if not self.kv.set(self.LOCK_KEY, token, ex=self.lock_ttl, nx=True):
+            return None
+        report = SweepReport()
+        try:
+            for task in tasks or TASKS:
+                if not self._run_task(task, token, batch_size or self.batch_size, report, on_batch):
+                    break
+        finally:
+            self.kv.delete_if_equal(self.LOCK_KEY, token)
+            report.elapsed = time.perf_counter() - report.started
+        return report
+
+    def _run_task(self, task, token, batch_size, report, on_batch):
+        """执行一个任务，锁已被其他进程取得时保留检查点并返回 False"""
+        from . import db
+
+        find_batch, apply_batch, counter, reference = TASKS[task]
+        checkpoint_key = self._checkpoint_key(task)
+        last_id = int(self.kv.get(checkpoint_key) or 0)
+        now = reference()
+        while True:
+            ids = find_batch(db.session, last_id, batch_size, now)
+            if not ids:
+                break
+            changed = apply_batch(db.session, ids, now)
+            db.session.commit()
+            last_id = ids[-1]
+            self.kv.set(checkpoint_key, last_id, ex=self.lock_ttl * 10)
+            setattr(report, counter, getattr(report, counter) + changed)
+            report.batches += 1
+            if on_batch:
+                on_batch(task, report)
+            # 长时间运行时续期锁；锁已过期并被其他进程取得时停止，由对方从检查点继续
+            if not self.kv.expire_if_equal(self.LOCK_KEY, token, self.lock_ttl):
+                return False
+            if len(ids) < batch_size:
+                break
+            if self.pause:
+                time.sleep(self.pause)  # 给其他事务让出数据库
+        self.kv.delete(checkpoint_key)
+        return True
+
+    def _run_forever(self, app):
+        from . import db
+
+        while True:
+            time.sleep(self.interval)
+            with app.app_context():
+                try:
+                    report = self.sweep()
+                except Exception:
+                    app.logger.exception("清扫任务失败")
+                    db.session.rollback()
+                    continue
+                finally:
+                    db.session.remove()
+                if report and (report.orders_completed or report.coupons_expired):
+                    app.logger.info(
+                        "清扫完成：完成订单 %d 个，过期优惠券 %d 张，耗时 %.2f 秒",
+                        report.orders_completed, report.coupons_expired, report.elapsed,
+                    )
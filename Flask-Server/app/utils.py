@@ -1,17 +1,75 @@
-import uuid
-from datetime import datetime
-from flask import jsonify
+import base64
+import binascii
+import json
+import os
+import threading
+import time
+from datetime import date, datetime, timezone
+from flask import current_app, jsonify
+
+
+class OrderNumberGenerator:
+    """
+    按时间递增的订单号生成器（snowflake 风格）
+    订单号为 25 位定长数字：UTC 时间到毫秒（17 位）+ 工作进程号（4 位）+ 毫秒内序号（4 位）
+    例如：2025083012304512300030007
+    - 定长且时间在前，字符串顺序即生成顺序，新订单总是追加在唯一索引的末尾，不会像随机 UUID 那样导致页分裂；
+    - 工作进程号各不相同时不会重复：同一毫秒内序号用完或系统时钟回拨时，借用下一毫秒继续递增，不等待也不重复。
+    工作进程号 = ORDER_NODE_ID（机器编号，0-31）* 32 + ORDER_WORKER_ID（本机 worker 编号，0-31），
+    ORDER_WORKER_ID 由 gunicornConf.py 在 fork 时为每个 worker 分配。
+    """
+
+    MAX_SEQUENCE = 9999
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pid = None
+        self._worker_id = 0
+        self._last_ms = 0
+        self._sequence = 0
+        self._prefix_second = None
+        self._prefix = ""
+
+    def _load_worker_id(self):
+        node = int(os.environ.get("ORDER_NODE_ID", 0))
+        worker = int(os.environ.get("ORDER_WORKER_ID", 0))
+        if not (0 <= node < 32 and 0 <= worker < 32):
+            raise ValueError("ORDER_NODE_ID 和 ORDER_WORKER_ID 的取值范围为 0-31")
+        return node * 32 + worker
+
+    def next(self):
+        """生成下一个订单号"""
+        with self._lock:
+            # fork 出的子进程需要重新读取自己的工作进程号
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._worker_id = self._load_worker_id()
+            now_ms = time.time_ns() // 1_000_000
+            if now_ms > self._last_ms:
+                self._last_ms, self._sequence = now_ms, 0
+            elif self._sequence < self.MAX_SEQUENCE:
+                self._sequence += 1
+            else:
+                self._last_ms, self._sequence = self._last_ms + 1, 0
+            ms, sequence = self._last_ms, self._sequence
+
+            second, millis = divmod(ms, 1000)
+            if second != self._prefix_second:
+                self._prefix_second = second
+                self._prefix = datetime.fromtimestamp(second, timezone.utc).strftime("%Y%m%d%H%M%S")
+            return f"{self._prefix}{millis:03d}{self._worker_id:04d}{sequence:04d}"
+
+
+_order_numbers = OrderNumberGenerator()
 
 
 def generate_order_number():
     """
     生成唯一的订单号
-    规则：当前 UTC 时间（年月日时分秒）+ 8 位随机大写字符
-    例如：20250830123045123ABCD
+    规则：当前 UTC 时间（年月日时分秒毫秒）+ 4 位工作进程号 + 4 位毫秒内序号，按生成时间递增
+    例如：2025083012304512300030007
     """
-    now = datetime.utcnow().strftime("%Y%m%d%H%M%S")  # 获取当前 UTC 时间并格式化
-    random_part = uuid.uuid4().hex[:8].upper()  # 生成 8 位随机大写字符串
-    return f"{now}{random_part}"  # 拼接时间和随机部分作为订单号
+    return _order_numbers.next()
 
 
 def api_success(data=None, message=""):
@@ -45,3 +103,48 @@ def api_error(message="", status_code=400):
         "message": message,  # 错误信息
     }
     return jsonify(response), status_code
+
+
+def encode_cursor(*values):
+    """
+    将 keyset 分页的排序键编码为不透明的游标字符串
+    参数:
+        values: 当前页最后一条记录的排序键，例如 (create_time, id)
+    返回:
+        URL 安全的 base64 字符串，日期时间按 ISO 8601 编码
+    """
+    raw = json.dumps(
+        values,
+        separators=(",", ":"),
+        default=lambda v: v.isoformat() if isinstance(v, (date, datetime)) else str(v),
+    )
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor, size):
+    """
+    解析 encode_cursor 生成的游标
+    参数:
+        cursor: 游标字符串
+        size: 排序键的个数
+    返回:
+        排序键列表；游标格式错误时抛出 ValueError
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw.decode("utf-8"))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValueError("无效的分页游标")
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError("无效的分页游标")
+    return values
+
+
+def resolve_page_size(limit):
+    """
+    计算分页大小
+    未传入时使用 API_PAGE_SIZE，超过 API_MAX_PAGE_SIZE 时截断，小于 1 时按 1 处理
+    """
+    if limit is None:
+        return current_app.config["API_PAGE_SIZE"]
+    return max(1, min(limit, current_app.config["API_MAX_PAGE_SIZE"]))
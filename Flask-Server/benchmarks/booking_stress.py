@@ -0,0 +1,126 @@
+"""
+热门场次抢票并发压测
+
+对同一个场次并发发起大量订票请求，结束后核对：
+  1. 没有任何座位出现在两个订单中；
+  2. 场次位图中的已售座位与订单座位完全一致。
+任一检查失败时以非零状态码退出，同时输出吞吐量与延迟分布。
+
+示例:
+    python -m benchmarks.booking_stress --threads 64 --bookings 600
+    python -m benchmarks.booking_stress --database postgresql://user:pw@localhost/bench
+"""
+import argparse
+import random
+import sys
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from .common import Timer, create_bench_app, create_users, format_latency, login
+
+
+def build_hot_screen(db, rows, cols):
+    """创建一部电影、一个影厅和一个座位全部可售的场次"""
+    from app.models import Hall, Movie, Screen
+
+    movie = Movie(name="压测电影")
+    hall = Hall(cinema_name="压测影城", name="压测厅", seat_layout=[[0] * cols for _ in range(rows)])
+    screen = Screen(
+        movie=movie,
+        hall=hall,
+        cinema_name=hall.cinema_name,
+        hall_name=hall.name,
+        start_time=datetime.now() + timedelta(days=1),
+        price=50.0,
+    )
+    db.session.add_all([movie, hall, screen])
+    db.session.commit()
+    return screen.id
+
+
+def verify(db, screen_id):
+    """核对订单与位图，返回 (已售座位数, 错误列表)"""
+    from app.models import Order, Screen
+    from app.seats import load_sold_bitmap, parse_seat_labels
+
+    errors = []
+    seat_owners = Counter()
+    for order in Order.query.filter_by(screen_id=screen_id):
+        for _, row, col in parse_seat_labels(order.seats):
+            seat_owners[(row, col)] += 1
+
+    doubles = [seat for seat, n in seat_owners.items() if n > 1]
+    if doubles:
+        errors.append(f"重复售出的座位: {sorted(doubles)[:20]} 等共 {len(doubles)} 个")
+
+    screen = db.session.get(Screen, screen_id)
+    bitmap_seats = set(load_sold_bitmap(screen).positions())
+    if bitmap_seats != set(seat_owners):
+        errors.append(
+            f"位图与订单不一致: 位图 {len(bitmap_seats)} 个座位，订单 {len(seat_owners)} 个座位"
+        )
+    return len(seat_owners), errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database", help="数据库连接串，默认使用临时 SQLite 文件")
+    parser.add_argument("--threads", type=int, default=32, help="并发客户端数")
+    parser.add_argument("--bookings", type=int, default=400, help="订票请求总数")
+    parser.add_argument("--rows", type=int, default=20)
+    parser.add_argument("--cols", type=int, default=20)
+    parser.add_argument("--max-seats", type=int, default=3, help="每个订单最多选择的座位数")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    app, db = create_bench_app(args.database)
+    with app.app_context():
+        users = [u.username for u in create_users(db, args.threads)]
+        screen_id = build_hot_screen(db, args.rows, args.cols)
+
+    clients = [login(app, username) for username in users]
+    rng = random.Random(args.seed)
+    requests = []
+    for i in range(args.bookings):
+        count = rng.randint(1, args.max_seats)
+        seats = {(rng.randrange(args.rows), rng.randrange(args.cols)) for _ in range(count)}
+        requests.append((clients[i % len(clients)], ",".join(f"{r + 1}排{c + 1}座" for r, c in seats)))
+
+    statuses = Counter()
+    latencies = []
+    lock = threading.Lock()
+
+    def book(item):
+        client, seats = item
+        with Timer() as t:
+            response = client.post(
+                "/api/orders/", json={"screen_id": screen_id, "seats": seats}
+            )
+        with lock:
+            statuses[response.status_code] += 1
+            latencies.append(t.elapsed)
+
+    with Timer() as total, ThreadPoolExecutor(max_workers=args.threads) as pool:
+        list(pool.map(book, requests))
+
+    with app.app_context():
+        sold, errors = verify(db, screen_id)
+        database = db.engine.url.render_as_string(hide_password=True)
+
+    print(f"数据库: {database}")
+    print(f"请求数: {args.bookings}  并发: {args.threads}  耗时: {total.elapsed:.2f}s")
+    print(f"吞吐量: {args.bookings / total.elapsed:.1f} req/s  延迟: {format_latency(sorted(latencies))}")
+    print(f"状态码分布: {dict(sorted(statuses.items()))}")
+    print(f"已售座位: {sold} / {args.rows * args.cols}")
+
+    if errors:
+        for error in errors:
+            print(f"!! {error}")
+        sys.exit(1)
+    print("校验通过：没有座位被重复售出。")
+
+
+if __name__ == "__main__":
+    main()
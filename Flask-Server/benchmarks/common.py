@@ -0,0 +1,89 @@
+"""
+压测/基准脚本的公共工具
+
+用法：在 Flask-Server 目录下执行 `python -m benchmarks.<脚本名>`。
+默认使用临时目录中的 SQLite 文件数据库，也可以通过 --database 指定
+MySQL/PostgreSQL 等连接串（注意会在该库中建表并写入测试数据）。
+"""
+import os
+import statistics
+import tempfile
+import time
+
+from werkzeug.security import generate_password_hash
+
+BENCH_PASSWORD = "bench-password"
+
+
+def create_bench_app(database_uri=None, **config):
+    """
+    创建用于压测的应用，并在目标数据库中建表
+    参数:
+        database_uri: 数据库连接串，为空时使用临时 SQLite 文件
+        config: 覆盖的配置项，例如 RESPONSE_CACHE_ENABLED=False
+    返回:
+        (app, db)
+    """
+    if not database_uri:
+        path = os.path.join(tempfile.mkdtemp(prefix="monkeyeye-bench-"), "bench.db")
+        database_uri = f"sqlite:///{path}"
+    # Config 在导入时读取环境变量，必须在导入 app 之前设置
+    os.environ["SQLALCHEMY_DATABASE_URI"] = database_uri
+
+    from app import create_app, db
+
+    app = create_app()
+    app.config.update(config)
+    with app.app_context():
+        db.create_all()
+    return app, db
+
+
+def create_users(db, count, prefix="bench"):
+    """批量创建压测用户，所有用户共用同一个密码哈希以节省初始化时间"""
+    from app.models import User
+
+    password_hash = generate_password_hash(BENCH_PASSWORD)
+    users = [
+        User(username=f"{prefix}{i}", phone=f"{prefix}-{i}", password_hash=password_hash)
+        for i in range(count)
+    ]
+    db.session.add_all(users)
+    db.session.commit()
+    return users
+
+
+def login(app, username):
+    """返回已登录的测试客户端"""
+    client = app.test_client()
+    response = client.post("/api/session/login", json={"username": username, "password": BENCH_PASSWORD})
+    if response.status_code != 200:
+        raise RuntimeError(f"登录失败: {username} ({response.status_code})")
+    return client
+
+
+def percentile(samples, q):
+    """计算百分位数（q 取 0-100）"""
+    if not samples:
+        return 0.0
+    if len(samples) == 1:
+        return samples[0]
+    return statistics.quantiles(samples, n=100, method="inclusive")[min(max(int(q), 1), 99) - 1]
+
+
+def format_latency(samples):
+    """格式化延迟样本（秒）为 p50/p95/p99 毫秒字符串"""
+    return "p50={:.1f}ms p95={:.1f}ms p99={:.1f}ms".format(
+        *(percentile(samples, q) * 1000 for q in (50, 95, 99))
+    )
+
+
+class Timer:
+    """简单的计时上下文管理器"""
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed = time.perf_counter() - self.start
@@ -0,0 +1,160 @@
+"""
+复合索引效果对比
+
+生成大批量数据后，对每个接口分别在“去掉对应索引”和“建好索引”两种情况下：
+  1. 多次请求接口，输出 p50/p95/p99 延迟；
+  2. 取该请求中访问目标表的 SQL，输出数据库的执行计划（SQLite 为 EXPLAIN QUERY PLAN）。
+
+注意：MySQL 会把复合索引同时用作外键索引，可能无法删除，此时只输出建好索引后的结果。
+
+示例:
+    python -m benchmarks.index_bench --rows 200000 --requests 20
+"""
+import argparse
+import random
+from datetime import date, datetime, timedelta
+
+from flask_sqlalchemy.record_queries import get_recorded_queries
+from sqlalchemy import insert
+
+from .common import create_bench_app, create_users, format_latency, login
+
+# 接口名称 -> (路径, 目标表, 模型上的索引名)
+ENDPOINTS = {
+    "电影场次": ("/api/screens/movie/{movie_id}", "screens", "ix_screens_movie_id_start_time"),
+    "电影评论": ("/api/comments/movie/{movie_id}", "comments", "ix_comments_movie_id_create_time"),
+    "订单列表": ("/api/orders/", "orders", "ix_orders_user_id_create_time"),
+    "收藏状态": ("/api/favorites/status/{movie_id}", "favorites", "uq_favorites_user_id_movie_id"),
+    "优惠券列表": ("/api/coupons/", "coupons", "ix_coupons_user_id_is_used"),
+}
+
+
+def bulk_insert(db, table, rows, batch_size=5000):
+    for start in range(0, len(rows), batch_size):
+        db.session.execute(insert(table), rows[start : start + batch_size])
+    db.session.commit()
+
+
+def seed(db, users, movies, rows):
+    """用 Core 批量插入生成数据（不触发 ORM 事件），返回 (用户ID列表, 电影ID列表)"""
+    from app.models import Comment, Coupon, Favorite, Movie, Order, Screen
+
+    user_ids = [user.id for user in create_users(db, users, prefix="index")]
+    bulk_insert(db, Movie.__table__, [{"name": f"索引电影{i}"} for i in range(movies)])
+    movie_ids = [movie_id for (movie_id,) in db.session.query(Movie.id)]
+    now = datetime.now()
+
+    bulk_insert(db, Screen.__table__, [
+        {"movie_id": random.choice(movie_ids), "cinema_name": "索引影城", "hall_name": "1号厅",
+         "start_time": now + timedelta(minutes=random.randint(0, 60 * 24 * 30)), "price": 40.0}
+        for _ in range(rows)
+    ])
+    screen_ids = [screen_id for (screen_id,) in db.session.query(Screen.id)]
+    bulk_insert(db, Order.__table__, [
+        {"order_number": f"index-{i}", "user_id": random.choice(user_ids), "screen_id": random.choice(screen_ids),
+         "seats": "1排1座", "total_price": 40.0, "status": 1,
+         "create_time": now - timedelta(minutes=random.randint(0, 60 * 24 * 365))}
+        for i in range(rows)
+    ])
+    bulk_insert(db, Comment.__table__, [
+        {"user_id": random.choice(user_ids), "movie_id": random.choice(movie_ids), "content": "不错",
+         "rating": random.randint(1, 5), "create_time": now - timedelta(minutes=random.randint(0, 60 * 24 * 365))}
+        for _ in range(rows)
+    ])
+    pairs = {(random.choice(user_ids), random.choice(movie_ids)) for _ in range(rows)}
+    bulk_insert(db, Favorite.__table__, [
+        {"user_id": user_id, "movie_id": movie_id, "status": 1} for user_id, movie_id in pairs
+    ])
+    bulk_insert(db, Coupon.__table__, [
+        {"user_id": random.choice(user_ids), "name": "满减券", "discount": 5, "min_spend": 30,
+         "expiry_date": date.today(), "is_used": random.random() < 0.7}
+        for _ in range(rows)
+    ])
+    return user_ids, movie_ids
+
+
+def find_index(db, name):
+    for table in db.metadata.tables.values():
+        for index in table.indexes:
+            if index.name == name:
+                return index
+    raise KeyError(name)
+
+
+def explain(db, statement, parameters):
+    prefix = "EXPLAIN QUERY PLAN " if db.engine.dialect.name == "sqlite" else "EXPLAIN "
+    with db.engine.connect() as connection:
+        rows = connection.exec_driver_sql(prefix + statement, parameters).fetchall()
+    return ["    " + " | ".join(str(value) for value in row) for row in rows]
+
+
+def measure(app, db, client, path, table, requests, recorded):
+    """请求接口若干次，返回 (目标表查询的耗时样本, 执行计划)"""
+
+    def target_query():
+        response = client.get(path)
+        if response.status_code != 200:
+            raise RuntimeError(f"{path} 返回 {response.status_code}")
+        return [query for query in recorded[-1] if f"FROM {table}" in query.statement][-1]
+
+    target_query()  # 预热
+    samples = []
+    for _ in range(requests):
+        query = target_query()
+        samples.append(query.end_time - query.start_time)
+
+    with app.app_context():
+        plan = explain(db, query.statement, query.parameters)
+    return samples, plan
+
+
+def report(app, db, client, label, path, table, requests, recorded):
+    samples, plan = measure(app, db, client, path, table, requests, recorded)
+    print(f"  [{label}] SQL 耗时 {format_latency(samples)}")
+    print("\n".join(plan))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database", help="数据库连接串，默认使用临时 SQLite 文件")
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--movies", type=int, default=2000)
+    parser.add_argument("--rows", type=int, default=200000, help="每张表生成的行数")
+    parser.add_argument("--requests", type=int, default=20)
+    args = parser.parse_args()
+
+    # 关闭响应缓存，确保每次请求都真正访问数据库
+    app, db = create_bench_app(args.database, RESPONSE_CACHE_ENABLED=False, SQLALCHEMY_RECORD_QUERIES=True)
+    recorded = []
+
+    @app.after_request
+    def record_queries(response):
+        recorded.append(get_recorded_queries())
+        del recorded[:-1]
+        return response
+
+    with app.app_context():
+        print(f"正在生成数据：每张表 {args.rows} 行...")
+        user_ids, movie_ids = seed(db, args.users, args.movies, args.rows)
+        client = login(app, "index0")
+    path_args = {"movie_id": movie_ids[0]}
+
+    for name, (path, table, index_name) in ENDPOINTS.items():
+        print(f"\n== {name} {path.format(**path_args)}")
+        index = find_index(db, index_name)
+        with app.app_context():
+            try:
+                index.drop(bind=db.engine)
+                dropped = True
+            except Exception as e:
+                print(f"  无法删除索引 {index_name}: {e}")
+                dropped = False
+        if dropped:
+            report(app, db, client, "无索引", path.format(**path_args), table, args.requests, recorded)
+            with app.app_context():
+                index.create(bind=db.engine)
+        report(app, db, client, "有索引", path.format(**path_args), table, args.requests, recorded)
+
+
+if __name__ == "__main__":
+    main()
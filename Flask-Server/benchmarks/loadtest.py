@@ -0,0 +1,295 @@
+"""
+浏览与订票流程的负载测试
+
+用 create_app() 启动应用（默认临时 SQLite 文件，可用 --database 指定），生成电影、影厅、场次、
+评论和用户后，按场景并发驱动接口，输出每个接口的请求数、错误数、吞吐量和 p50/p95/p99 延迟。
+
+场景:
+  browse  电影列表翻页 + 搜索
+  detail  电影详情 + 场次 + 评论 + 座位图
+  login   登录 + 查询登录状态 + 登出
+  booking 所有并发用户抢同一个热门场次（409 视为正常结果）
+
+每个并发用户使用独立的测试客户端和随机数种子（--seed + 序号），相同参数下请求序列可复现。
+--save 把结果保存为基线 JSON；--compare 与已保存的基线对比，任一接口 p95 延迟变差超过
+--tolerance 时以非零状态码退出，便于在上线前评估性能改动。
+
+示例:
+    python -m benchmarks.loadtest --concurrency 16 --iterations 50 --save baseline.json
+    python -m benchmarks.loadtest --concurrency 16 --iterations 50 --compare baseline.json
+    python -m benchmarks.loadtest --scenario detail --scenario booking --no-cache
+"""
+import argparse
+import json
+import random
+import subprocess
+import sys
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert
+
+from .booking_stress import build_hot_screen
+from .common import BENCH_PASSWORD, Timer, create_bench_app, create_users, login, percentile
+
+SEARCH_QUERIES = ["负载", "电影", "负载电影1", "故事", "测试"]
+
+
+class Recorder:
+    """按接口汇总延迟和错误，线程安全"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def record(self, endpoint, elapsed, ok):
+        with self._lock:
+            self.latencies[endpoint].append(elapsed)
+            if not ok:
+                self.errors[endpoint] += 1
+
+    def summary(self, elapsed):
+        """返回 {接口: 统计}，吞吐量按整个场景的耗时计算"""
+        result = {}
+        for endpoint, samples in sorted(self.latencies.items()):
+            samples.sort()
+            result[endpoint] = {
+                "requests": len(samples),
+                "errors": self.errors[endpoint],
+                "rps": round(len(samples) / elapsed, 1),
+                **{f"p{q}": round(percentile(samples, q) * 1000, 2) for q in (50, 95, 99)},
+            }
+        return result
+
+
+class VirtualUser:
+    """一个并发用户：已登录的测试客户端、独立的随机数生成器和共享的测试数据"""
+
+    def __init__(self, app, username, data, recorder, seed):
+        self.app = app
+        self.username = username
+        self.data = data
+        self.recorder = recorder
+        self.rng = random.Random(seed)
+        self.client = login(app, username)
+
+    def request(self, method, endpoint, path, expected=(200,), client=None, **kwargs):
+        """
+        发起请求并记录延迟
+        参数:
+            endpoint: 统计时使用的接口名（路径模板），例如 "GET /api/movies/<id>"
+            expected: 视为成功的状态码
+        """
+        client = client or self.client
+        with Timer() as timer:
+            response = client.open(path, method=method, **kwargs)
+        self.recorder.record(endpoint, timer.elapsed, response.status_code in expected)
+        return response
+
+    def hot_movie(self):
+        # 少数热门电影承担大部分访问
+        movie_ids = self.data["movie_ids"]
+        return movie_ids[min(int(self.rng.paretovariate(1.2)) - 1, len(movie_ids) - 1)]
+
+
+# --- 场景 ---
+def browse(user):
+    path = f"/api/movies/?limit={user.rng.choice((10, 20, 50))}"
+    for _ in range(user.rng.randint(1, 3)):
+        response = user.request("GET", "GET /api/movies/", path)
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+        path = f"/api/movies/?cursor={cursor}"
+    query = user.rng.choice(SEARCH_QUERIES)
+    user.request("GET", "GET /api/movies/search", f"/api/movies/search?q={query}")
+
+
+def detail(user):
+    movie_id = user.hot_movie()
+    user.request("GET", "GET /api/movies/<id>", f"/api/movies/{movie_id}")
+    user.request("GET", "GET /api/screens/movie/<id>", f"/api/screens/movie/{movie_id}")
+    user.request("GET", "GET /api/comments/movie/<id>", f"/api/comments/movie/{movie_id}")
+    screen_id = user.rng.choice(user.data["screens_by_movie"][movie_id])
+    user.request("GET", "GET /api/screens/<id>/seats", f"/api/screens/{screen_id}/seats")
+
+
+def login_flow(user):
+    client = user.app.test_client()
+    user.request("POST", "POST /api/session/login", "/api/session/login", client=client,
+                 json={"username": user.username, "password": BENCH_PASSWORD})
+    user.request("GET", "GET /api/session/status", "/api/session/status", client=client)
+    user.request("POST", "POST /api/session/logout", "/api/session/logout", client=client)
+
+
+def booking(user):
+    rows, cols = user.data["hot_screen_shape"]
+    seats = {(user.rng.randrange(rows), user.rng.randrange(cols)) for _ in range(user.rng.randint(1, 3))}
+    user.request("POST", "POST /api/orders/", "/api/orders/", expected=(201, 409), json={
+        "screen_id": user.data["hot_screen_id"],
+        "seats": ",".join(f"{row + 1}排{col + 1}座" for row, col in seats),
+    })
+
+
+SCENARIOS = {"browse": browse, "detail": detail, "login": login_flow, "booking": booking}
+
+
+# --- 数据与执行 ---
+def seed(db, movies, screens_per_movie, comments_per_movie, users, hot_screen_shape):
+    """用 Core 批量生成浏览数据，返回场景使用的共享数据"""
+    from app.models import Comment, Hall, Movie, Screen
+
+    created = create_users(db, users, prefix="load")
+    usernames = [user.username for user in created]
+    user_ids = [user.id for user in created]
+    db.session.execute(insert(Movie), [
+        {"name": f"负载电影{i}", "description": f"第 {i} 个测试故事", "duration_mins": 120} for i in range(movies)
+    ])
+    movie_ids = [movie_id for (movie_id,) in db.session.query(Movie.id).order_by(Movie.id)]
+    hall = Hall(cinema_name="负载影城", name="1号厅", seat_layout=[[0] * 12 for _ in range(10)])
+    db.session.add(hall)
+    db.session.flush()
+
+    now = datetime.now()
+    db.session.execute(insert(Screen), [
+        {"movie_id": movie_id, "hall_id": hall.id, "cinema_name": hall.cinema_name, "hall_name": hall.name,
+         "start_time": now + timedelta(hours=i * 3), "price": 45.0}
+        for movie_id in movie_ids
+        for i in range(screens_per_movie)
+    ])
+    rng = random.Random(0)
+    db.session.execute(insert(Comment), [
+        {"movie_id": movie_id, "user_id": rng.choice(user_ids), "content": "好看", "rating": rng.randint(1, 5),
+         "create_time": now - timedelta(minutes=i)}
+        for movie_id in movie_ids
+        for i in range(comments_per_movie)
+    ])
+    db.session.commit()
+
+    screens_by_movie = defaultdict(list)
+    for screen_id, movie_id in db.session.query(Screen.id, Screen.movie_id):
+        screens_by_movie[movie_id].append(screen_id)
+    return usernames, {
+        "movie_ids": movie_ids,
+        "screens_by_movie": dict(screens_by_movie),
+        "hot_screen_id": build_hot_screen(db, *hot_screen_shape),
+        "hot_screen_shape": hot_screen_shape,
+    }
+
+
+def run_scenario(app, name, usernames, data, iterations, seed):
+    """每个并发用户执行 iterations 次场景，返回 (各接口统计, 耗时)"""
+    recorder = Recorder()
+    users = [VirtualUser(app, username, data, recorder, seed + i) for i, username in enumerate(usernames)]
+    scenario = SCENARIOS[name]
+
+    def drive(user):
+        for _ in range(iterations):
+            scenario(user)
+
+    with Timer() as total, ThreadPoolExecutor(max_workers=len(users)) as pool:
+        list(pool.map(drive, users))
+    return recorder.summary(total.elapsed), total.elapsed
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_results(results):
+    print(f"{'接口':<34}{'请求':>8}{'错误':>6}{'req/s':>9}{'p50ms':>9}{'p95ms':>9}{'p99ms':>9}")
+    for scenario, endpoints in results.items():
+        print(f"[{scenario}]")
+        for endpoint, stats in endpoints.items():
+            print(f"  {endpoint:<32}{stats['requests']:>8}{stats['errors']:>6}{stats['rps']:>9}"
+                  f"{stats['p50']:>9}{stats['p95']:>9}{stats['p99']:>9}")
+
+
+def compare(results, meta, baseline, tolerance):
+    """与基线对比，返回 p95 延迟退化超过 tolerance 的接口列表"""
+    print(f"\n与基线对比（基线版本 {baseline['meta'].get('revision')}，{baseline['meta'].get('time')}）")
+    for key in ("database", "concurrency", "iterations", "movies", "no_cache"):
+        if key in meta and baseline["meta"].get(key) != meta[key]:
+            print(f"  注意：参数 {key} 与基线不同（{baseline['meta'].get(key)} -> {meta[key]}），结果不可直接比较")
+    regressions = []
+    for scenario, endpoints in results.items():
+        for endpoint, stats in endpoints.items():
+            old = baseline["results"].get(scenario, {}).get(endpoint)
+            if not old:
+                continue
+            p95_change = (stats["p95"] - old["p95"]) / old["p95"] if old["p95"] else 0.0
+            rps_change = (stats["rps"] - old["rps"]) / old["rps"] if old["rps"] else 0.0
+            flag = "  !!" if p95_change > tolerance else ""
+            print(f"  [{scenario}] {endpoint:<32} p95 {old['p95']:>8} -> {stats['p95']:<8} ({p95_change:+.0%})"
+                  f"  req/s {rps_change:+.0%}{flag}")
+            if flag:
+                regressions.append(f"{scenario} {endpoint}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database", help="数据库连接串，默认使用临时 SQLite 文件")
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS), help="可重复指定，默认全部")
+    parser.add_argument("--concurrency", type=int, default=8, help="并发用户数")
+    parser.add_argument("--iterations", type=int, default=30, help="每个用户执行场景的次数")
+    parser.add_argument("--movies", type=int, default=200)
+    parser.add_argument("--screens-per-movie", type=int, default=5)
+    parser.add_argument("--comments-per-movie", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--no-cache", action="store_true", help="关闭响应缓存")
+    parser.add_argument("--save", metavar="PATH", help="把结果保存为基线")
+    parser.add_argument("--compare", metavar="PATH", help="与已保存的基线对比")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="允许的 p95 延迟退化比例")
+    args = parser.parse_args()
+
+    app, db = create_bench_app(args.database, RESPONSE_CACHE_ENABLED=not args.no_cache, SQLALCHEMY_RECORD_QUERIES=False)
+    with app.app_context():
+        print("正在生成数据...")
+        usernames, data = seed(
+            db, args.movies, args.screens_per_movie, args.comments_per_movie, args.concurrency, (20, 20)
+        )
+        database = db.engine.url.render_as_string(hide_password=True)
+        dialect = db.engine.dialect.name
+
+    results = {}
+    for name in args.scenario or list(SCENARIOS):
+        results[name], elapsed = run_scenario(app, name, usernames, data, args.iterations, args.seed)
+        print(f"场景 {name} 完成，耗时 {elapsed:.2f}s")
+
+    print(f"\n数据库: {database}  并发: {args.concurrency}  每用户迭代: {args.iterations}")
+    print_results(results)
+
+    meta = {
+        "time": datetime.now().isoformat(timespec="seconds"),
+        "revision": git_revision(),
+        "database": dialect,
+        **{key: getattr(args, key) for key in (
+            "concurrency", "iterations", "movies", "screens_per_movie", "comments_per_movie", "seed", "no_cache",
+        )},
+    }
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump({"meta": meta, "results": results}, f, ensure_ascii=False, indent=2)
+        print(f"\n基线已保存到 {args.save}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, meta, baseline, args.tolerance)
+        if regressions:
+            print(f"!! p95 延迟退化超过 {args.tolerance:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+        print("没有超出容忍范围的退化。")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+订单号写入基准：随机 UUID 与按时间递增的订单号对比
+
+分别用两种订单号向 orders 表批量插入 N 行（每批一个事务，与下单一样逐行写入唯一索引），输出：
+  1. 整体和最后 10% 的插入吞吐量（此时唯一索引已经很大，差异最明显）；
+  2. order_number 唯一索引的大小（SQLite 使用 dbstat，MySQL 使用 innodb_index_stats，PostgreSQL 使用 pg_relation_size）。
+
+示例:
+    python -m benchmarks.order_number_bench --rows 500000
+"""
+import argparse
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert, text
+
+from .common import Timer, create_bench_app, create_users
+
+
+def index_size(db, connection):
+    """返回 orders.order_number 唯一索引占用的字节数，无法获取时返回 None"""
+    dialect = db.engine.dialect.name
+    if dialect == "sqlite":
+        for index in connection.execute(text("PRAGMA index_list(orders)")).mappings():
+            columns = [row.name for row in connection.execute(text(f"PRAGMA index_info('{index['name']}')"))]
+            if columns == ["order_number"]:
+                return connection.execute(
+                    text("SELECT SUM(pgsize) FROM dbstat WHERE name = :name"), {"name": index["name"]}
+                ).scalar()
+    elif dialect == "mysql":
+        connection.execute(text("ANALYZE TABLE orders"))
+        return connection.execute(text(
+            "SELECT stat_value * @@innodb_page_size FROM mysql.innodb_index_stats "
+            "WHERE database_name = DATABASE() AND table_name = 'orders' "
+            "AND index_name = 'order_number' AND stat_name = 'size'"
+        )).scalar()
+    elif dialect == "postgresql":
+        return connection.execute(text("SELECT pg_relation_size('orders_order_number_key')")).scalar()
+    return None
+
+
+def run(db, name, make_number, rows, batch_size, user_id, screen_id):
+    from app.models import Order
+
+    Order.__table__.drop(db.engine)
+    Order.__table__.create(db.engine)
+    now = datetime.now()
+    batch_rates = []
+    with Timer() as total:
+        for start in range(0, rows, batch_size):
+            batch = [
+                {"order_number": make_number(), "user_id": user_id, "screen_id": screen_id, "seats": "1排1座",
+                 "total_price": 40.0, "status": 1, "create_time": now + timedelta(milliseconds=start + i)}
+                for i in range(min(batch_size, rows - start))
+            ]
+            with Timer() as timer, db.engine.begin() as connection:
+                connection.execute(insert(Order), batch)
+            batch_rates.append(len(batch) / timer.elapsed)
+
+    tail = batch_rates[-max(len(batch_rates) // 10, 1):]
+    with db.engine.connect() as connection:
+        size = index_size(db, connection)
+    size_text = f"{size / 1024 / 1024:.1f}MB" if size else "未知"
+    print(f"{name:<14}整体 {rows / total.elapsed:>9.0f} 行/秒  最后10% {sum(tail) / len(tail):>9.0f} 行/秒  "
+          f"唯一索引 {size_text}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database", help="数据库连接串，默认使用临时 SQLite 文件（会清空 orders 表）")
+    parser.add_argument("--rows", type=int, default=500000)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    app, db = create_bench_app(args.database)
+    from app.models import Movie, Screen
+    from app.utils import generate_order_number
+
+    with app.app_context():
+        (user,) = create_users(db, 1, prefix="order-number")
+        screen = Screen(movie=Movie(name="订单号基准电影"), cinema_name="基准影城", hall_name="1号厅",
+                        start_time=datetime.now(), price=40.0)
+        db.session.add(screen)
+        db.session.commit()
+        print(f"插入 {args.rows} 行，每批 {args.batch_size} 行")
+        for name, make_number in (
+            ("随机 UUID", lambda: str(uuid.uuid4())),
+            ("时间递增订单号", generate_order_number),
+        ):
+            run(db, name, make_number, args.rows, args.batch_size, user.id, screen.id)
+
+
+if __name__ == "__main__":
+    main()
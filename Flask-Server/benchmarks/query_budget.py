@@ -0,0 +1,108 @@
+"""
+列表接口的 SQL 查询次数预算检查
+
+基于 SQLALCHEMY_RECORD_QUERIES 记录每个请求执行的 SQL 条数，分别用“少量数据”和
+“大量数据”两组账号/电影请求同一接口：
+  1. 查询次数不得超过 BUDGETS 中的上限；
+  2. 查询次数不得随列表长度增长（即不存在 N+1 查询）。
+任一检查失败时以非零状态码退出，可以放进 CI 防止回归。
+
+示例:
+    python -m benchmarks.query_budget --small 3 --large 50
+"""
+import argparse
+import sys
+from datetime import date, datetime, timedelta
+
+from flask_sqlalchemy.record_queries import get_recorded_queries
+
+from .common import create_bench_app, create_users, login
+
+# 每个接口允许的最大查询次数（包含 Flask-Login 加载当前用户的查询）
+BUDGETS = {
+    "订单列表": ("/api/orders/", 2),
+    "收藏列表": ("/api/favorites/", 2),
+    "优惠券列表": ("/api/coupons/", 2),
+    "电影评论": ("/api/comments/movie/{movie_id}", 2),
+    "电影场次": ("/api/screens/movie/{movie_id}", 2),
+    "电影列表": ("/api/movies/", 1),
+    "影院排片": ("/api/screens/?cinema=预算影城", 1),
+}
+
+
+def seed(db, user, size):
+    """为用户和一部新电影各生成 size 条订单、收藏、优惠券、评论和场次，返回电影ID"""
+    from app.models import Comment, Coupon, Favorite, Movie, Order, Screen
+
+    movie = Movie(name=f"查询预算电影-{user.username}")
+    db.session.add(movie)
+    for i in range(size):
+        other = Movie(name=f"收藏电影-{user.username}-{i}")
+        screen = Screen(
+            movie=movie,
+            cinema_name="预算影城",
+            hall_name=f"{i % 5 + 1}号厅",
+            start_time=datetime.now() + timedelta(hours=i),
+            price=40.0,
+        )
+        db.session.add_all([
+            other,
+            screen,
+            Order(order_number=f"budget-{user.id}-{i}", user=user, screen=screen, seats="1排1座",
+                  total_price=40.0, status=1),
+            Favorite(user=user, movie=other, status=1),
+            Coupon(user=user, name="满减券", discount=5, min_spend=30, expiry_date=date.today()),
+            Comment(user=user, movie=movie, content="不错", rating=4),
+        ])
+    db.session.commit()
+    return movie.id
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database", help="数据库连接串，默认使用临时 SQLite 文件")
+    parser.add_argument("--small", type=int, default=3)
+    parser.add_argument("--large", type=int, default=50)
+    args = parser.parse_args()
+
+    # 关闭响应缓存，确保每次请求都真正访问数据库
+    app, db = create_bench_app(args.database, RESPONSE_CACHE_ENABLED=False, SQLALCHEMY_RECORD_QUERIES=True)
+    counts = []
+
+    @app.after_request
+    def record_query_count(response):
+        counts.append(len(get_recorded_queries()))
+        return response
+
+    with app.app_context():
+        small_user, large_user = create_users(db, 2, prefix="budget")
+        movies = {
+            "small": seed(db, small_user, args.small),
+            "large": seed(db, large_user, args.large),
+        }
+        clients = {"small": login(app, small_user.username), "large": login(app, large_user.username)}
+
+    failures = []
+    print(f"{'接口':<10}{'预算':>6}{args.small:>8}{args.large:>8}")
+    for name, (path, budget) in BUDGETS.items():
+        observed = {}
+        for size in ("small", "large"):
+            response = clients[size].get(path.format(movie_id=movies[size]))
+            if response.status_code != 200:
+                failures.append(f"{name}: {path} 返回 {response.status_code}")
+            observed[size] = counts[-1]
+        print(f"{name:<10}{budget:>6}{observed['small']:>8}{observed['large']:>8}")
+        if observed["large"] > budget:
+            failures.append(f"{name}: 查询 {observed['large']} 次，超过预算 {budget}")
+        if observed["large"] != observed["small"]:
+            failures.append(f"{name}: 查询次数随列表长度增长 ({observed['small']} -> {observed['large']})")
+
+    if failures:
+        for failure in failures:
+            print(f"!! {failure}")
+        sys.exit(1)
+    print("查询次数全部在预算内。")
+
+
+if __name__ == "__main__":
+    main()
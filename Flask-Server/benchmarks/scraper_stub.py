@@ -0,0 +1,169 @@
+"""
+用本地桩服务器验证 scraper.py
+
+启动一个返回固定列表页/详情页的 HTTP 服务（支持 ETag 和 304），依次检查：
+  1. 首次运行时部分详情页返回 500，其余电影照常爬取，且同一域名的请求速率不超过 --rate；
+  2. 部分详情页失败后重新运行，只补爬缺失的电影（断点续爬）；
+  3. 删除结果文件、保留缓存后重新运行，所有页面都通过 304 重新验证而不是重新下载。
+任一检查失败时以非零状态码退出。
+
+示例:
+    python -m benchmarks.scraper_stub --pages 2 --rate 50
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import scraper
+
+PAGE_SIZE = 25
+
+
+def list_page(start):
+    items = "".join(
+        f'<div class="item"><div class="hd"><a href="/subject/{i}/">电影{i}</a></div></div>'
+        for i in range(start + 1, start + PAGE_SIZE + 1)
+    )
+    return f"<html><body><ol>{items}</ol></body></html>"
+
+
+def detail_page(movie_id):
+    return (
+        "<html><body>"
+        f'<span property="v:itemreviewed">桩电影 {movie_id}</span>'
+        f'<div id="mainpic"><img src="https://img.example.com/{movie_id}.jpg"></div>'
+        f'<div id="info"><span class="pl">上映日期:</span> 1994-09-10(加拿大)<br>'
+        f'<span class="pl">片长:</span> {90 + movie_id % 60}分钟<br></div>'
+        f'<span property="v:summary">第 {movie_id} 部电影的简介</span>'
+        "</body></html>"
+    )
+
+
+class StubServer:
+    """桩服务器，记录请求数和 304 次数，可以让指定电影的详情页返回 500"""
+
+    def __init__(self):
+        self.requests = 0
+        self.not_modified = 0
+        self.failing = set()
+        self.lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                parts = urlsplit(self.path)
+                with stub.lock:
+                    stub.requests += 1
+                if parts.path == "/top250":
+                    body = list_page(int(parse_qs(parts.query).get("start", ["0"])[0]))
+                elif parts.path.startswith("/subject/"):
+                    movie_id = int(parts.path.strip("/").split("/")[1])
+                    if movie_id in stub.failing:
+                        self.send_error(500)
+                        return
+                    body = detail_page(movie_id)
+                else:
+                    self.send_error(404)
+                    return
+                data = body.encode("utf-8")
+                etag = '"' + hashlib.sha1(data).hexdigest() + '"'
+                if self.headers.get("If-None-Match") == etag:
+                    with stub.lock:
+                        stub.not_modified += 1
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(data)))
+                self.send_header("ETag", etag)
+                self.end_headers()
+                self.wfile.write(data)
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.base_url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def reset(self):
+        with self.lock:
+            self.requests = self.not_modified = 0
+
+
+def count_lines(path):
+    with open(path, encoding="utf-8") as f:
+        return sum(1 for _ in f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=2)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--rate", type=float, default=50.0)
+    parser.add_argument("--fail", type=int, default=5, help="首次运行时返回 500 的详情页数量")
+    args = parser.parse_args()
+
+    stub = StubServer()
+    workdir = tempfile.mkdtemp(prefix="monkeyeye-scraper-")
+    output = os.path.join(workdir, "movies.jsonl")
+    seed_output = os.path.join(workdir, "seed_data.json")
+    total = args.pages * PAGE_SIZE
+    options = dict(base_url=stub.base_url, output=output, seed_output=seed_output,
+                   cache_dir=os.path.join(workdir, "cache"), workers=args.workers, rate=args.rate,
+                   pages=args.pages, page_size=PAGE_SIZE, retries=0)
+    failures = []
+
+    # 1. 首次运行，部分详情页失败
+    stub.failing = set(range(1, args.fail + 1))
+    started = time.perf_counter()
+    scraped, failed, _ = scraper.scrape_douban_top250(**options)
+    elapsed = time.perf_counter() - started
+    observed_rate = stub.requests / elapsed
+    print(f"首次运行: 新增 {scraped}，失败 {failed}，{stub.requests} 个请求，{observed_rate:.1f} 请求/秒")
+    if scraped != total - args.fail or failed != args.fail:
+        failures.append(f"首次运行应爬到 {total - args.fail} 部、失败 {args.fail} 个，实际 {scraped}/{failed}")
+    # 令牌桶初始有 1 个令牌，允许少量误差
+    if stub.requests > 1 and (stub.requests - 1) / elapsed > args.rate * 1.1:
+        failures.append(f"请求速率 {observed_rate:.1f}/秒 超过限速 {args.rate}/秒")
+
+    # 2. 断点续爬，只补爬失败的电影
+    stub.failing = set()
+    stub.reset()
+    scraped, failed, _ = scraper.scrape_douban_top250(**options)
+    print(f"续爬: 新增 {scraped}，失败 {failed}，{stub.requests} 个请求")
+    if scraped != args.fail or failed or count_lines(output) != total:
+        failures.append(f"续爬应补齐 {args.fail} 部电影，实际新增 {scraped}，结果共 {count_lines(output)} 行")
+
+    with open(seed_output, encoding="utf-8") as f:
+        names = [movie["name"] for movie in json.load(f)["movies"]]
+    if names != [f"桩电影 {i}" for i in range(1, total + 1)]:
+        failures.append("导出的 seed_data.json 顺序或内容不正确")
+
+    # 3. 删除结果保留缓存，全部页面应走 304
+    os.remove(output)
+    stub.reset()
+    scraped, failed, stats = scraper.scrape_douban_top250(**options)
+    print(f"缓存重新验证: 新增 {scraped}，下载 {stats['downloaded']}，304 {stats['not_modified']}")
+    if scraped != total or stats["downloaded"] or stub.not_modified != total + args.pages:
+        failures.append("保留缓存重新运行时仍有页面被重新下载")
+
+    stub.httpd.shutdown()
+    if failures:
+        for failure in failures:
+            print(f"!! {failure}")
+        sys.exit(1)
+    print("爬虫检查全部通过。")
+
+
+if __name__ == "__main__":
+    main()
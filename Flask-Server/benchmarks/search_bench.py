@@ -0,0 +1,53 @@
+"""
+电影搜索索引基准
+
+用 seed_data.json 中的电影（可按 --copies 复制放大）构建索引，不访问数据库，
+输出建索引耗时以及全文搜索、片名联想的查询延迟。
+
+示例:
+    python -m benchmarks.search_bench --copies 100
+"""
+import argparse
+import json
+import random
+
+from .common import Timer, format_latency
+
+QUERIES = ["救赎", "肖申克", "爱情", "星际穿越", "宫崎骏", "the", "god", "monster", "爱", "战争 和平"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--file", default="seed_data.json")
+    parser.add_argument("--copies", type=int, default=1, help="将电影数据复制多少份")
+    parser.add_argument("--queries", type=int, default=5000)
+    args = parser.parse_args()
+
+    from app import kv
+    from app.search import MovieSearchIndex
+
+    with open(args.file, encoding="utf-8") as f:
+        movies = json.load(f)["movies"]
+
+    index = MovieSearchIndex(kv)
+    rows = [
+        (copy * len(movies) + i + 1, f"{movie['name']} {copy}" if copy else movie["name"], movie.get("description"))
+        for copy in range(args.copies)
+        for i, movie in enumerate(movies)
+    ]
+    with Timer() as build:
+        index.build(rows)
+    print(f"索引 {len(index)} 部电影，耗时 {build.elapsed:.2f} 秒")
+
+    for label, method in (("全文搜索", index.search), ("片名联想", index.suggest)):
+        samples = []
+        for _ in range(args.queries):
+            query = random.choice(QUERIES)
+            with Timer() as timer:
+                method(query, 20)
+            samples.append(timer.elapsed)
+        print(f"{label}: {format_latency(samples)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+列表序列化基准：flask-restx marshal 与快速序列化（行编码器 + orjson）对比
+
+用 Core 批量插入 N 部电影和 N 个用户后：
+  1. 进程内对比：ORM 加载 + marshal + json  与  按列查询 + 行编码器 + dumps，并校验两者输出一致；
+  2. 端到端对比：分别关闭/开启 FAST_SERIALIZER 请求 /api/users/（全量，流式）。
+
+示例:
+    python -m benchmarks.serializer_bench --rows 10000 --repeat 5
+"""
+import argparse
+import json
+import random
+from datetime import date, datetime, timedelta
+
+from flask_restx import marshal
+from sqlalchemy import insert, select
+
+from .common import Timer, create_bench_app, format_latency
+
+
+def seed(db, rows):
+    from app.models import Movie, User
+
+    now = datetime.now()
+    movies = []
+    for i in range(rows):
+        counts = [random.randint(0, 50) for _ in range(5)]
+        movies.append({
+            "name": f"序列化电影{i}", "cover": f"https://example.com/{i}.jpg", "description": "简介" * 50,
+            "release_date": date(2000, 1, 1) + timedelta(days=i % 9000), "duration_mins": 90 + i % 60,
+            "rating_count": sum(counts), "rating_sum": sum(star * n for star, n in zip(range(1, 6), counts)),
+            **{f"rating_{star}": n for star, n in zip(range(1, 6), counts)},
+        })
+    db.session.execute(insert(Movie), movies)
+    db.session.execute(insert(User), [
+        {"username": f"serializer{i}", "phone": f"serializer-{i}", "password_hash": "x",
+         "create_time": now - timedelta(seconds=i)}
+        for i in range(rows)
+    ])
+    db.session.commit()
+
+
+def measure(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        with Timer() as timer:
+            fn()
+        samples.append(timer.elapsed)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database", help="数据库连接串，默认使用临时 SQLite 文件")
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    app, db = create_bench_app(args.database, RESPONSE_CACHE_ENABLED=False, SQLALCHEMY_RECORD_QUERIES=False)
+    from app.api.movie import get_movie_encoder, movie_model
+    from app.api.user import user_encoder, user_model
+    from app.models import Movie, User
+    from app.serializers import dumps, orjson
+
+    print(f"JSON 编码器: {'orjson' if orjson else 'json（未安装 orjson）'}")
+    with app.app_context():
+        print(f"正在生成数据：{args.rows} 部电影、{args.rows} 个用户...")
+        seed(db, args.rows)
+        movie_encoder = get_movie_encoder(movie_model)
+
+        for label, entity, model, encoder in (
+            ("电影", Movie, movie_model, movie_encoder),
+            ("用户", User, user_model, user_encoder),
+        ):
+            def slow():
+                objects = entity.query.order_by(entity.id).all()
+                body = json.dumps(marshal(objects, model))
+                db.session.expunge_all()
+                return body
+
+            def fast():
+                rows = db.session.execute(select(*encoder.columns).order_by(entity.id))
+                return b"".join(encoder.iter_chunks(rows))
+
+            if json.loads(slow()) != json.loads(fast()):
+                raise AssertionError(f"{label}: 两种序列化的输出不一致")
+            print(f"\n== {label} {args.rows} 行（输出一致）")
+            print(f"  marshal + json  : {format_latency(measure(slow, args.repeat))}")
+            print(f"  行编码器 + dumps: {format_latency(measure(fast, args.repeat))}")
+
+            # 数据已在内存中，只比较序列化本身
+            objects = entity.query.all()
+            rows = db.session.execute(select(*encoder.columns)).all()
+            marshal_samples = measure(lambda: json.dumps(marshal(objects, model)), args.repeat)
+            encode_samples = measure(lambda: dumps([encoder.encode(row) for row in rows]), args.repeat)
+            print(f"  仅序列化 marshal + json  : {format_latency(marshal_samples)}")
+            print(f"  仅序列化 行编码器 + dumps: {format_latency(encode_samples)}")
+            db.session.expunge_all()
+
+    client = app.test_client()
+    print(f"\n== 端到端 GET /api/users/（{args.rows} 行）")
+    for enabled in (False, True):
+        app.config["FAST_SERIALIZER"] = enabled
+
+        def request():
+            response = client.get("/api/users/")
+            assert response.status_code == 200
+            return response.get_data()
+
+        label = "快速序列化（流式）" if enabled else "marshal"
+        print(f"  {label}: {format_latency(measure(request, args.repeat))}")
+
+
+if __name__ == "__main__":
+    main()
@@ -13,3 +13,54 @@ class Config:
     ADMIN = (os.environ.get('ADMIN_USERNAME'), os.environ.get('ADMIN_PASSWORD'))
     MAILSERVER = os.environ.get('MAILSERVER')
     MAILKEY = os.environ.get('MAILKEY')
+    # 订票并发控制：乐观锁冲突时的最大重试次数；数据库支持时可改用行锁
+    SEAT_BOOKING_MAX_RETRIES = int(os.environ.get('SEAT_BOOKING_MAX_RETRIES', 5))
+    SEAT_BOOKING_ROW_LOCK = os.environ.get('SEAT_BOOKING_ROW_LOCK', 'false').lower() == 'true'
+    # 响应缓存：lru 为进程内缓存，redis 为多 worker 共享缓存（需要 REDIS_HOST）
+    RESPONSE_CACHE_ENABLED = os.environ.get('RESPONSE_CACHE_ENABLED', 'true').lower() == 'true'
+    RESPONSE_CACHE_BACKEND = os.environ.get('RESPONSE_CACHE_BACKEND') or ('redis' if REDIS_HOST else 'lru')
+    RESPONSE_CACHE_TTL = int(os.environ.get('RESPONSE_CACHE_TTL', 300))
+    RESPONSE_CACHE_MAX_ENTRIES = int(os.environ.get('RESPONSE_CACHE_MAX_ENTRIES', 1024))
+    # 请求监控：超过该耗时（秒）的 SQL 记为慢查询；分位数按最近 N 个请求估算
+    SLOW_QUERY_THRESHOLD = float(os.environ.get('SLOW_QUERY_THRESHOLD', 0.2))
+    METRICS_RESERVOIR_SIZE = int(os.environ.get('METRICS_RESERVOIR_SIZE', 1024))
+    # 列表接口的默认/最大分页大小
+    API_PAGE_SIZE = int(os.environ.get('API_PAGE_SIZE', 20))
+    API_MAX_PAGE_SIZE = int(os.environ.get('API_MAX_PAGE_SIZE', 100))
+    # 排片查询未指定开始时间时，当前时间按多少秒取整（同时是这类响应的最长缓存时间）
+    SHOWTIME_START_BUCKET = int(os.environ.get('SHOWTIME_START_BUCKET', 60))
+    # 选座时临时锁定座位的时长（秒）
+    SEAT_HOLD_TTL = int(os.environ.get('SEAT_HOLD_TTL', 300))
+    # 密码哈希：算法参数变化后，用户下次登录时自动按新参数重新哈希
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt')
+    PASSWORD_HASH_SALT_LENGTH = int(os.environ.get('PASSWORD_HASH_SALT_LENGTH', 16))
+    # 每个 worker 的哈希进程数（0 表示在当前进程内计算）、排队上限和等待超时（秒）
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', 2))
+    PASSWORD_HASH_QUEUE = int(os.environ.get('PASSWORD_HASH_QUEUE', 16))
+    PASSWORD_HASH_TIMEOUT = float(os.environ.get('PASSWORD_HASH_TIMEOUT', 5))
+    # 电影搜索：其他 worker 的变更最多延迟多少秒可见；变更日志保留条数，落后更多时全量重建
+    SEARCH_SYNC_INTERVAL = float(os.environ.get('SEARCH_SYNC_INTERVAL', 1))
+    SEARCH_CHANGELOG_SIZE = int(os.environ.get('SEARCH_CHANGELOG_SIZE', 10000))
+    # 大列表接口（用户列表、电影列表）使用预编译的行编码器和 orjson 序列化，输出与 swagger 模型一致
+    FAST_SERIALIZER = os.environ.get('FAST_SERIALIZER', 'false').lower() == 'true'
+    # 座位图版本号与变更日志在 kv 中的保留时间（秒），过期后客户端需重新获取完整座位图
+    SEAT_MAP_LOG_TTL = int(os.environ.get('SEAT_MAP_LOG_TTL', 86400))
+    # 下单接口的 Idempotency-Key：成功响应的保留时间，以及“处理中”标记的过期时间（应大于单次请求的最长耗时）
+    IDEMPOTENCY_TTL = int(os.environ.get('IDEMPOTENCY_TTL', 86400))
+    IDEMPOTENCY_LOCK_TTL = int(os.environ.get('IDEMPOTENCY_LOCK_TTL', 30))
+    # 登录用户身份缓存：每个 worker 的最大条目数、条目有效期（秒，0 表示关闭）、检查其他 worker 变更的间隔（秒）
+    IDENTITY_CACHE_MAX_ENTRIES = int(os.environ.get('IDENTITY_CACHE_MAX_ENTRIES', 10000))
+    IDENTITY_CACHE_TTL = int(os.environ.get('IDENTITY_CACHE_TTL', 60))
+    IDENTITY_CACHE_SYNC_INTERVAL = float(os.environ.get('IDENTITY_CACHE_SYNC_INTERVAL', 1))
+    # 清扫任务（flask sweep）：每批处理的行数、批次间暂停（秒）、锁的过期时间（秒）；
+    # SWEEPER_INTERVAL 大于 0 时由 gunicorn 的 0 号 worker 在后台线程中按该间隔（秒）执行，kv 锁保证同一时间只有一个在运行
+    SWEEPER_BATCH_SIZE = int(os.environ.get('SWEEPER_BATCH_SIZE', 1000))
+    SWEEPER_PAUSE = float(os.environ.get('SWEEPER_PAUSE', 0))
+    SWEEPER_LOCK_TTL = int(os.environ.get('SWEEPER_LOCK_TTL', 300))
+    SWEEPER_INTERVAL = int(os.environ.get('SWEEPER_INTERVAL', 0))
+    # 后台大表列表页的总数：未搜索、未筛选时使用数据库统计信息估算（低于阈值时精确计数），并缓存若干秒
+    ADMIN_COUNT_CACHE_TTL = int(os.environ.get('ADMIN_COUNT_CACHE_TTL', 60))
+    ADMIN_EXACT_COUNT_THRESHOLD = int(os.environ.get('ADMIN_EXACT_COUNT_THRESHOLD', 100000))
+    # 电影评论第一页热点缓存：缓存的条数（请求的每页数量不超过它时才使用缓存）、在 kv 中的保留时间（秒）
+    COMMENT_HOT_PAGE_SIZE = int(os.environ.get('COMMENT_HOT_PAGE_SIZE', 20))
+    COMMENT_HOT_TTL = int(os.environ.get('COMMENT_HOT_TTL', 3600))
@@ -1,3 +1,22 @@
+import os
+
 bind = "0.0.0.0:5000"
 workers = 4
 worker_class = 'gevent'
+
+
+# 为每个 worker 分配本机唯一的编号（0-31），订单号生成器用它区分不同进程，见 app/utils.py
+def pre_fork(server, worker):
+    used = {getattr(w, "order_worker_id", None) for w in server.WORKERS.values()}
+    worker.order_worker_id = min(set(range(32)) - used)
+
+
+def post_fork(server, worker):
+    os.environ["ORDER_WORKER_ID"] = str(worker.order_worker_id)
+
+
+# 设置了 SWEEPER_INTERVAL 时，只在 0 号 worker 中启动定时清扫线程，见 app/sweeper.py
+def post_worker_init(worker):
+    if worker.order_worker_id == 0:
+        app = worker.wsgi
+        app.extensions["sweeper"].start(app)
@@ -0,0 +1,49 @@
+"""Movie rating aggregates.
+
+Revision ID: 07ee7d758637
+Revises: 66bb7a5a35d7
+Create Date: 2025-09-05 09:31:56.604417
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '07ee7d758637'
+down_revision = '66bb7a5a35d7'
+branch_labels = None
+depends_on = None
+
+RATING_COLUMNS = ['rating_1', 'rating_2', 'rating_3', 'rating_4', 'rating_5']
+
+
+def upgrade():
+    with op.batch_alter_table('movies', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('rating_count', sa.Integer(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('rating_sum', sa.Float(), server_default='0', nullable=False))
+        for column in RATING_COLUMNS:
+            batch_op.add_column(sa.Column(column, sa.Integer(), server_default='0', nullable=False))
+
+    # 用已有评论回填聚合值，分档规则与 app/ratings.py 的 rating_bucket 一致
+    buckets = {
+        'rating_1': 'rating < 1.5',
+        'rating_2': 'rating >= 1.5 AND rating < 2.5',
+        'rating_3': 'rating >= 2.5 AND rating < 3.5',
+        'rating_4': 'rating >= 3.5 AND rating < 4.5',
+        'rating_5': 'rating >= 4.5',
+    }
+    scope = 'FROM comments WHERE comments.movie_id = movies.id AND rating IS NOT NULL'
+    assignments = [
+        f'rating_count = (SELECT COUNT(*) {scope})',
+        f'rating_sum = COALESCE((SELECT SUM(rating) {scope}), 0)',
+    ] + [f'{column} = (SELECT COUNT(*) {scope} AND {condition})' for column, condition in buckets.items()]
+    op.execute(f"UPDATE movies SET {', '.join(assignments)}")
+
+
+def downgrade():
+    with op.batch_alter_table('movies', schema=None) as batch_op:
+        for column in reversed(RATING_COLUMNS):
+            batch_op.drop_column(column)
+        batch_op.drop_column('rating_sum')
+        batch_op.drop_column('rating_count')
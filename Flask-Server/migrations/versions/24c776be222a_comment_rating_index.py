@@ -0,0 +1,26 @@
+"""Index comments by movie and rating.
+
+Revision ID: 24c776be222a
+Revises: b4dddbedd08a
+Create Date: 2025-09-24 10:08:51.392617
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '24c776be222a'
+down_revision = 'b4dddbedd08a'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('comments', schema=None) as batch_op:
+        batch_op.create_index('ix_comments_movie_id_rating_create_time', ['movie_id', 'rating', 'create_time'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('comments', schema=None) as batch_op:
+        batch_op.drop_index('ix_comments_movie_id_rating_create_time')
@@ -0,0 +1,46 @@
+"""Composite indexes for API access paths.
+
+Revision ID: 4d1f9594e56e
+Revises: 98d233cebe30
+Create Date: 2025-09-10 16:45:08.530917
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4d1f9594e56e'
+down_revision = '98d233cebe30'
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ('screens', 'ix_screens_movie_id_start_time', ['movie_id', 'start_time']),
+    ('comments', 'ix_comments_movie_id_create_time', ['movie_id', 'create_time']),
+    ('orders', 'ix_orders_user_id_create_time', ['user_id', 'create_time']),
+    ('coupons', 'ix_coupons_user_id_is_used', ['user_id', 'is_used']),
+]
+
+
+def upgrade():
+    for table, name, columns in INDEXES:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.create_index(name, columns, unique=False)
+
+    # 建唯一索引前先去重，同一用户同一电影只保留最新的一条
+    op.execute(
+        'DELETE FROM favorites WHERE id NOT IN ('
+        'SELECT id FROM (SELECT MAX(id) AS id FROM favorites GROUP BY user_id, movie_id) AS keep)'
+    )
+    with op.batch_alter_table('favorites', schema=None) as batch_op:
+        batch_op.create_index('uq_favorites_user_id_movie_id', ['user_id', 'movie_id'], unique=True)
+
+
+def downgrade():
+    with op.batch_alter_table('favorites', schema=None) as batch_op:
+        batch_op.drop_index('uq_favorites_user_id_movie_id')
+
+    for table, name, columns in reversed(INDEXES):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_index(name)
@@ -0,0 +1,98 @@
+"""Move legacy screens onto hall templates.
+
+Revision ID: 5e1c0a9b7d42
+Revises: 24c776be222a
+Create Date: 2025-09-26 14:20:37.184512
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5e1c0a9b7d42'
+down_revision = '24c776be222a'
+branch_labels = None
+depends_on = None
+
+screens = sa.table(
+    'screens',
+    sa.column('id', sa.Integer),
+    sa.column('cinema_name', sa.String),
+    sa.column('hall_name', sa.String),
+    sa.column('seat_layout', sa.JSON),
+    sa.column('hall_id', sa.Integer),
+    sa.column('seat_bitmap', sa.LargeBinary),
+)
+halls = sa.table(
+    'halls',
+    sa.column('id', sa.Integer),
+    sa.column('cinema_name', sa.String),
+    sa.column('name', sa.String),
+    sa.column('seat_layout', sa.JSON),
+)
+
+
+def _bitmap(cells, cols):
+    """与 app/seats.py 的 SeatBitmap 相同的行优先位图"""
+    bits = bytearray((len(cells) * cols + 7) // 8)
+    for r, row in enumerate(cells):
+        for c, value in enumerate(row):
+            if value:
+                i = r * cols + c
+                bits[i >> 3] |= 1 << (i & 7)
+    return bytes(bits)
+
+
+def upgrade():
+    # 旧场次的 seat_layout 中 1 同时表示“不可售”和“已售”。按 (影院, 影厅名) 分组，
+    # 所有场次都不可选的座位作为影厅模板，其余的 1 写入各场次的已售位图，
+    # 合并后的不可选座位与原来完全一致。同一影厅的座位图形状不一致、
+    # 缺少影院或影厅名、或同名影厅已存在时保留原有的场次座位图。
+    conn = op.get_bind()
+    groups = {}
+    rows = conn.execute(
+        sa.select(screens.c.id, screens.c.cinema_name, screens.c.hall_name, screens.c.seat_layout)
+        .where(screens.c.hall_id.is_(None), screens.c.seat_layout.isnot(None))
+    )
+    for screen_id, cinema_name, hall_name, layout in rows:
+        if cinema_name and hall_name and layout:
+            groups.setdefault((cinema_name, hall_name), []).append((screen_id, layout))
+    existing = {tuple(row) for row in conn.execute(sa.select(halls.c.cinema_name, halls.c.name))}
+
+    for (cinema_name, hall_name), members in groups.items():
+        shape = [len(row) for row in members[0][1]]
+        if (cinema_name, hall_name) in existing:
+            continue
+        if any([len(row) for row in layout] != shape for _, layout in members):
+            continue
+        template = [
+            [int(all(layout[r][c] == 1 for _, layout in members)) for c in range(width)]
+            for r, width in enumerate(shape)
+        ]
+        conn.execute(halls.insert().values(cinema_name=cinema_name, name=hall_name, seat_layout=template))
+        hall_id = conn.execute(
+            sa.select(halls.c.id).where(halls.c.cinema_name == cinema_name, halls.c.name == hall_name)
+        ).scalar_one()
+        cols = max(shape)
+        conn.execute(
+            screens.update().where(screens.c.id == sa.bindparam('screen_id')).values(
+                hall_id=hall_id, seat_layout=None, seat_bitmap=sa.bindparam('bitmap')
+            ),
+            [
+                {
+                    'screen_id': screen_id,
+                    'bitmap': _bitmap(
+                        [[int(value == 1 and not blocked) for value, blocked in zip(row, base)]
+                         for row, base in zip(layout, template)],
+                        cols,
+                    ),
+                }
+                for screen_id, layout in members
+            ],
+        )
+
+
+def downgrade():
+    # 之前的版本同样支持影厅模板，迁移后的数据无需还原
+    pass
@@ -0,0 +1,26 @@
+"""Screen seat_version for optimistic seat booking.
+
+Revision ID: 66bb7a5a35d7
+Revises: a2ea7807440a
+Create Date: 2025-09-03 15:47:08.219730
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '66bb7a5a35d7'
+down_revision = 'a2ea7807440a'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('screens', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('seat_version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade():
+    with op.batch_alter_table('screens', schema=None) as batch_op:
+        batch_op.drop_column('seat_version')
@@ -0,0 +1,26 @@
+"""Index screens by cinema and start time.
+
+Revision ID: 938332114140
+Revises: 4d1f9594e56e
+Create Date: 2025-09-12 11:20:37.446125
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '938332114140'
+down_revision = '4d1f9594e56e'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('screens', schema=None) as batch_op:
+        batch_op.create_index('ix_screens_cinema_name_start_time', ['cinema_name', 'start_time'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('screens', schema=None) as batch_op:
+        batch_op.drop_index('ix_screens_cinema_name_start_time')
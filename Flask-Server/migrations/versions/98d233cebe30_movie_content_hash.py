@@ -0,0 +1,28 @@
+"""Movie content hash for catalog ingest.
+
+Revision ID: 98d233cebe30
+Revises: 07ee7d758637
+Create Date: 2025-09-08 14:12:40.118263
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '98d233cebe30'
+down_revision = '07ee7d758637'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('movies', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('content_hash', sa.String(length=40), nullable=True))
+        batch_op.create_index(batch_op.f('ix_movies_name'), ['name'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('movies', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_movies_name'))
+        batch_op.drop_column('content_hash')
@@ -0,0 +1,40 @@
+"""Seat inventory: hall templates and sold-seat bitmaps.
+
+Revision ID: a2ea7807440a
+Revises: 14a6f2d649e6
+Create Date: 2025-09-02 10:12:41.508114
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a2ea7807440a'
+down_revision = '14a6f2d649e6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('halls',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('cinema_name', sa.String(length=128), nullable=False),
+    sa.Column('name', sa.String(length=64), nullable=False),
+    sa.Column('seat_layout', sa.JSON(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('cinema_name', 'name')
+    )
+    with op.batch_alter_table('screens', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('hall_id', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('seat_bitmap', sa.LargeBinary(), nullable=True))
+        batch_op.create_foreign_key('fk_screens_hall_id_halls', 'halls', ['hall_id'], ['id'])
+
+
+def downgrade():
+    with op.batch_alter_table('screens', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_screens_hall_id_halls', type_='foreignkey')
+        batch_op.drop_column('seat_bitmap')
+        batch_op.drop_column('hall_id')
+
+    op.drop_table('halls')
@@ -0,0 +1,28 @@
+"""Mark expired coupons.
+
+Revision ID: b4dddbedd08a
+Revises: 938332114140
+Create Date: 2025-09-19 15:42:08.713204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b4dddbedd08a'
+down_revision = '938332114140'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('coupons', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('is_expired', sa.Boolean(), server_default='0', nullable=False))
+        batch_op.create_index('ix_coupons_is_expired_expiry_date', ['is_expired', 'expiry_date'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('coupons', schema=None) as batch_op:
+        batch_op.drop_index('ix_coupons_is_expired_expiry_date')
+        batch_op.drop_column('is_expired')
@@ -1,87 +1,385 @@
-import requests
-from bs4 import BeautifulSoup
+"""
+豆瓣电影 Top 250 爬虫
+
+- 线程池并发抓取列表页和详情页，按域名做令牌桶限速；
+- 响应按内容哈希保存在本地缓存目录，再次运行时带 If-None-Match / If-Modified-Since 重新验证，
+  未变化的页面（304）直接读缓存；
+- 每爬完一部电影就追加写入 JSONL 文件，该文件同时作为断点，中断后重新运行会跳过已完成的电影；
+- 全部结束后按排名导出 seed_data.json，供 `flask seed` 使用。
+
+示例:
+    python scraper.py --workers 4 --rate 1
+    python scraper.py --base-url http://127.0.0.1:8000   # 对本地桩服务器抓取
+"""
+import argparse
+import hashlib
 import json
+import os
+import random
+import re  # 导入正则表达式库
+import threading
 import time
-import re # 导入正则表达式库
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from urllib.parse import urljoin, urlsplit
+
+import requests
+from bs4 import BeautifulSoup
+
+DEFAULT_BASE_URL = 'https://movie.douban.com'
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8'  # 明确请求中文内容
+}
+MOVIE_FIELDS = ("name", "cover", "description", "release_date", "duration_mins")
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
 
-def scrape_douban_top250():
+class TokenBucket:
+    """令牌桶：每秒补充 rate 个令牌，最多积累 capacity 个"""
+
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = max(capacity, 1)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """取走一个令牌，不足时阻塞等待"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                delay = (1 - self.tokens) / self.rate
+            time.sleep(delay)
+
+
+class HostRateLimiter:
+    """按域名分别限速"""
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def acquire(self, url):
+        host = urlsplit(url).netloc
+        with self.lock:
+            bucket = self.buckets.get(host)
+            if bucket is None:
+                bucket = self.buckets[host] = TokenBucket(self.rate, self.burst)
+        bucket.acquire()
+
+
+class PageCache:
     """
-    爬取豆瓣电影 Top 250 的数据，并进入详情页获取更详细的信息。
+    本地页面缓存
+    页面内容按 SHA-256 存放在 objects/ 下（相同内容只存一份），
+    index/ 下按 URL 哈希保存元数据：内容哈希、编码、ETag、Last-Modified 和抓取时间。
     """
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-        'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8' # 明确请求中文内容
-    }
-    
-    all_movies = []
-    
-    for start_num in range(0, 250, 25):
-        list_url = f'https://movie.douban.com/top250?start={start_num}&filter='
-        print(f"正在爬取列表页 (第 {start_num // 25 + 1} 页)...")
-        
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(os.path.join(directory, 'index'), exist_ok=True)
+        os.makedirs(os.path.join(directory, 'objects'), exist_ok=True)
+
+    def _index_path(self, url):
+        return os.path.join(self.directory, 'index', hashlib.sha1(url.encode('utf-8')).hexdigest() + '.json')
+
+    def _object_path(self, digest):
+        return os.path.join(self.directory, 'objects', digest[:2], digest)
+
+    @staticmethod
+    def _write_atomic(path, data):
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    def lookup(self, url):
+        """返回 URL 的缓存元数据，没有缓存时返回 None"""
         try:
-            response = requests.get(list_url, headers=headers)
+            with open(self._index_path(url), 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not os.path.exists(self._object_path(meta['sha256'])):
+            return None
+        return meta
+
+    def read(self, meta):
+        with open(self._object_path(meta['sha256']), 'rb') as f:
+            return f.read().decode(meta.get('encoding') or 'utf-8', errors='replace')
+
+    def store(self, url, response):
+        """保存响应内容和用于重新验证的响应头"""
+        digest = hashlib.sha256(response.content).hexdigest()
+        path = self._object_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            self._write_atomic(path, response.content)
+        meta = {
+            'url': url,
+            'sha256': digest,
+            'encoding': response.encoding or 'utf-8',
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'fetched_at': time.time(),
+        }
+        self._write_atomic(self._index_path(url), json.dumps(meta).encode('utf-8'))
+
+    def touch(self, url, meta):
+        """304 重新验证成功后刷新抓取时间"""
+        meta = dict(meta, fetched_at=time.time())
+        self._write_atomic(self._index_path(url), json.dumps(meta).encode('utf-8'))
+
+
+class Fetcher:
+    """带限速、缓存和重试的页面下载器，可在多个线程中共享"""
+
+    def __init__(self, cache, limiter, max_age=None, timeout=10, retries=3):
+        self.cache = cache
+        self.limiter = limiter
+        self.max_age = max_age
+        self.timeout = timeout
+        self.retries = retries
+        self.local = threading.local()
+        self.stats = {'downloaded': 0, 'not_modified': 0, 'cached': 0, 'retried': 0}
+        self.stats_lock = threading.Lock()
+
+    def _count(self, name):
+        with self.stats_lock:
+            self.stats[name] += 1
+
+    def _session(self):
+        # requests.Session 不是线程安全的，每个线程各用一个
+        session = getattr(self.local, 'session', None)
+        if session is None:
+            session = self.local.session = requests.Session()
+            session.headers.update(HEADERS)
+        return session
+
+    def get(self, url):
+        """返回页面文本，失败时抛出 requests.RequestException"""
+        meta = self.cache.lookup(url)
+        if meta and self.max_age is not None and time.time() - meta['fetched_at'] < self.max_age:
+            self._count('cached')
+            return self.cache.read(meta)
+
+        headers = {}
+        if meta and meta.get('etag'):
+            headers['If-None-Match'] = meta['etag']
+        if meta and meta.get('last_modified'):
+            headers['If-Modified-Since'] = meta['last_modified']
+
+        for attempt in range(self.retries + 1):
+            last_attempt = attempt == self.retries
+            self.limiter.acquire(url)
+            try:
+                response = self._session().get(url, headers=headers, timeout=self.timeout)
+            except requests.RequestException:
+                if last_attempt:
+                    raise
+                self._backoff(attempt)
+                continue
+
+            if response.status_code == 304 and meta:
+                self.cache.touch(url, meta)
+                self._count('not_modified')
+                return self.cache.read(meta)
+            if response.status_code in RETRY_STATUS and not last_attempt:
+                self._backoff(attempt, response.headers.get('Retry-After'))
+                continue
             response.raise_for_status()
-            soup = BeautifulSoup(response.text, 'lxml')
-            movie_items = soup.find_all('div', class_='item')
-            
-            for item in movie_items:
-                detail_url = item.find('div', class_='hd').find('a')['href']
-                
-                print(f"  -> 正在进入详情页...")
+            self.cache.store(url, response)
+            self._count('downloaded')
+            return response.text
+
+    def _backoff(self, attempt, retry_after=None):
+        self._count('retried')
+        try:
+            delay = float(retry_after)
+        except (TypeError, ValueError):
+            delay = 2 ** attempt + random.random()
+        time.sleep(delay)
+
+
+def parse_list_page(html, base_url):
+    """解析列表页，返回详情页 URL 列表（按页面中的排名顺序）"""
+    soup = BeautifulSoup(html, 'lxml')
+    return [
+        urljoin(base_url + '/', item.find('div', class_='hd').find('a')['href'])
+        for item in soup.find_all('div', class_='item')
+    ]
+
+
+def parse_detail_page(html):
+    """解析详情页，返回电影数据"""
+    detail_soup = BeautifulSoup(html, 'lxml')
+
+    title = detail_soup.find('span', property='v:itemreviewed').get_text(strip=True)
+    cover_url = detail_soup.find('div', id='mainpic').find('img')['src']
+
+    description_tag = detail_soup.find('span', property='v:summary')
+    description = description_tag.get_text(strip=True) if description_tag else "暂无简介"
+
+    info_div = detail_soup.find('div', id='info')
+
+    # 提取上映日期
+    release_date_tag = info_div.find('span', string=re.compile(r'上映日期'))
+    release_date = release_date_tag.next_sibling.strip() if release_date_tag else "1900-01-01"
+
+    # 提取片长
+    duration_tag = info_div.find('span', string=re.compile(r'片长'))
+    duration_text = duration_tag.next_sibling.strip() if duration_tag else "0"
+    duration_match = re.search(r'\d+', duration_text)
+    duration_mins = int(duration_match.group(0)) if duration_match else 0
+
+    return {
+        "name": title,
+        "cover": cover_url,
+        "description": description,
+        "release_date": release_date.split('(')[0],  # 清理地区信息
+        "duration_mins": duration_mins
+    }
+
+
+def load_checkpoint(path):
+    """
+    读取已完成的 JSONL 结果，返回已爬取的详情页 URL 集合
+    上次中断时可能留下写了一半的最后一行，这里会把它截掉
+    """
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, 'rb+') as f:
+        data = f.read()
+        complete = data.rfind(b'\n') + 1
+        if complete < len(data):
+            f.truncate(complete)
+    for line in data[:complete].decode('utf-8').splitlines():
+        try:
+            done.add(json.loads(line)['source_url'])
+        except (ValueError, KeyError):
+            continue
+    return done
+
+
+def export_seed_data(jsonl_path, seed_path):
+    """把 JSONL 结果按排名导出为 seed_data.json 格式，返回电影数量"""
+    movies = {}
+    with open(jsonl_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            movies[record['source_url']] = record
+
+    tmp = seed_path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        f.write('{\n  "movies": [')
+        for i, record in enumerate(sorted(movies.values(), key=lambda r: r['rank'])):
+            movie = {field: record.get(field) for field in MOVIE_FIELDS}
+            f.write(',' if i else '')
+            f.write('\n    ' + json.dumps(movie, ensure_ascii=False))
+        f.write('\n  ]\n}\n')
+    os.replace(tmp, seed_path)
+    return len(movies)
+
+
+def scrape_douban_top250(base_url=DEFAULT_BASE_URL, output='movies.jsonl', seed_output='seed_data.json',
+                         cache_dir='.scraper_cache', workers=4, rate=1.0, burst=1, max_age=None,
+                         pages=10, page_size=25, timeout=10, retries=3):
+    """
+    爬取豆瓣电影 Top 250 的数据，并进入详情页获取更详细的信息。
+    返回:
+        (本次新爬取的电影数, 失败的页面数, 下载统计)
+    """
+    base_url = base_url.rstrip('/')
+    fetcher = Fetcher(PageCache(cache_dir), HostRateLimiter(rate, burst), max_age=max_age,
+                      timeout=timeout, retries=retries)
+    done = load_checkpoint(output)
+    if done:
+        print(f"从断点继续：已完成 {len(done)} 部电影。")
+
+    scraped = failed = 0
+    with open(output, 'a', encoding='utf-8') as out, ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = {}
+        for page in range(pages):
+            start_num = page * page_size
+            list_url = f'{base_url}/top250?start={start_num}&filter='
+            pending[pool.submit(fetcher.get, list_url)] = ('list', start_num, list_url)
+
+        while pending:
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                kind, position, url = pending.pop(future)
                 try:
-                    detail_response = requests.get(detail_url, headers=headers)
-                    detail_response.raise_for_status()
-                    detail_soup = BeautifulSoup(detail_response.text, 'lxml')
-
-                    # --- 👇 全新的、更可靠的解析逻辑 ---
-                    title = detail_soup.find('span', property='v:itemreviewed').get_text(strip=True)
-                    cover_url = detail_soup.find('div', id='mainpic').find('img')['src']
-                    
-                    description_tag = detail_soup.find('span', property='v:summary')
-                    description = description_tag.get_text(strip=True) if description_tag else "暂无简介"
-
-                    info_div = detail_soup.find('div', id='info')
-                    
-                    # 提取上映日期
-                    release_date_tag = info_div.find('span', string=re.compile(r'上映日期'))
-                    release_date = release_date_tag.next_sibling.strip() if release_date_tag else "1900-01-01"
-                    
-                    # 提取片长
-                    duration_tag = info_div.find('span', string=re.compile(r'片长'))
-                    duration_text = duration_tag.next_sibling.strip() if duration_tag else "0"
-                    duration_match = re.search(r'\d+', duration_text)
-                    duration_mins = int(duration_match.group(0)) if duration_match else 0
-                    # --- 👆 解析逻辑结束 ---
-
-                    movie_data = {
-                        "name": title,
-                        "cover": cover_url,
-                        "description": description,
-                        "release_date": release_date.split('(')[0], # 清理地区信息
-                        "duration_mins": duration_mins
-                    }
-                    all_movies.append(movie_data)
-                    
-                    time.sleep(1) 
-
-                except requests.RequestException as e_detail:
-                    print(f"    !! 爬取详情页失败: {e_detail}")
+                    html = future.result()
+                    if kind == 'list':
+                        detail_urls = parse_list_page(html, base_url)
+                        print(f"列表页 (第 {position // page_size + 1} 页) 完成，共 {len(detail_urls)} 部电影。")
+                        for offset, detail_url in enumerate(detail_urls):
+                            if detail_url not in done:
+                                done.add(detail_url)
+                                pending[pool.submit(fetcher.get, detail_url)] = ('detail', position + offset + 1, detail_url)
+                        continue
+                    movie_data = parse_detail_page(html)
+                except requests.RequestException as e:
+                    failed += 1
+                    print(f"!! 爬取{'列表' if kind == 'list' else '详情'}页失败: {e}")
+                    continue
                 except Exception as e_parse:
-                    print(f"    !! 解析详情页失败: {e_parse}, URL: {detail_url}")
-
-        except requests.RequestException as e_list:
-            print(f"!! 爬取列表页失败: {e_list}")
-            break
-            
-    final_data = {"movies": all_movies}
-    
-    try:
-        with open('seed_data.json', 'w', encoding='utf-8') as f:
-            json.dump(final_data, f, ensure_ascii=False, indent=2)
-        print(f"\n成功！共爬取 {len(all_movies)} 部电影的详细数据，已写入到 seed_data.json 文件。")
-    except IOError as e_write:
-        print(f"写入文件失败: {e_write}")
+                    failed += 1
+                    print(f"!! 解析页面失败: {e_parse}, URL: {url}")
+                    continue
+
+                # 每部电影立即写入并刷盘，作为断点
+                out.write(json.dumps({"rank": position, "source_url": url, **movie_data}, ensure_ascii=False) + '\n')
+                out.flush()
+                scraped += 1
+
+    if seed_output:
+        try:
+            total = export_seed_data(output, seed_output)
+            print(f"\n已将 {total} 部电影的详细数据写入到 {seed_output} 文件。")
+        except IOError as e_write:
+            print(f"写入文件失败: {e_write}")
+    if failed:
+        print(f"有 {failed} 个页面失败，重新运行即可从断点继续。")
+    return scraped, failed, fetcher.stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--base-url', default=DEFAULT_BASE_URL)
+    parser.add_argument('--output', default='movies.jsonl', help='逐条写入的 JSONL 结果，同时作为断点文件')
+    parser.add_argument('--seed-output', default='seed_data.json', help='导出的种子数据文件，传空字符串则不导出')
+    parser.add_argument('--cache-dir', default='.scraper_cache')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--rate', type=float, default=1.0, help='每个域名每秒请求数')
+    parser.add_argument('--burst', type=int, default=1, help='令牌桶容量')
+    parser.add_argument('--max-age', type=float, default=None,
+                        help='缓存在该秒数内直接使用、不重新验证；默认每次都重新验证')
+    parser.add_argument('--pages', type=int, default=10)
+    parser.add_argument('--timeout', type=float, default=10)
+    parser.add_argument('--retries', type=int, default=3)
+    args = parser.parse_args()
+
+    scraped, failed, stats = scrape_douban_top250(
+        base_url=args.base_url, output=args.output, seed_output=args.seed_output, cache_dir=args.cache_dir,
+        workers=args.workers, rate=args.rate, burst=args.burst, max_age=args.max_age, pages=args.pages,
+        timeout=args.timeout, retries=args.retries,
+    )
+    print(f"本次新爬取 {scraped} 部电影，失败 {failed} 个页面。"
+          f"下载 {stats['downloaded']}，304 {stats['not_modified']}，缓存命中 {stats['cached']}，重试 {stats['retried']}。")
+
 
 if __name__ == '__main__':
-    scrape_douban_top250()
+    main()
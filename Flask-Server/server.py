@@ -3,71 +3,46 @@ import click
 import json
 import random
 from datetime import datetime, timedelta
-from app import create_app, db
-from app.models import Movie, Screen
+from app import create_app, db, sweeper
+from app.models import Movie, Screen, Hall
+from app.ingest import ingest_movies
+from app.ratings import rebuild_rating_aggregates
+from app.sweeper import TASKS
 from flask_migrate import Migrate
 
 app = create_app()
 migrate = Migrate(app, db)
 
 @app.cli.command("seed")
-def seed():
+@click.option("--file", "path", default="seed_data.json", show_default=True, help="电影数据文件")
+@click.option("--batch-size", default=1000, show_default=True, help="每批写入的记录数")
+def seed(path, batch_size):
     """
-    从 seed_data.json 文件中读取并批量添加初始电影数据，增强了容错处理。
+    从 seed_data.json 文件中流式读取并批量导入电影数据。
+    已存在的电影按名称匹配，内容未变化时跳过，有变化时更新。
     """
+    def report_progress(report):
+        click.echo(f"已处理 {report.read} 条，{report.rows_per_second:.0f} 条/秒")
+
+    click.echo("正在从 JSON 文件开始填充数据库...")
     try:
-        with open('seed_data.json', 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            movies_data = data.get('movies', [])
+        with open(path, 'r', encoding='utf-8') as f:
+            report = ingest_movies(f, batch_size=batch_size, on_warning=click.echo, on_progress=report_progress)
     except FileNotFoundError:
-        click.echo("错误: 未找到 seed_data.json 文件。")
+        click.echo(f"错误: 未找到 {path} 文件。")
         return
     except json.JSONDecodeError:
-        click.echo("错误: seed_data.json 文件格式不正确。")
+        click.echo(f"错误: {path} 文件格式不正确。")
         return
 
-    if not movies_data:
+    if not report.read:
         click.echo("没有需要填充的电影数据。")
         return
-
-    click.echo("正在从 JSON 文件开始填充数据库...")
-
-    for movie_info in movies_data:
-        # 检查关键字段是否存在
-        if not movie_info.get("name"):
-            click.echo("警告: 发现一条没有名称的电影记录，已跳过。")
-            continue
-
-        # 检查电影是否已存在
-        existing_movie = Movie.query.filter_by(name=movie_info["name"]).first()
-        if existing_movie:
-            click.echo(f"电影 '{movie_info['name']}' 已存在，跳过。")
-            continue
-
-        # --- 👇 关键改动：更稳健的日期处理 ---
-        release_date_str = movie_info.get("release_date")
-        release_date_obj = None
-        if release_date_str:
-            try:
-                # 尝试按标准格式解析，并只取日期部分
-                release_date_obj = datetime.strptime(release_date_str.strip(), "%Y-%m-%d").date()
-            except (ValueError, TypeError):
-                # 如果失败（例如日期为空、格式错误或为“未知”），则忽略
-                click.echo(f"警告: 无法解析电影 '{movie_info['name']}' 的日期 '{release_date_str}'。将设置为空值。")
-        # --- 👆 改动结束 ---
-
-        new_movie = Movie(
-            name=movie_info["name"],
-            cover=movie_info.get("cover"),
-            description=movie_info.get("description"),
-            release_date=release_date_obj, # 使用处理过的日期对象
-            duration_mins=movie_info.get("duration_mins") or 0 # 如果时长为空则默认为0
-        )
-        db.session.add(new_movie)
-        click.echo(f"已添加电影: '{movie_info['name']}'")
-    
-    db.session.commit()
-    click.echo("数据库填充完成。")
+    click.echo(
+        f"数据库填充完成: 共 {report.read} 条，新增 {report.inserted}，更新 {report.updated}，"
+        f"未变化 {report.unchanged}，保留后台修改 {report.kept}，跳过 {report.skipped}，"
+        f"耗时 {report.elapsed:.2f} 秒（{report.rows_per_second:.0f} 条/秒）。"
+    )
 
 @app.cli.command("seed-screens")
 def seed_screens():
@@ -85,7 +60,7 @@ def seed_screens():
     # 模拟的影院和影厅信息
     cinemas = [("万达影城", ["IMAX厅", "4号厅", "情侣厅"]), ("中影国际影城", ["1号厅", "激光厅"])]
 
-    # 默认的座位图
+    # 默认的座位图，作为影厅模板只保存一份
     default_seat_layout = [
         [0, 0, 0, 0, 0, 0, 0, 0, 0, 0],
         [0, 0, 1, 1, 0, 0, 1, 1, 0, 0],
@@ -93,6 +68,15 @@ def seed_screens():
         [0, 0, 0, 0, 0, 0, 0, 0, 0, 0]
     ]
 
+    # 每个影厅只创建一次座位模板，场次通过 hall_id 共享
+    halls = {(hall.cinema_name, hall.name): hall for hall in Hall.query.all()}
+    for cinema_name, hall_list in cinemas:
+        for hall_name in hall_list:
+            if (cinema_name, hall_name) not in halls:
+                hall = Hall(cinema_name=cinema_name, name=hall_name, seat_layout=default_seat_layout)
+                db.session.add(hall)
+                halls[(cinema_name, hall_name)] = hall
+
     for movie in movies:
         # 为每部电影创建 3 个场次
         for i in range(3):
@@ -114,10 +98,41 @@ def seed_screens():
                 hall_name=hall_name,
                 start_time=start_time,
                 price=price,
-                seat_layout=default_seat_layout
+                hall=halls[(cinema_name, hall_name)]
             )
             db.session.add(new_screen)
 
     db.session.commit()
     click.echo(f"Successfully added screenings for {len(movies)} movies.")
 
+@app.cli.command("rebuild-ratings")
+def rebuild_ratings():
+    """
+    根据评论表批量重建所有电影的评分聚合（评论数、总分、1-5 星分布）。
+    """
+    click.echo("正在重建电影评分聚合...")
+    count = rebuild_rating_aggregates()
+    click.echo(f"重建完成，共有 {count} 部电影存在评分。")
+
+@app.cli.command("sweep")
+@click.option("--task", "tasks", multiple=True, type=click.Choice(list(TASKS)), help="只执行指定任务，可重复，默认全部")
+@click.option("--batch-size", type=int, help="每批处理的行数，默认 SWEEPER_BATCH_SIZE")
+@click.option("--pause", type=float, help="批次之间暂停的秒数，默认 SWEEPER_PAUSE")
+def sweep(tasks, batch_size, pause):
+    """
+    分批把已开场场次的订单标记为已完成，把过期的优惠券标记为已过期。
+    中途中断时，下次执行从检查点继续。
+    """
+    def report_progress(task, report):
+        click.echo(f"[{task}] 第 {report.batches} 批，完成订单 {report.orders_completed}，过期优惠券 {report.coupons_expired}")
+
+    if pause is not None:
+        sweeper.pause = pause
+    report = sweeper.sweep(tasks=tasks or None, batch_size=batch_size, on_batch=report_progress)
+    if report is None:
+        click.echo("另一个清扫任务正在运行，本次跳过。")
+        return
+    click.echo(
+        f"清扫完成: 完成订单 {report.orders_completed} 个，过期优惠券 {report.coupons_expired} 张，"
+        f"共 {report.batches} 批，耗时 {report.elapsed:.2f} 秒。"
+    )